@@ -0,0 +1,284 @@
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.utils import timezone
+
+from .cache_consultas import SEGUNDOS_VERSION, invalidar, versiones
+from .models import (
+    IngresoFinanciero, MovimientoFinanciero, Parcela, RegistroRiego, SaldoMensual, TipoCambio, Trabajador,
+    registro_trabajo,
+)
+
+# Alias en DATABASES de la réplica de lectura
+ALIAS = 'analitica'
+
+# Tablas que se copian a la réplica: todo lo que leen los tableros, reportes y exportaciones
+MODELOS_REPLICADOS = (
+    registro_trabajo, MovimientoFinanciero, IngresoFinanciero, RegistroRiego,
+    TipoCambio, SaldoMensual, Parcela, Trabajador,
+)
+
+# Registro de cambios en la base principal (lo llenan triggers de SQLite) y marca de la réplica
+TABLA_CAMBIOS = 'analitica_cambios'
+TABLA_ESTADO = 'analitica_sincronizacion'
+
+# Cada cuánto vuelve a comprobar un proceso si la réplica ya fue inicializada
+SEGUNDOS_COMPROBACION = 60
+
+# Filas por transacción al sincronizar
+LOTE_SINCRONIZACION = 2000
+
+# Con más cambios anotados que esto, la sincronización copia las tablas enteras en vez
+# de repasar el registro, y lo vacía
+MAXIMO_CAMBIOS = 200000
+
+# Marca, en el cache compartido, de que una copia completa está vaciando la réplica
+CLAVE_EN_COPIA = 'analitica:en_copia'
+
+_en_analitica = ContextVar('en_analitica', default=False)
+_disponible = {'valor': False, 'comprobado': None}
+_en_copia = {'valor': False, 'hasta': 0}
+_disponible_lock = threading.Lock()
+
+
+#Logic for routing reads
+def replica_configurada():
+    return ALIAS in settings.DATABASES
+
+
+def _replica_en_copia(ahora):
+    # Se relee del cache compartido a lo sumo cada SEGUNDOS_VERSION (ver sincronizar)
+    if ahora >= _en_copia['hasta']:
+        try:
+            _en_copia['valor'] = bool(versiones.get(CLAVE_EN_COPIA))
+        except DatabaseError:
+            _en_copia['valor'] = False
+        _en_copia['hasta'] = ahora + SEGUNDOS_VERSION
+    return _en_copia['valor']
+
+
+def _marcar_en_copia(valor):
+    if valor:
+        versiones.set(CLAVE_EN_COPIA, True, timeout=None)
+    else:
+        versiones.delete(CLAVE_EN_COPIA)
+    with _disponible_lock:
+        _en_copia.update(valor=valor, hasta=time.monotonic() + SEGUNDOS_VERSION)
+
+
+def replica_disponible():
+    """
+    True si la réplica existe, ya pasó por una sincronización completa y no hay una
+    copia completa vaciándola. Si no, las lecturas siguen yendo a la base principal.
+    """
+    if not replica_configurada():
+        return False
+    with _disponible_lock:
+        ahora = time.monotonic()
+        if _replica_en_copia(ahora):
+            return False
+        if _disponible['comprobado'] is None or ahora - _disponible['comprobado'] > SEGUNDOS_COMPROBACION:
+            try:
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute(f'SELECT ultima FROM "{TABLA_ESTADO}"')
+                    _disponible['valor'] = cursor.fetchone() is not None
+            except DatabaseError:
+                _disponible['valor'] = False
+            _disponible['comprobado'] = ahora
+        return _disponible['valor']
+
+
+def usar_analitica(vista):
+    """
+    Las consultas de la vista (o trabajo en segundo plano) a las tablas replicadas se
+    leen de la réplica. Las escrituras siempre van a la base principal.
+    """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura(*args, **kwargs):
+            token = _en_analitica.set(True)
+            try:
+                return await vista(*args, **kwargs)
+            finally:
+                _en_analitica.reset(token)
+    else:
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            token = _en_analitica.set(True)
+            try:
+                return vista(*args, **kwargs)
+            finally:
+                _en_analitica.reset(token)
+    return envoltura
+
+
+class RouterAnalitica:
+    """
+    Dentro de @usar_analitica, las lecturas de MODELOS_REPLICADOS van a la réplica.
+    Las migraciones de esquema se aplican en ambas bases (`migrate --database
+    analitica`); las de datos solo en la principal, la réplica los recibe al sincronizar.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _en_analitica.get() and model in MODELOS_REPLICADOS and replica_disponible():
+            return ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Aunque la instancia se haya leído de la réplica, se guarda en la principal
+        if model in MODELOS_REPLICADOS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # RunPython y RunSQL llegan sin model_name
+        if db == ALIAS and model_name is None:
+            return False
+        return None
+
+
+#Logic for change tracking
+def instalar_disparadores(using=DEFAULT_DB_ALIAS):
+    """
+    Crea en la base principal la tabla de cambios y los triggers que anotan cada
+    alta, edición o baja de las tablas replicadas, vengan del ORM, de un update()
+    masivo o de SQL directo. Se llama después de cada migrate, porque SQLite pierde
+    los triggers cuando una migración reconstruye la tabla.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{TABLA_CAMBIOS}" '
+            '("id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, "tabla" varchar(100) NOT NULL, "registro" bigint NOT NULL)'
+        )
+        for modelo in MODELOS_REPLICADOS:
+            tabla, pk = modelo._meta.db_table, modelo._meta.pk.column
+            for evento, filas in (('INSERT', ('NEW',)), ('UPDATE', ('OLD', 'NEW')), ('DELETE', ('OLD',))):
+                anotar = ' '.join(
+                    f'INSERT INTO "{TABLA_CAMBIOS}" ("tabla", "registro") VALUES (\'{tabla}\', {fila}."{pk}");'
+                    for fila in filas
+                )
+                cursor.execute(
+                    f'CREATE TRIGGER IF NOT EXISTS "{tabla}_analitica_{evento.lower()}" '
+                    f'AFTER {evento} ON "{tabla}" BEGIN {anotar} END'
+                )
+
+
+#Logic for syncing the replica
+def _copiar(cursor, modelo, condicion='', params=()):
+    tabla = modelo._meta.db_table
+    columnas = ', '.join(f'"{campo.column}"' for campo in modelo._meta.concrete_fields)
+    cursor.execute(f'INSERT INTO "{ALIAS}"."{tabla}" ({columnas}) SELECT {columnas} FROM "main"."{tabla}" {condicion}', params)
+    return cursor.rowcount
+
+
+def _copiar_tabla(conexion, modelo, lote):
+    """Vacía la tabla en la réplica y la vuelve a copiar de a `lote` filas por clave, cada lote en su transacción."""
+    tabla, pk = modelo._meta.db_table, modelo._meta.pk.column
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{ALIAS}"."{tabla}"')
+    copiadas, ultimo = 0, None
+    while True:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), conexion.cursor() as cursor:
+            if ultimo is None:
+                cantidad = _copiar(cursor, modelo, f'ORDER BY "{pk}" LIMIT %s', [lote])
+            else:
+                cantidad = _copiar(cursor, modelo, f'WHERE "{pk}" > %s ORDER BY "{pk}" LIMIT %s', [ultimo, lote])
+            cursor.execute(f'SELECT MAX("{pk}") FROM "{ALIAS}"."{tabla}"')
+            ultimo = cursor.fetchone()[0]
+        copiadas += cantidad
+        if cantidad < lote:
+            return copiadas
+
+
+def _copiar_cambios(conexion, modelo, tope, lote):
+    """Borra en la réplica los registros anotados hasta `tope` y copia los que siguen existiendo, de a `lote`."""
+    tabla, pk = modelo._meta.db_table, modelo._meta.pk.column
+    with conexion.cursor() as cursor:
+        cursor.execute(f'SELECT DISTINCT "registro" FROM "{TABLA_CAMBIOS}" WHERE "tabla" = %s AND "id" <= %s', [tabla, tope])
+        tocados = [fila[0] for fila in cursor.fetchall()]
+    copiadas = 0
+    for inicio in range(0, len(tocados), lote):
+        claves = tocados[inicio:inicio + lote]
+        marcas = ', '.join(['%s'] * len(claves))
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), conexion.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{ALIAS}"."{tabla}" WHERE "{pk}" IN ({marcas})', claves)
+            copiadas += _copiar(cursor, modelo, f'WHERE "{pk}" IN ({marcas})', claves)
+    return copiadas
+
+
+def sincronizar(completo=False, lote=LOTE_SINCRONIZACION):
+    """
+    Lleva a la réplica los cambios anotados desde la última sincronización: por
+    cada tabla, borra en la réplica los registros tocados y vuelve a copiar los que
+    siguen existiendo. La primera vez, con `completo` o con más de MAXIMO_CAMBIOS
+    cambios anotados copia las tablas enteras; mientras tanto las lecturas de todos
+    los procesos van a la base principal.
+
+    Trabaja desde la conexión principal con la réplica adjunta, de a `lote` filas por
+    transacción: cada lote solo lee la base principal un momento y escribe en la
+    réplica, así la carga de datos no espera a que termine una copia completa. Los
+    cambios hechos mientras tanto quedan anotados para la próxima sincronización.
+    Si hubo cambios invalida los reportes cacheados, que se calcularon con la réplica
+    anterior. Devuelve {modelo: filas copiadas}.
+    """
+    conexion = connections[DEFAULT_DB_ALIAS]
+    if conexion.vendor != 'sqlite' or connections[ALIAS].vendor != 'sqlite':
+        raise ValueError("La réplica analítica requiere SQLite en ambas bases.")
+    if conexion.in_atomic_block:
+        raise ValueError("No se puede sincronizar dentro de una transacción (ATTACH no lo permite).")
+    instalar_disparadores()
+
+    with conexion.cursor() as cursor:
+        cursor.execute(f'ATTACH DATABASE %s AS "{ALIAS}"', [str(settings.DATABASES[ALIAS]['NAME'])])
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{ALIAS}"."{TABLA_ESTADO}" '
+                '("id" integer NOT NULL PRIMARY KEY CHECK ("id" = 1), "ultima" datetime NOT NULL)'
+            )
+            cursor.execute(f'SELECT COUNT(*) FROM "{ALIAS}"."{TABLA_ESTADO}"')
+            inicializada = bool(cursor.fetchone()[0])
+            # Lo anotado después de este punto se copia en la próxima sincronización
+            cursor.execute(f'SELECT MAX("id"), COUNT(*) FROM "{TABLA_CAMBIOS}"')
+            tope, pendientes = cursor.fetchone()
+            completo = completo or not inicializada or pendientes > MAXIMO_CAMBIOS
+        hubo_cambios = completo or tope is not None
+        tope = tope or 0
+
+        if completo and inicializada:
+            # Los demás procesos dejan de leer la réplica antes de que se vacíe: ven la
+            # marca en SEGUNDOS_VERSION a lo sumo
+            _marcar_en_copia(True)
+            time.sleep(SEGUNDOS_VERSION)
+        if completo:
+            with conexion.cursor() as cursor:
+                cursor.execute(f'DELETE FROM "{ALIAS}"."{TABLA_ESTADO}"')
+
+        copiadas = {}
+        for modelo in MODELOS_REPLICADOS:
+            if completo:
+                copiadas[modelo] = _copiar_tabla(conexion, modelo, lote)
+            else:
+                copiadas[modelo] = _copiar_cambios(conexion, modelo, tope, lote)
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), conexion.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{TABLA_CAMBIOS}" WHERE "id" <= %s', [tope])
+            cursor.execute(
+                f'INSERT OR REPLACE INTO "{ALIAS}"."{TABLA_ESTADO}" ("id", "ultima") VALUES (1, %s)',
+                [timezone.now().isoformat()],
+            )
+    finally:
+        with conexion.cursor() as cursor:
+            cursor.execute(f'DETACH DATABASE "{ALIAS}"')
+
+    # Si la copia falló a medias la marca queda puesta y las lecturas, en la principal
+    if completo:
+        _marcar_en_copia(False)
+    if hubo_cambios:
+        invalidar('finanzas', 'jornales', 'riegos', 'parcelas', 'trabajadores')
+    return copiadas
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ContabilidadLosliriosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contabilidad_loslirios'
+
+    def ready(self):
+        # Conecta los receptores de señales (índice de trabajadores, etc.)
+        from . import signals  # noqa: F401
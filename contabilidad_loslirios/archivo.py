@@ -0,0 +1,244 @@
+import logging
+import os
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.models.sql.datastructures import BaseTable
+
+from .models import IngresoFinanciero, MovimientoFinanciero, RegistroRiego, registro_trabajo
+
+# Tablas que se archivan por año, con el campo de fecha que decide a qué año pertenece cada fila
+TABLAS_ARCHIVABLES = {
+    registro_trabajo: 'fecha',
+    MovimientoFinanciero: 'fecha',
+    IngresoFinanciero: 'fecha',
+    RegistroRiego: 'inicio',
+}
+
+# SQLite admite por defecto 10 bases adjuntas por conexión (SQLITE_MAX_ATTACHED); se deja
+# una libre para adjuntar la réplica analítica al sincronizarla (ver analitica.py)
+MAXIMO_ADJUNTOS = 9
+
+_ARCHIVO = re.compile(r'^archivo_(\d{4})\.sqlite3$')
+
+logger = logging.getLogger(__name__)
+
+
+def ruta_archivo(anio):
+    return os.path.join(settings.ARCHIVO_DIR, f'archivo_{anio}.sqlite3')
+
+
+def esquema_archivo(anio):
+    """Nombre con el que se adjunta (ATTACH ... AS) el archivo de un año."""
+    return f'archivo_{anio}'
+
+
+def anios_en_disco():
+    try:
+        nombres = os.listdir(settings.ARCHIVO_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(int(coincidencia.group(1)) for coincidencia in map(_ARCHIVO.match, nombres) if coincidencia)
+
+
+#Logic for attaching archives
+def _adjuntados(conexion):
+    with conexion.cursor() as cursor:
+        cursor.execute('PRAGMA database_list')
+        return {fila[1] for fila in cursor.fetchall()}
+
+
+def _adjuntar(conexion, anio):
+    # ATTACH no puede correr dentro de una transacción: se hace al abrir la conexión
+    with conexion.cursor() as cursor:
+        cursor.execute(f'ATTACH DATABASE %s AS "{esquema_archivo(anio)}"', [ruta_archivo(anio)])
+
+
+def adjuntar_archivos(conexion):
+    """
+    Adjunta a una conexión SQLite recién abierta los archivos anuales que haya en
+    ARCHIVO_DIR (ver signals.py) y recuerda en `conexion.anios_archivo` cuáles quedaron
+    disponibles. Los archivos creados después se ven desde la próxima conexión.
+
+    archivar_anio no crea más de MAXIMO_ADJUNTOS archivos. Si igual sobran (copiados a
+    mano a la carpeta) se adjuntan los más recientes y se avisa en el log: abrir la
+    conexión no puede fallar por eso.
+    """
+    anios = anios_en_disco()
+    if len(anios) > MAXIMO_ADJUNTOS:
+        logger.warning(
+            "Hay %s archivos anuales en %s y SQLite adjunta como máximo %s: no se consultan %s.",
+            len(anios), settings.ARCHIVO_DIR, MAXIMO_ADJUNTOS, ', '.join(map(str, anios[:-MAXIMO_ADJUNTOS])),
+        )
+        anios = anios[-MAXIMO_ADJUNTOS:]
+    for anio in anios:
+        _adjuntar(conexion, anio)
+    conexion.anios_archivo = tuple(anios)
+
+
+def anios_archivados(using=DEFAULT_DB_ALIAS):
+    """Años archivados adjuntos a la conexión `using`."""
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return ()
+    conexion.ensure_connection()
+    return getattr(conexion, 'anios_archivo', ())
+
+
+def anios_en_rango(desde=None, hasta=None, using=DEFAULT_DB_ALIAS):
+    """Años archivados que toca el rango [desde, hasta]; sin límites, todos."""
+    return [
+        anio for anio in anios_archivados(using)
+        if (desde is None or anio >= desde.year) and (hasta is None or anio <= hasta.year)
+    ]
+
+
+#Logic for querying archives
+class _TablaArchivo(BaseTable):
+    """
+    Tabla base del FROM leída desde un archivo adjunto: "archivo_2023"."tabla" "tabla".
+    Conserva el alias, así que las columnas, filtros, anotaciones y referencias de
+    subconsultas que arma el ORM no cambian.
+    """
+
+    def __init__(self, table_name, alias, esquema):
+        super().__init__(table_name, alias)
+        self.esquema = esquema
+
+    def as_sql(self, compiler, connection):
+        quote_name = connection.ops.quote_name
+        return f'{quote_name(self.esquema)}.{quote_name(self.table_name)} {quote_name(self.table_alias)}', []
+
+    def relabeled_clone(self, change_map):
+        return self.__class__(self.table_name, change_map.get(self.table_alias, self.table_alias), self.esquema)
+
+    @property
+    def identity(self):
+        return super().identity + (self.esquema,)
+
+
+def en_archivo(queryset, anio):
+    """
+    El mismo `queryset`, pero leído desde el archivo del año `anio`. Admite filtros,
+    anotaciones, agregados, values() y union().
+    """
+    queryset = queryset.all()
+    query = queryset.query
+    alias = query.get_initial_alias()
+    query.alias_map[alias] = _TablaArchivo(query.alias_map[alias].table_name, alias, esquema_archivo(anio))
+    return queryset
+
+
+def partes(queryset, desde=None, hasta=None):
+    """
+    `queryset` sobre la base activa más una copia por cada año archivado del rango
+    (todos si no hay límites). Pensado para consultas agrupadas cuyos resultados se
+    combinan en Python o con union().
+    """
+    return [queryset] + [en_archivo(queryset, anio) for anio in anios_en_rango(desde, hasta, queryset.db)]
+
+
+def con_archivo(queryset, desde=None, hasta=None):
+    """
+    Si el filtro de fechas llega a años archivados, devuelve el UNION ALL de la base
+    activa y esos archivos con el mismo orden que `queryset`; si no, el propio
+    `queryset`. Sin ninguna fecha se consulta solo la base activa.
+
+    El resultado admite count(), slicing (Paginator) e iteración, pero no más filtros.
+    """
+    if desde is None and hasta is None:
+        return queryset
+    anios = anios_en_rango(desde, hasta, queryset.db)
+    if not anios:
+        return queryset
+
+    orden = queryset.query.order_by or (queryset.model._meta.ordering if queryset.query.default_ordering else ())
+    # SQLite no admite ORDER BY dentro de las partes de un UNION: se ordena el resultado
+    base = queryset.order_by()
+    return base.union(*(en_archivo(base, anio) for anio in anios), all=True).order_by(*orden)
+
+
+#Logic for archiving a year
+def _columnas(cursor, esquema, tabla):
+    cursor.execute('PRAGMA "%s".table_info("%s")' % (esquema, tabla))
+    return {fila[1]: fila[2] for fila in cursor.fetchall()}
+
+
+def _preparar_tabla(cursor, modelo, esquema):
+    """Crea la tabla en el archivo con la definición actual, o le agrega las columnas nuevas."""
+    tabla = modelo._meta.db_table
+    existentes = _columnas(cursor, esquema, tabla)
+    if not existentes:
+        cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = %s", [tabla])
+        definicion = cursor.fetchone()[0]
+        cursor.execute(re.sub(r'^CREATE TABLE\s+("[^"]+"|\S+)', f'CREATE TABLE "{esquema}"."{tabla}"', definicion, count=1))
+        columna = modelo._meta.get_field(TABLAS_ARCHIVABLES[modelo]).column
+        cursor.execute(f'CREATE INDEX "{esquema}"."{tabla}_{columna}_archivo" ON "{tabla}" ("{columna}")')
+        return
+    # Migraciones posteriores al archivado: las columnas nuevas quedan en NULL para las filas viejas
+    for columna, tipo in _columnas(cursor, 'main', tabla).items():
+        if columna not in existentes:
+            cursor.execute(f'ALTER TABLE "{esquema}"."{tabla}" ADD COLUMN "{columna}" {tipo}')
+
+
+def sincronizar_esquemas(using=DEFAULT_DB_ALIAS):
+    """Lleva a los archivos adjuntos las columnas que agregaron las migraciones."""
+    conexion = connections[using]
+    with conexion.cursor() as cursor:
+        for anio in anios_archivados(using):
+            for modelo in TABLAS_ARCHIVABLES:
+                _preparar_tabla(cursor, modelo, esquema_archivo(anio))
+
+
+def archivar_anio(anio, using=DEFAULT_DB_ALIAS):
+    """
+    Mueve las filas del año `anio` de las tablas archivables a su archivo anual, en
+    una sola transacción que abarca la base activa y el archivo. Se puede repetir
+    para llevar registros cargados tarde. Devuelve {modelo: filas movidas}.
+    """
+    if anio >= date.today().year:
+        raise ValueError(f"Solo se archivan años cerrados: {anio} no terminó.")
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        raise ValueError("El archivado por año solo está disponible con SQLite.")
+    if conexion.in_atomic_block:
+        raise ValueError("No se puede archivar dentro de una transacción (ATTACH no lo permite).")
+
+    conexion.ensure_connection()
+    esquema = esquema_archivo(anio)
+    en_disco = anios_en_disco()
+    if anio not in en_disco and len(en_disco) >= MAXIMO_ADJUNTOS:
+        # Un archivo más no se podría adjuntar en las próximas conexiones
+        raise ValueError(
+            f"Ya hay {MAXIMO_ADJUNTOS} archivos anuales en {settings.ARCHIVO_DIR}, el máximo que adjunta SQLite: "
+            f"saque de la carpeta los años que ya no se consultan antes de archivar {anio}."
+        )
+    if esquema not in _adjuntados(conexion):
+        if len(getattr(conexion, 'anios_archivo', ())) >= MAXIMO_ADJUNTOS:
+            raise ValueError(f"Ya hay {MAXIMO_ADJUNTOS} archivos adjuntos, el máximo de SQLite.")
+        os.makedirs(settings.ARCHIVO_DIR, exist_ok=True)
+        _adjuntar(conexion, anio)
+        conexion.anios_archivo = tuple(sorted({*getattr(conexion, 'anios_archivo', ()), anio}))
+
+    movidas = {}
+    with transaction.atomic(using=using), conexion.cursor() as cursor:
+        for modelo, campo in TABLAS_ARCHIVABLES.items():
+            _preparar_tabla(cursor, modelo, esquema)
+            tabla = modelo._meta.db_table
+            pk = modelo._meta.pk.column
+            columnas = ', '.join(f'"{campo.column}"' for campo in modelo._meta.concrete_fields)
+            seleccion, params = (
+                modelo.objects.filter(**{f'{campo}__year': anio}).order_by().values('pk').query.sql_with_params()
+            )
+            cursor.execute(
+                f'INSERT INTO "{esquema}"."{tabla}" ({columnas}) '
+                f'SELECT {columnas} FROM "main"."{tabla}" WHERE "{pk}" IN ({seleccion})', params,
+            )
+            insertadas = cursor.rowcount
+            cursor.execute(f'DELETE FROM "main"."{tabla}" WHERE "{pk}" IN ({seleccion})', params)
+            if cursor.rowcount != insertadas:
+                raise DatabaseError(f"{tabla}: se copiaron {insertadas} filas pero se borrarían {cursor.rowcount}.")
+            movidas[modelo] = insertadas
+    return movidas
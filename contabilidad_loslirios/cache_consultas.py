@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache, caches
+
+# Los resultados y los ETags viven en el cache `default`, en memoria de cada proceso.
+# Las versiones, en el cache `versiones`, compartido por todos (ver CACHES en settings):
+# una invalidación en un proceso cambia las claves que usan los demás.
+versiones = caches['versiones']
+
+# Tiempo de vida de los resultados cacheados (la invalidación real la hacen las versiones)
+TIMEOUT_RESULTADOS = 600
+
+# Cada proceso reusa la versión leída del cache compartido durante estos segundos: es
+# lo que puede tardar en ver la invalidación hecha por otro proceso
+SEGUNDOS_VERSION = 2
+
+# grupo -> (versión, momento hasta el que se reusa)
+_versiones_leidas = {}
+
+# Un candado por clave en cálculo (ver obtener_o_calcular)
+_candados = {}
+_candados_lock = threading.Lock()
+
+
+def _clave_version(grupo):
+    return f'datos:version:{grupo}'
+
+
+def version_datos(grupo):
+    """
+    Versión actual de un grupo de datos ('finanzas', 'jornales', ...). Cambia cada
+    vez que se invalida el grupo; si se pierde del cache se regenera con un valor
+    nuevo, nunca con uno ya usado.
+    """
+    ahora = time.monotonic()
+    leida = _versiones_leidas.get(grupo)
+    if leida is not None and ahora < leida[1]:
+        return leida[0]
+    clave = _clave_version(grupo)
+    version = versiones.get(clave)
+    if version is None:
+        versiones.add(clave, time.time_ns(), timeout=None)
+        version = versiones.get(clave)
+    _versiones_leidas[grupo] = (version, ahora + SEGUNDOS_VERSION)
+    return version
+
+
+def invalidar(*grupos):
+    """
+    Marca como obsoletos todos los resultados cacheados que dependen de `grupos`. El
+    proceso que invalida lo ve enseguida; los demás, en SEGUNDOS_VERSION a lo sumo.
+    """
+    for grupo in grupos:
+        version = time.time_ns()
+        versiones.set(_clave_version(grupo), version, timeout=None)
+        _versiones_leidas[grupo] = (version, time.monotonic() + SEGUNDOS_VERSION)
+
+
+def clave_consulta(prefijo, parametros, *grupos):
+    """
+    Arma la clave de cache de una consulta a partir de sus parámetros (por ejemplo
+    request.GET) y de la versión de los grupos de datos que lee.
+    """
+    items = sorted((k, tuple(parametros.getlist(k)) if hasattr(parametros, 'getlist') else parametros[k]) for k in parametros)
+    huella = hashlib.md5(repr(items).encode('utf-8')).hexdigest()
+    versiones = '.'.join(str(version_datos(grupo)) for grupo in grupos)
+    return f'{prefijo}:{versiones}:{huella}'
+
+
+def _candado(clave):
+    with _candados_lock:
+        return _candados.setdefault(clave, threading.Lock())
+
+
+def obtener_o_calcular(prefijo, parametros, grupos, calcular, timeout=TIMEOUT_RESULTADOS):
+    """
+    Devuelve el resultado cacheado para `parametros` o lo calcula y lo guarda. Dentro
+    de un proceso, los pedidos simultáneos de la misma clave esperan al primero en
+    lugar de calcular cada uno lo mismo.
+    """
+    clave = clave_consulta(prefijo, parametros, *grupos)
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado
+    candado = _candado(clave)
+    try:
+        with candado:
+            resultado = cache.get(clave)
+            if resultado is None:
+                resultado = calcular()
+                cache.set(clave, resultado, timeout)
+            return resultado
+    finally:
+        with _candados_lock:
+            if _candados.get(clave) is candado:
+                del _candados[clave]
@@ -0,0 +1,90 @@
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .archivo import partes
+from .models import RegistroRiego
+
+# Versión del formato binario (ver empaquetar)
+VERSION_FORMATO = 1
+
+
+def horas_por_dia(inicio, fin, desde, hasta):
+    """
+    Reparte el intervalo [inicio, fin) en horas por día local, recortado a los días
+    entre `desde` y `hasta`. Un riego de 20:00 a 03:00 suma 4 h a un día y 3 h al
+    siguiente. Devuelve una lista de (ordinal del día, horas).
+    """
+    inicio, fin = timezone.localtime(inicio), timezone.localtime(fin)
+    tramos = []
+    dia = max(inicio.date(), desde)
+    while dia <= min(fin.date(), hasta):
+        medianoche = timezone.make_aware(datetime.combine(dia, time.min))
+        siguiente = timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+        horas = (min(fin, siguiente) - max(inicio, medianoche)).total_seconds() / 3600
+        if horas > 0:
+            tramos.append((dia.toordinal(), horas))
+        dia += timedelta(days=1)
+    return tramos
+
+
+def matriz_riego(desde, hasta):
+    """
+    Horas de riego por parral (fila) y día (columna) entre `desde` y `hasta`
+    inclusive, incluidos los años archivados del rango. Trae solo los riegos que se
+    superponen con el rango (una consulta por base) y los reparte en memoria.
+
+    Devuelve (filas, dias, valores): filas es la lista ordenada de (cabezal, parral) y
+    valores un array('f') de len(filas) * dias en orden fila por fila.
+    """
+    comienzo = timezone.make_aware(datetime.combine(desde, time.min))
+    final = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    riegos = (
+        RegistroRiego.objects.filter(inicio__lt=final, fin__gt=comienzo)
+        .values_list('cabezal', 'parral', 'inicio', 'fin')
+        .order_by()
+    )
+    consultas = partes(riegos, desde - timedelta(days=1), hasta)
+
+    por_parral = {}
+    primer_dia = desde.toordinal()
+    for cabezal, parral, inicio, fin in consultas[0].union(*consultas[1:], all=True):
+        dias = por_parral.setdefault((cabezal, parral), {})
+        for ordinal, horas in horas_por_dia(inicio, fin, desde, hasta):
+            dias[ordinal - primer_dia] = dias.get(ordinal - primer_dia, 0.0) + horas
+
+    filas = sorted(por_parral, key=lambda fila: (fila[0], fila[1].zfill(10)))
+    dias = hasta.toordinal() - primer_dia + 1
+    valores = array('f', bytes(4 * len(filas) * dias))
+    for i, fila in enumerate(filas):
+        for columna, horas in por_parral[fila].items():
+            valores[i * dias + columna] = horas
+    return filas, dias, valores
+
+
+def empaquetar(desde, filas, dias, valores):
+    """
+    Formato binario de la respuesta:
+
+      uint32 LE  largo del encabezado en bytes (incluye el relleno)
+      encabezado JSON UTF-8 {"version", "desde", "dias", "filas": [[cabezal, parral], ...]},
+                 rellenado con espacios hasta múltiplo de 4
+      float32 LE horas, len(filas) * dias valores fila por fila
+
+    El relleno deja los datos alineados para leerlos con un Float32Array sin copiar.
+    """
+    encabezado = json.dumps({
+        'version': VERSION_FORMATO,
+        'desde': desde.isoformat(),
+        'dias': dias,
+        'filas': [list(fila) for fila in filas],
+    }, separators=(',', ':')).encode('utf-8')
+    encabezado += b' ' * (-(4 + len(encabezado)) % 4)
+    if sys.byteorder == 'big':
+        valores = array('f', valores)
+        valores.byteswap()
+    return struct.pack('<I', len(encabezado)) + encabezado + valores.tobytes()
@@ -0,0 +1,55 @@
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+
+from .models import TipoCambio
+
+# Los tipos de cambio se guardan en pesos por unidad de moneda
+MONEDA_BASE = 'ARS'
+
+
+def _cotizacion(moneda, fecha_ref):
+    """
+    Subconsulta con la cotización vigente a la fecha de cada fila: la última
+    cargada en o antes de esa fecha o, si no hay ninguna, la primera posterior.
+    `moneda` puede ser un valor fijo o una referencia (OuterRef) a la fila.
+    """
+    anterior = TipoCambio.objects.filter(moneda=moneda, fecha__lte=OuterRef(fecha_ref)).order_by('-fecha').values('valor')[:1]
+    posterior = TipoCambio.objects.filter(moneda=moneda, fecha__gt=OuterRef(fecha_ref)).order_by('fecha').values('valor')[:1]
+    return Coalesce(Subquery(anterior), Subquery(posterior), output_field=DecimalField())
+
+
+def anotar_monto_normalizado(queryset, moneda_reporte=MONEDA_BASE, fecha_ref='fecha'):
+    """
+    Anota `monto_normalizado`: el monto de cada fila expresado en `moneda_reporte`
+    según la cotización de su fecha. La conversión se resuelve en SQL (subconsultas
+    sobre el índice moneda+fecha), de modo que Sum('monto_normalizado') suma
+    montos comparables sin convertir fila por fila en Python.
+
+    Si una moneda no tiene ninguna cotización cargada el monto queda en NULL y Sum lo
+    omite: los reportes deben avisarlo con monedas_sin_cotizacion.
+    """
+    monto_en_pesos = Case(
+        When(moneda=MONEDA_BASE, then=F('monto')),
+        default=F('monto') * _cotizacion(OuterRef('moneda'), fecha_ref),
+        output_field=DecimalField(),
+    )
+    if moneda_reporte == MONEDA_BASE:
+        monto_normalizado = monto_en_pesos
+    else:
+        monto_normalizado = monto_en_pesos / _cotizacion(moneda_reporte, fecha_ref)
+    return queryset.annotate(
+        monto_normalizado=ExpressionWrapper(monto_normalizado, output_field=DecimalField(max_digits=15, decimal_places=2))
+    )
+
+
+def monedas_sin_cotizacion(monedas, moneda_reporte=MONEDA_BASE):
+    """
+    De las `monedas` de las filas sumadas (más la de reporte), las que no tienen
+    ningún tipo de cambio cargado. Sus montos no se pudieron convertir y faltan en
+    los totales. Devuelve una lista ordenada, vacía si no falta ninguna.
+    """
+    necesarias = ({*monedas, moneda_reporte}) - {MONEDA_BASE, None}
+    if not necesarias:
+        return []
+    con_cotizacion = set(TipoCambio.objects.filter(moneda__in=necesarias).values_list('moneda', flat=True).distinct())
+    return sorted(necesarias - con_cotizacion)
@@ -0,0 +1,43 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _obtener_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CONSULTAS_HILOS', 4),
+                thread_name_prefix='consultas',
+            )
+    return _executor
+
+
+def _aislada(funcion, args):
+    # Cada hilo del pool usa su propia conexión; se cierra igual que al terminar un request
+    close_old_connections()
+    try:
+        return funcion(*args)
+    finally:
+        close_old_connections()
+
+
+async def en_hilo(funcion, *args):
+    """
+    Ejecuta código sincrónico (ORM, cache) en el pool acotado, sin bloquear
+    el event loop. A diferencia del ORM async de Django, que serializa todo en un
+    único hilo, las consultas de requests simultáneos corren a la vez (CONSULTAS_HILOS
+    como máximo). El hilo hereda las variables de contexto (p. ej. @usar_analitica).
+    """
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(_obtener_executor(), contexto.run, _aislada, funcion, args)
+
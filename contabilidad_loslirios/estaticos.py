@@ -0,0 +1,109 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan los .gz
+    brotli = None
+
+# Tipos que vale la pena comprimir (las imágenes y woff2 ya vienen comprimidos)
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.map', '.ttf')
+
+# Un año: los nombres hasheados cambian con el contenido, así que nunca quedan viejos
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage que, al terminar collectstatic, deja junto a cada
+    archivo hasheado una versión .gz (y .br si está instalado brotli) para servirla
+    sin comprimir en cada pedido.
+    """
+
+    # No se copian los .map de las librerías: se ignoran las referencias sourceMappingURL
+    # (si no, collectstatic falla al no encontrarlos)
+    patterns = tuple(
+        (extension, tuple(patron for patron in patrones if 'sourceMappingURL' not in str(patron)))
+        for extension, patrones in ManifestStaticFilesStorage.patterns
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        hasheados = set()
+        for nombre, hasheado, procesado in super().post_process(paths, dry_run, **options):
+            if hasheado and not isinstance(procesado, Exception):
+                hasheados.add(hasheado)
+            yield nombre, hasheado, procesado
+        if dry_run:
+            return
+        for hasheado in sorted(hasheados):
+            if hasheado.endswith(EXTENSIONES_COMPRIMIBLES):
+                self._comprimir(hasheado)
+
+    def _comprimir(self, nombre):
+        ruta = self.path(nombre)
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        variantes = [('.gz', gzip.compress(contenido, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append(('.br', brotli.compress(contenido)))
+        for extension, comprimido in variantes:
+            # Solo se guarda si realmente ahorra bytes
+            if len(comprimido) < len(contenido):
+                with open(ruta + extension, 'wb') as salida:
+                    salida.write(comprimido)
+
+
+class EstaticosInmutablesMiddleware(MiddlewareMixin):
+    """
+    Sirve los archivos de STATIC_ROOT: elige la variante .br/.gz según Accept-Encoding
+    y marca como inmutables los nombres hasheados del manifiesto. Cualquier otra ruta
+    sigue de largo. (Con DEBUG, runserver sirve los estáticos antes de llegar acá.)
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.prefijo = '/' + settings.STATIC_URL.lstrip('/')
+        self._inmutables = None
+
+    @property
+    def inmutables(self):
+        # Nombres hasheados del manifiesto que dejó collectstatic
+        if self._inmutables is None:
+            self._inmutables = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return self._inmutables
+
+    def process_request(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefijo) or not settings.STATIC_ROOT:
+            return None
+        nombre = posixpath.normpath(unquote(request.path[len(self.prefijo):])).lstrip('/')
+        try:
+            ruta = safe_join(settings.STATIC_ROOT, nombre)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(ruta):
+            return None
+
+        content_type, _ = mimetypes.guess_type(nombre)
+        aceptadas = request.headers.get('Accept-Encoding', '')
+        codificacion = None
+        for extension, candidata in (('.br', 'br'), ('.gz', 'gzip')):
+            if candidata in aceptadas and os.path.isfile(ruta + extension):
+                ruta, codificacion = ruta + extension, candidata
+                break
+
+        respuesta = FileResponse(open(ruta, 'rb'), content_type=content_type or 'application/octet-stream')
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+        respuesta.headers['Cache-Control'] = CACHE_INMUTABLE if nombre in self.inmutables else 'no-cache'
+        return respuesta
@@ -1,5 +1,7 @@
 from django import forms
 from .models import *
+from .trabajadores import limpiar_nombre, nombre_registrado
+from .archivo import partes
 #Create forms here
 
 #Administration
@@ -37,7 +39,7 @@ class FormRegistroTrabajo(forms.ModelForm):
             'cantidad', 'unidad_medida', 'precio', 'ubicacion'
         ]
         widgets = {
-            'nombre_trabajador': forms.TextInput(attrs={'placeholder': 'Nombre del Empleado'}),
+            'nombre_trabajador': forms.TextInput(attrs={'placeholder': 'Nombre del Empleado', 'list': 'lista-trabajadores', 'autocomplete': 'off'}),
             'clasificacion': forms.Select(attrs={'class': 'form-control'}),
             'tarea': forms.Select(attrs={'class': 'form-control'}),
             'detalle': forms.TextInput(attrs={'placeholder': 'Detalles adicionales de la tarea'}),
@@ -72,6 +74,11 @@ class FormRegistroTrabajo(forms.ModelForm):
         self.fields['fecha'].widget.attrs.update({'type': 'date'})
         self.fields['cantidad'].widget.attrs.update({'step': '0.5'})
         self.fields['precio'].widget.attrs.update({'step': '1'})
+
+    def clean_nombre_trabajador(self):
+        # Unifica las variantes de escritura con el nombre ya registrado
+        nombre = self.cleaned_data['nombre_trabajador']
+        return nombre_registrado(nombre) or limpiar_nombre(nombre)
 #Form for consult daily work
 class FormConsultaJornal(forms.Form):
     fecha_desde = forms.DateField(
@@ -87,7 +94,7 @@ class FormConsultaJornal(forms.Form):
     nombre_trabajador = forms.CharField(
         max_length=50,
         required=False,
-        widget=forms.TextInput(attrs={'placeholder': 'Nombre del Empleado','class': 'form-control'}),
+        widget=forms.TextInput(attrs={'placeholder': 'Nombre del Empleado','class': 'form-control', 'list': 'lista-trabajadores', 'autocomplete': 'off'}),
         label='Nombre del Trabajador'
     )
     clasificacion = forms.ChoiceField(
@@ -221,8 +228,80 @@ class FormConsultaIngreso(forms.Form):
         return cleaned_data
 
 
+#Form for balance-at-date queries
+class FormConsultaSaldo(forms.Form):
+    finca = forms.ChoiceField(choices=FINCA_CHOICES)
+    moneda = forms.ChoiceField(choices=MONEDA_CHOICES)
+    origen = forms.ChoiceField(choices=[('', 'Todos')] + ORIGEN_CHOICES, required=False)
+    fecha = forms.DateField()
+
+
+#Form for closing a pay period
+class FormCerrarLiquidacion(forms.Form):
+    desde = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Desde'
+    )
+    hasta = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Hasta'
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        desde = cleaned_data.get('desde')
+        hasta = cleaned_data.get('hasta')
+        if desde and hasta and desde > hasta:
+            self.add_error('hasta', 'La fecha "Hasta" no puede ser anterior a la fecha "Desde".')
+        return cleaned_data
+
+#Form for bulk price revisions
+class FormRevisarPrecios(forms.Form):
+    precio = forms.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0,
+        widget=forms.NumberInput(attrs={'step': '0.01', 'class': 'form-control'}),
+        label='Precio nuevo'
+    )
+    clasificacion = forms.ChoiceField(
+        choices=[('', 'Todas')] + list(CLASIFICACION_CHOICES),
+        label='Clasificación',
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    tarea = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Todas')] + [(t, t) for t in sorted({t for tareas in TAREAS_POR_CLASIFICACION.values() for t in tareas})],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Tarea'
+    )
+    fecha_desde = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Fecha Desde'
+    )
+    fecha_hasta = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Fecha Hasta'
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        fecha_desde = cleaned_data.get('fecha_desde')
+        fecha_hasta = cleaned_data.get('fecha_hasta')
+        if fecha_desde and fecha_hasta and fecha_desde > fecha_hasta:
+            self.add_error('fecha_hasta', 'La fecha "Hasta" no puede ser anterior a la fecha "Desde".')
+        if not any(cleaned_data.get(campo) for campo in ('clasificacion', 'tarea', 'fecha_desde', 'fecha_hasta')):
+            raise forms.ValidationError('Indicá al menos una tarea, clasificación o fecha.')
+        return cleaned_data
 
 #Forms for analisis dashboard:
+def _valores_distintos(modelo, campo):
+    """Valores de `campo` en la base activa y en los años archivados, ordenados (opciones de los filtros)."""
+    valores = set()
+    for parte in partes(modelo.objects.values_list(campo, flat=True).distinct().order_by()):
+        valores.update(parte)
+    return sorted(valor for valor in valores if valor is not None)
 #Form for analisis jornales dashboard:
 class FormFiltroDashboardJornales(forms.Form):
     fecha_desde = forms.DateField(
@@ -254,8 +333,8 @@ class FormFiltroDashboardJornales(forms.Form):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['tarea'].choices = [(t, t) for t in registro_trabajo.objects.values_list('tarea', flat=True).distinct().order_by('tarea')]
-        self.fields['ubicacion'].choices = [(u, u) for u in registro_trabajo.objects.values_list('ubicacion', flat=True).distinct().order_by('ubicacion')]
+        self.fields['tarea'].choices = [(t, t) for t in _valores_distintos(registro_trabajo, 'tarea')]
+        self.fields['ubicacion'].choices = [(u, u) for u in _valores_distintos(registro_trabajo, 'ubicacion')]
 #Form for analisis financial movements dashboard:
 class FormFiltroDashboardMovimientos(forms.Form):
     fecha_desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
@@ -270,12 +349,31 @@ class FormFiltroDashboardMovimientos(forms.Form):
     
     moneda = forms.MultipleChoiceField(choices=MONEDA_CHOICES, required=False, widget=forms.CheckboxSelectMultiple)
     forma_pago = forms.MultipleChoiceField(choices=FORMA_PAGO_CHOICES, required=False, widget=forms.CheckboxSelectMultiple)
+    # No filtra: indica en qué moneda se expresan los totales
+    moneda_reporte = forms.ChoiceField(choices=MONEDA_CHOICES, required=False, label='Moneda de reporte', widget=forms.Select(attrs={'class': 'form-control'}))
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        all_classifications = MovimientoFinanciero.objects.values_list('clasificacion', flat=True).distinct().order_by('clasificacion')
-        self.fields['clasificacion'].choices = [(c, c) for c in all_classifications]
+        self.fields['clasificacion'].choices = [(c, c) for c in _valores_distintos(MovimientoFinanciero, 'clasificacion')]
 
+#Form for cash-flow dashboard:
+AGRUPACION_CHOICES = [('anio', 'Año'), ('trimestre', 'Trimestre'), ('mes', 'Mes'), ('dia', 'Día')]
+class FormFiltroFlujoCaja(forms.Form):
+    fecha_desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    fecha_hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    agrupacion = forms.ChoiceField(choices=AGRUPACION_CHOICES, required=False, initial='mes', widget=forms.Select(attrs={'class': 'form-control'}))
+
+    origen = forms.MultipleChoiceField(choices=ORIGEN_CHOICES, required=False, widget=forms.CheckboxSelectMultiple)
+    finca = forms.MultipleChoiceField(choices=FINCA_CHOICES, required=False, widget=forms.CheckboxSelectMultiple)
+    moneda = forms.MultipleChoiceField(choices=MONEDA_CHOICES, required=False, widget=forms.CheckboxSelectMultiple)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        fecha_desde = cleaned_data.get('fecha_desde')
+        fecha_hasta = cleaned_data.get('fecha_hasta')
+        if fecha_desde and fecha_hasta and fecha_desde > fecha_hasta:
+            self.add_error('fecha_hasta', 'La fecha "Hasta" no puede ser anterior a la fecha "Desde".')
+        return cleaned_data
 
 
 #Production
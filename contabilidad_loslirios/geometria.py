@@ -0,0 +1,124 @@
+import math
+
+# Radio medio de la Tierra (WGS84), en metros
+RADIO_TIERRA = 6371008.8
+
+# Diferencia relativa entre la superficie del polígono y la del CSV a partir de la cual se avisa
+TOLERANCIA_SUPERFICIE = 0.10
+
+
+def _anillo(coordenadas):
+    """Vértices [lat, lon] sin repetir el primero al final (el KML cierra el anillo)."""
+    puntos = [(float(lat), float(lon)) for lat, lon in coordenadas]
+    if len(puntos) > 1 and puntos[0] == puntos[-1]:
+        puntos.pop()
+    return puntos
+
+
+def area_geodesica_ha(coordenadas):
+    """
+    Superficie en hectáreas de un polígono [[lat, lon], ...] sobre la esfera
+    (fórmula del exceso esférico por trapecios, la misma que usan Leaflet.draw y
+    Turf). Para parcelas de unas pocas hectáreas el error es muy inferior al 1 %.
+    """
+    puntos = _anillo(coordenadas)
+    if len(puntos) < 3:
+        return 0.0
+    total = 0.0
+    for (lat1, lon1), (lat2, lon2) in zip(puntos, puntos[1:] + puntos[:1]):
+        total += math.radians(lon2 - lon1) * (2 + math.sin(math.radians(lat1)) + math.sin(math.radians(lat2)))
+    return abs(total) * RADIO_TIERRA ** 2 / 2 / 10000
+
+
+def centroide(coordenadas):
+    """
+    Centroide (lat, lon) del área del polígono, calculado en una proyección
+    equirectangular local; si el polígono es degenerado, el promedio de sus vértices.
+    """
+    puntos = _anillo(coordenadas)
+    if not puntos:
+        return None
+    escala = math.cos(math.radians(sum(lat for lat, _ in puntos) / len(puntos)))
+    doble_area = cx = cy = 0.0
+    for (lat1, lon1), (lat2, lon2) in zip(puntos, puntos[1:] + puntos[:1]):
+        x1, x2 = lon1 * escala, lon2 * escala
+        cruz = x1 * lat2 - x2 * lat1
+        doble_area += cruz
+        cx += (x1 + x2) * cruz
+        cy += (lat1 + lat2) * cruz
+    if abs(doble_area) < 1e-18:
+        return (sum(lat for lat, _ in puntos) / len(puntos), sum(lon for _, lon in puntos) / len(puntos))
+    return (cy / (3 * doble_area), cx / (3 * doble_area) / escala)
+
+
+def caja(coordenadas):
+    """(lat_min, lon_min, lat_max, lon_max) del polígono."""
+    puntos = _anillo(coordenadas)
+    if not puntos:
+        return None
+    lats = [lat for lat, _ in puntos]
+    lons = [lon for _, lon in puntos]
+    return (min(lats), min(lons), max(lats), max(lons))
+
+
+def diferencia_superficie(area_ha, superficie_ha):
+    """Diferencia relativa entre la superficie medida y la declarada (None si falta alguna)."""
+    if not area_ha or not superficie_ha:
+        return None
+    return abs(area_ha - superficie_ha) / superficie_ha
+
+
+#Logic for encoded polylines
+# Decimales de las coordenadas codificadas (polyline6: ~0,1 m, de sobra para un KML)
+PRECISION_POLILINEA = 6
+
+
+def _codificar_numero(valor):
+    valor = ~(valor << 1) if valor < 0 else valor << 1
+    caracteres = []
+    while valor >= 0x20:
+        caracteres.append(chr((0x20 | (valor & 0x1f)) + 63))
+        valor >>= 5
+    caracteres.append(chr(valor + 63))
+    return ''.join(caracteres)
+
+
+def codificar_polilinea(coordenadas, precision=PRECISION_POLILINEA):
+    """
+    [[lat, lon], ...] en el formato "encoded polyline" de Google: cada coordenada se
+    guarda como diferencia con la anterior, en base 64 sobre ASCII imprimible. Un
+    polígono de parcela ocupa alrededor de un cuarto que su lista JSON.
+    """
+    factor = 10 ** precision
+    partes = []
+    lat_anterior = lon_anterior = 0
+    for lat, lon in coordenadas:
+        lat, lon = round(float(lat) * factor), round(float(lon) * factor)
+        partes.append(_codificar_numero(lat - lat_anterior))
+        partes.append(_codificar_numero(lon - lon_anterior))
+        lat_anterior, lon_anterior = lat, lon
+    return ''.join(partes)
+
+
+def decodificar_polilinea(texto, precision=PRECISION_POLILINEA):
+    """Inversa de codificar_polilinea: devuelve [[lat, lon], ...]."""
+    factor = 10 ** precision
+    coordenadas = []
+    indice = lat = lon = 0
+    valores = []
+    while indice < len(texto):
+        resultado = desplazamiento = 0
+        while True:
+            byte = ord(texto[indice]) - 63
+            indice += 1
+            resultado |= (byte & 0x1f) << desplazamiento
+            desplazamiento += 5
+            if byte < 0x20:
+                break
+        valores.append(~(resultado >> 1) if resultado & 1 else resultado >> 1)
+        if len(valores) == 2:
+            lat += valores[0]
+            lon += valores[1]
+            coordenadas.append([lat / factor, lon / factor])
+            valores = []
+    return coordenadas
@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+from .archivo import partes
+from .models import ORIGEN_CHOICES, IngresoFinanciero, MovimientoFinanciero, SaldoMensual
+
+CERO = Decimal('0.00')
+
+
+def inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + 1, 1, 1) if mes.month == 12 else date(mes.year, mes.month + 1, 1)
+
+
+def clave_saldo(movimiento):
+    """Clave (finca, moneda, origen, mes) del saldo que afecta un ingreso o egreso."""
+    return (movimiento.finca, movimiento.moneda, movimiento.origen, inicio_mes(movimiento.fecha))
+
+
+def _neto(finca, moneda, origen, desde, hasta_exclusive):
+    """Ingresos y egresos de una cuenta en [desde, hasta_exclusive), incluidos los años archivados."""
+    filtros = {'finca': finca, 'moneda': moneda, 'origen': origen, 'fecha__gte': desde, 'fecha__lt': hasta_exclusive}
+    hasta = hasta_exclusive - timedelta(days=1)
+    ingresos = egresos = CERO
+    for parte in partes(IngresoFinanciero.objects.filter(**filtros), desde, hasta):
+        ingresos += parte.aggregate(total=Sum('monto'))['total'] or CERO
+    for parte in partes(MovimientoFinanciero.objects.filter(**filtros), desde, hasta):
+        egresos += parte.aggregate(total=Sum('monto'))['total'] or CERO
+    return ingresos, egresos
+
+
+def recalcular_mes(finca, moneda, origen, mes):
+    """
+    Recalcula la foto de un mes y corre la diferencia sobre los meses siguientes.
+    Solo se leen los movimientos de ese mes: el costo no depende del historial.
+    """
+    cuenta = {'finca': finca, 'moneda': moneda, 'origen': origen}
+    with transaction.atomic():
+        # Primero se toma la foto del mes: dos recálculos concurrentes del mismo mes
+        # no pueden leer los movimientos antes de que el otro termine de escribir
+        actual = SaldoMensual.objects.select_for_update().filter(**cuenta, mes=mes).first()
+        ingresos, egresos = _neto(finca, moneda, origen, mes, _mes_siguiente(mes))
+        saldo_previo = (
+            SaldoMensual.objects.filter(**cuenta, mes__lt=mes)
+            .order_by('-mes').values_list('saldo_acumulado', flat=True).first()
+        ) or CERO
+        neto_anterior = (actual.ingresos - actual.egresos) if actual else CERO
+        delta = (ingresos - egresos) - neto_anterior
+
+        if ingresos or egresos:
+            SaldoMensual.objects.update_or_create(
+                **cuenta, mes=mes,
+                defaults={'ingresos': ingresos, 'egresos': egresos, 'saldo_acumulado': saldo_previo + ingresos - egresos},
+            )
+        elif actual:
+            # El mes quedó sin movimientos: su foto repetiría la del mes anterior
+            actual.delete()
+        if delta:
+            SaldoMensual.objects.filter(**cuenta, mes__gt=mes).update(saldo_acumulado=F('saldo_acumulado') + delta)
+
+
+def saldo_a_fecha(finca, moneda, fecha, origen=None):
+    """
+    Saldo de una finca en una moneda al cierre de `fecha`: una búsqueda indexada de
+    la última foto mensual anterior más los movimientos del mes en curso.
+    Sin `origen` se suman las cuentas oficial y no oficial.
+    """
+    origenes = [origen] if origen else [codigo for codigo, _ in ORIGEN_CHOICES]
+    mes = inicio_mes(fecha)
+    saldo = CERO
+    for cuenta_origen in origenes:
+        saldo += (
+            SaldoMensual.objects.filter(finca=finca, moneda=moneda, origen=cuenta_origen, mes__lt=mes)
+            .order_by('-mes').values_list('saldo_acumulado', flat=True).first()
+        ) or CERO
+        ingresos, egresos = _neto(finca, moneda, cuenta_origen, mes, fecha + timedelta(days=1))
+        saldo += ingresos - egresos
+    return saldo
+
+
+def reconstruir_saldos():
+    """
+    Regenera todas las fotos mensuales desde cero con una consulta agrupada por
+    tabla (y por cada archivo anual). Devuelve la cantidad de fotos creadas.
+    """
+    por_mes = {}
+    for modelo, campo in ((IngresoFinanciero, 'ingresos'), (MovimientoFinanciero, 'egresos')):
+        agrupadas = (
+            modelo.objects.annotate(mes=TruncMonth('fecha'))
+            .values('finca', 'moneda', 'origen', 'mes')
+            .annotate(total=Sum('monto')).order_by()
+        )
+        for fila in (fila for parte in partes(agrupadas) for fila in parte):
+            clave = (fila['finca'], fila['moneda'], fila['origen'], fila['mes'])
+            por_mes.setdefault(clave, {'ingresos': CERO, 'egresos': CERO})[campo] += fila['total']
+
+    fotos = []
+    saldos = {}
+    for finca, moneda, origen, mes in sorted(por_mes):
+        totales = por_mes[(finca, moneda, origen, mes)]
+        saldo = saldos.get((finca, moneda, origen), CERO) + totales['ingresos'] - totales['egresos']
+        saldos[(finca, moneda, origen)] = saldo
+        fotos.append(SaldoMensual(
+            finca=finca, moneda=moneda, origen=origen, mes=mes,
+            ingresos=totales['ingresos'], egresos=totales['egresos'], saldo_acumulado=saldo,
+        ))
+
+    with transaction.atomic():
+        SaldoMensual.objects.all().delete()
+        SaldoMensual.objects.bulk_create(fotos, batch_size=500)
+    return len(fotos)
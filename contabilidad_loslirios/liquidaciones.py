@@ -0,0 +1,121 @@
+import csv
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .archivo import partes
+from .models import Liquidacion, PeriodoLiquidacion, Trabajador, registro_trabajo
+from .trabajadores import limpiar_nombre, normalizar_nombre
+
+CERO = Decimal('0.00')
+
+
+def calcular_liquidaciones(desde, hasta):
+    """
+    Liquidación de cada trabajador entre `desde` y `hasta` (inclusive): una sola
+    consulta agrupada por trabajador, tarea y unidad de medida (más los años
+    archivados que toque el rango); el resto se arma en memoria.
+
+    Las variantes de escritura de un nombre se juntan por su forma normalizada y
+    se muestran con el nombre de la tabla de trabajadores. Devuelve una lista de
+    dicts {'nombre_trabajador', 'cantidad_jornales', 'total', 'detalle'} ordenada
+    por nombre.
+    """
+    agrupadas = (
+        registro_trabajo.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+        .values('nombre_trabajador', 'tarea', 'unidad_medida')
+        .annotate(jornales=Count('pk'), cantidad=Sum('cantidad'), monto=Sum('monto_total'))
+        .order_by()
+    )
+    consultas = partes(agrupadas, desde, hasta)
+
+    # (trabajador normalizado, tarea, unidad) -> [jornales, cantidad, monto]
+    acumulado = {}
+    nombres = {}
+    for fila in consultas[0].union(*consultas[1:], all=True):
+        normalizado = normalizar_nombre(fila['nombre_trabajador'])
+        nombres.setdefault(normalizado, fila['nombre_trabajador'])
+        totales = acumulado.setdefault((normalizado, fila['tarea'], fila['unidad_medida']), [0, CERO, CERO])
+        totales[0] += fila['jornales']
+        totales[1] += fila['cantidad'] or CERO
+        totales[2] += fila['monto'] or CERO
+
+    canonicos = dict(Trabajador.objects.filter(nombre_normalizado__in=nombres).values_list('nombre_normalizado', 'nombre'))
+    liquidaciones = {}
+    for (normalizado, tarea, unidad), (jornales, cantidad, monto) in sorted(acumulado.items()):
+        liquidacion = liquidaciones.setdefault(normalizado, {
+            'nombre_trabajador': canonicos.get(normalizado) or limpiar_nombre(nombres[normalizado]),
+            'cantidad_jornales': 0,
+            'total': CERO,
+            'detalle': [],
+        })
+        liquidacion['cantidad_jornales'] += jornales
+        liquidacion['total'] += monto
+        liquidacion['detalle'].append({
+            'tarea': tarea,
+            'unidad_medida': unidad,
+            'jornales': jornales,
+            'cantidad': str(cantidad),
+            'monto': str(monto),
+        })
+    return sorted(liquidaciones.values(), key=lambda liquidacion: liquidacion['nombre_trabajador'])
+
+
+def _bloquear_periodos():
+    """
+    Toma el bloqueo de escritura de los períodos antes de buscar superposiciones: de
+    dos cierres simultáneos de rangos que se pisan, el segundo espera al primero y
+    después ve su período. SQLite empieza las transacciones en modo diferido y solo
+    bloquea con la primera escritura, así que se hace una que no toca ninguna fila.
+    """
+    tabla = PeriodoLiquidacion._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'UPDATE "{tabla}" SET "id" = "id" WHERE 0')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'LOCK TABLE "{tabla}" IN SHARE ROW EXCLUSIVE MODE')
+
+
+def cerrar_periodo(desde, hasta, usuario=None):
+    """
+    Calcula y guarda las liquidaciones del período con un bulk_create. Falla con
+    ValueError si el rango no es válido, se superpone con otro período cerrado o
+    no tiene jornales.
+    """
+    if hasta < desde:
+        raise ValueError("La fecha hasta no puede ser anterior a la fecha desde.")
+    with transaction.atomic():
+        _bloquear_periodos()
+        superpuesto = PeriodoLiquidacion.objects.filter(desde__lte=hasta, hasta__gte=desde).first()
+        if superpuesto:
+            raise ValueError(f"El rango se superpone con el período ya cerrado {superpuesto}.")
+        calculadas = calcular_liquidaciones(desde, hasta)
+        if not calculadas:
+            raise ValueError("No hay jornales cargados en ese rango.")
+
+        periodo = PeriodoLiquidacion.objects.create(
+            desde=desde, hasta=hasta, cerrado_por=usuario,
+            total=sum((liquidacion['total'] for liquidacion in calculadas), CERO),
+            cantidad_trabajadores=len(calculadas),
+        )
+        Liquidacion.objects.bulk_create(
+            [Liquidacion(periodo=periodo, **liquidacion) for liquidacion in calculadas], batch_size=500,
+        )
+    return periodo
+
+
+def escribir_liquidaciones_csv(archivo, periodo):
+    """Una fila por trabajador, tarea y unidad, y una fila de total por trabajador."""
+    writer = csv.writer(archivo)
+    writer.writerow(['Desde', 'Hasta', 'Trabajador', 'Tarea', 'Unidad Medida', 'Jornales', 'Cantidad', 'Monto'])
+    desde, hasta = periodo.desde.strftime('%Y-%m-%d'), periodo.hasta.strftime('%Y-%m-%d')
+    for liquidacion in periodo.liquidaciones.all():
+        for fila in liquidacion.detalle:
+            writer.writerow([
+                desde, hasta, liquidacion.nombre_trabajador, fila['tarea'], fila['unidad_medida'],
+                fila['jornales'], fila['cantidad'], fila['monto'],
+            ])
+        writer.writerow([
+            desde, hasta, liquidacion.nombre_trabajador, 'TOTAL', '', liquidacion.cantidad_jornales, '', f"{liquidacion.total:.2f}",
+        ])
@@ -0,0 +1,40 @@
+# contabilidad_loslirios/management/commands/archivar_anio.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from contabilidad_loslirios.analitica import replica_disponible, sincronizar
+from contabilidad_loslirios.archivo import archivar_anio, ruta_archivo
+from contabilidad_loslirios.cache_consultas import invalidar
+
+
+class Command(BaseCommand):
+    help = 'Mueve un año cerrado de jornales, egresos, ingresos y riegos a su archivo SQLite anual'
+
+    def add_arguments(self, parser):
+        parser.add_argument('anio', type=int, help='Año a archivar (debe estar cerrado)')
+        parser.add_argument('--compactar', action='store_true', help='Ejecuta VACUUM para achicar la base activa al terminar')
+
+    def handle(self, *args, **options):
+        anio = options['anio']
+        self.stdout.write(f"Archivando {anio} en {ruta_archivo(anio)}...")
+        try:
+            movidas = archivar_anio(anio)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for modelo, cantidad in movidas.items():
+            self.stdout.write(f"  {modelo._meta.verbose_name_plural}: {cantidad}")
+
+        # Los listados sin fechas dejan de ver esas filas
+        invalidar('finanzas', 'jornales', 'riegos')
+
+        if replica_disponible():
+            # Si no, la réplica tendría esas filas a la vez que el archivo
+            self.stdout.write("Sincronizando la réplica analítica...")
+            sincronizar()
+
+        if options['compactar']:
+            self.stdout.write("Compactando la base activa...")
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM main')
+        self.stdout.write(self.style.SUCCESS(f"¡Listo! Se archivaron {sum(movidas.values())} registros de {anio}."))
@@ -0,0 +1,53 @@
+# contabilidad_loslirios/management/commands/cargar_tipos_cambio.py
+
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from contabilidad_loslirios.cache_consultas import invalidar
+from contabilidad_loslirios.models import TipoCambio, MONEDA_CHOICES
+
+
+class Command(BaseCommand):
+    help = 'Carga en bloque tipos de cambio desde un CSV con columnas fecha,moneda,valor (valor en pesos por unidad)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta al CSV de cotizaciones')
+        parser.add_argument('--lote', type=int, default=500, help='Filas por INSERT (por defecto 500)')
+
+    def handle(self, *args, **options):
+        monedas_validas = {codigo for codigo, _ in MONEDA_CHOICES}
+        cotizaciones = {}
+        errores = 0
+
+        try:
+            with open(options['archivo'], mode='r', encoding='utf-8') as csv_file:
+                for numero, row in enumerate(csv.DictReader(csv_file), start=2):
+                    try:
+                        fecha = datetime.strptime(row['fecha'].strip(), '%Y-%m-%d').date()
+                        moneda = row['moneda'].strip().upper()
+                        valor = Decimal(row['valor'].strip().replace(',', '.'))
+                    except (KeyError, ValueError, InvalidOperation):
+                        self.stdout.write(self.style.WARNING(f"Línea {numero}: formato inválido, se omite."))
+                        errores += 1
+                        continue
+                    if moneda not in monedas_validas:
+                        self.stdout.write(self.style.WARNING(f"Línea {numero}: moneda '{moneda}' desconocida, se omite."))
+                        errores += 1
+                        continue
+                    # Si una fecha se repite en el archivo, gana la última fila
+                    cotizaciones[(moneda, fecha)] = TipoCambio(fecha=fecha, moneda=moneda, valor=valor)
+        except FileNotFoundError:
+            raise CommandError(f"No se encontró el archivo {options['archivo']}")
+
+        # Un solo INSERT ... ON CONFLICT por lote: las fechas ya cargadas se actualizan
+        TipoCambio.objects.bulk_create(
+            cotizaciones.values(),
+            batch_size=options['lote'],
+            update_conflicts=True,
+            unique_fields=['moneda', 'fecha'],
+            update_fields=['valor'],
+        )
+        # bulk_create no dispara señales: los reportes convertidos con las cotizaciones viejas se descartan a mano
+        invalidar('finanzas')
+        self.stdout.write(self.style.SUCCESS(f"Se cargaron {len(cotizaciones)} cotizaciones ({errores} líneas omitidas)."))
@@ -5,6 +5,7 @@ import xml.etree.ElementTree as ET
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from contabilidad_loslirios.models import Parcela
+from contabilidad_loslirios.geometria import TOLERANCIA_SUPERFICIE, diferencia_superficie
 import os
 import re
 
@@ -105,4 +106,11 @@ class Command(BaseCommand):
                 )
                 contador_parcelas += 1
 
+                # El área medida sobre el polígono debería coincidir con la superficie del CSV
+                diferencia = diferencia_superficie(obj.area_ha, obj.superficie_ha)
+                if diferencia is not None and diferencia > TOLERANCIA_SUPERFICIE:
+                    self.stdout.write(self.style.WARNING(
+                        f"ADVERTENCIA: '{nombre_final}' mide {obj.area_ha:.2f} ha en el mapa y {obj.superficie_ha} ha en el CSV ({diferencia:.0%} de diferencia)."
+                    ))
+
         self.stdout.write(self.style.SUCCESS(f"\n¡Proceso de actualización completado! Se revisaron {contador_parcelas} parcelas."))
\ No newline at end of file
@@ -0,0 +1,109 @@
+# contabilidad_loslirios/management/commands/microbenchmark_handlers.py
+
+# Microbenchmark en proceso: los pedidos pasan por los clientes de prueba de Django
+# (Client y AsyncClient), que llaman al handler directamente. No hay servidor, red,
+# workers ni event loop de uvicorn, así que los números comparan el costo de las
+# vistas sync y async dentro de un mismo proceso, no el rendimiento de un despliegue.
+# Para medir servidores reales (gunicorn, uvicorn) usar prueba_carga --servidor.
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+# Vistas de lectura convertidas a async; se pueden reemplazar con --url
+URLS_POR_DEFECTO = [
+    '/visualizacion/analisis/movimientos/',
+    '/api/visualizacion/movimientos/line-chart-data/?agrupacion=mes',
+    '/api/visualizacion/movimientos/kpis/',
+    '/api/parcelas/',
+    '/api/administracion/get-trabajadores/?q=a',
+]
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark en proceso de las vistas de lectura por el handler de prueba sync (Client) y el async (AsyncClient); para servidores reales usar prueba_carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help='Usuario con permisos de análisis con el que se hacen los pedidos')
+        parser.add_argument('--url', action='append', dest='urls', help='URL a pedir (se puede repetir); por defecto las vistas de los dashboards')
+        parser.add_argument('--concurrencia', type=int, default=10, help='Pedidos simultáneos (por defecto 10)')
+        parser.add_argument('--pedidos', type=int, default=200, help='Pedidos por URL y por modo (por defecto 200)')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+
+        # Una sola sesión compartida por todos los clientes, como un navegador con varias pestañas
+        cliente = Client()
+        cliente.force_login(usuario)
+        self.sesion = cliente.cookies[settings.SESSION_COOKIE_NAME].value
+
+        # Los clientes de prueba piden al host 'testserver'
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                self._comparar(options['urls'] or URLS_POR_DEFECTO, options['pedidos'], options['concurrencia'])
+        finally:
+            cliente.logout()
+
+    def _comparar(self, urls, pedidos, concurrencia):
+        for url in urls:
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            # Un pedido previo por modo para que el primer resultado no pague la carga inicial
+            self._medir_sync(url, 1, 1)
+            asyncio.run(self._medir_async(url, 1, 1))
+            self._informar('Client (sync)      ', self._medir_sync(url, pedidos, concurrencia))
+            self._informar('AsyncClient (async)', asyncio.run(self._medir_async(url, pedidos, concurrencia)))
+
+    def _cliente(self, clase):
+        cliente = clase()
+        cliente.cookies[settings.SESSION_COOKIE_NAME] = self.sesion
+        return cliente
+
+    def _medir_sync(self, url, pedidos, concurrencia):
+        def pedir(_):
+            cliente = self._cliente(Client)
+            inicio = time.perf_counter()
+            respuesta = cliente.get(url)
+            return time.perf_counter() - inicio, respuesta.status_code
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resultados = list(pool.map(pedir, range(pedidos)))
+        return time.perf_counter() - inicio, resultados
+
+    async def _medir_async(self, url, pedidos, concurrencia):
+        limite = asyncio.Semaphore(concurrencia)
+
+        async def pedir():
+            async with limite:
+                cliente = self._cliente(AsyncClient)
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(url)
+                return time.perf_counter() - inicio, respuesta.status_code
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(pedir() for _ in range(pedidos)))
+        return time.perf_counter() - inicio, resultados
+
+    def _informar(self, modo, medicion):
+        duracion, resultados = medicion
+        latencias = sorted(latencia for latencia, _ in resultados)
+        errores = sum(1 for _, estado in resultados if estado != 200)
+        p95 = latencias[max(0, int(len(latencias) * 0.95) - 1)]
+        linea = (
+            f"  {modo}: {len(resultados) / duracion:8.1f} pedidos/s   "
+            f"p50 {statistics.median(latencias) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms"
+        )
+        if errores:
+            self.stdout.write(self.style.WARNING(f"{linea}   {errores} respuestas distintas de 200"))
+        else:
+            self.stdout.write(self.style.SUCCESS(linea))
@@ -0,0 +1,301 @@
+# contabilidad_loslirios/management/commands/prueba_carga.py
+
+import os
+import random
+import secrets
+import socket
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from contabilidad_loslirios.forms import RIEGO_DATA, TAREAS_POR_CLASIFICACION, unidades_de_medida
+from contabilidad_loslirios.models import RegistroRiego, registro_trabajo
+
+# Marca de los registros que crea la prueba, para poder borrarlos al terminar
+MARCA = 'prueba_carga'
+
+# Escenario: (método, nombre de la URL, argumentos, peso por defecto en la mezcla)
+ESCENARIOS = {
+    'cargar_jornal': ('POST', 'cargar_jornal', [], 2),
+    'cargar_riego': ('POST', 'cargar_riego', [], 2),
+    'consultar_jornal': ('GET', 'consultar_jornal', [], 3),
+    'consultar_movimiento': ('GET', 'consultar_movimiento', [], 2),
+    'consultar_ingresos': ('GET', 'consultar_ingresos', [], 1),
+    'consultar_riego': ('GET', 'consultar_riego', [], 2),
+    'analisis_movimientos': ('GET', 'analisis_movimientos', [], 1),
+    'analisis_jornales_kpis': ('GET', 'jornales_data_api', ['kpis'], 2),
+    'analisis_movimientos_kpis': ('GET', 'movimientos_data_api', ['kpis'], 2),
+    'analisis_flujo_caja': ('GET', 'flujo_caja_data_api', [], 1),
+}
+
+# Mensaje de SQLite cuando no consigue el bloqueo: se cuenta en el log del servidor (--log)
+TEXTO_BLOQUEO = 'database is locked'
+
+# Servidores que comparten esta base: solo contra ellos se borra al final lo que creó la prueba
+SERVIDORES_LOCALES = {'localhost', '127.0.0.1', '::1'}
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    """Un POST correcto responde con una redirección: se mide esa respuesta, no la página siguiente."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _datos_jornal(azar, trabajadores):
+    clasificacion = azar.choice(list(TAREAS_POR_CLASIFICACION))
+    filas = azar.randint(1, 3)
+    datos = {'form-TOTAL_FORMS': str(filas), 'form-INITIAL_FORMS': '0'}
+    for i in range(filas):
+        datos.update({
+            f'form-{i}-fecha': date.today().isoformat(),
+            f'form-{i}-nombre_trabajador': azar.choice(trabajadores),
+            f'form-{i}-clasificacion': clasificacion,
+            f'form-{i}-tarea': azar.choice(TAREAS_POR_CLASIFICACION[clasificacion]),
+            f'form-{i}-detalle': MARCA,
+            f'form-{i}-cantidad': str(azar.choice([0.5, 1, 1, 1, 2])),
+            f'form-{i}-unidad_medida': unidades_de_medida[0][0],
+            f'form-{i}-precio': str(azar.randint(8, 15) * 1000),
+            f'form-{i}-ubicacion': f'Parral {azar.randint(1, 21)}',
+        })
+    return datos
+
+
+def _datos_riego(azar):
+    cabezal = azar.choice(list(RIEGO_DATA))
+    parral = azar.choice(list(RIEGO_DATA[cabezal]))
+    inicio = datetime.now().replace(second=0, microsecond=0) - timedelta(hours=azar.randint(2, 48))
+    return {
+        'cabezal': cabezal,
+        'parral': parral,
+        'valvula_abierta': azar.choice(RIEGO_DATA[cabezal][parral]),
+        'inicio': inicio.strftime('%Y-%m-%dT%H:%M'),
+        'fin': (inicio + timedelta(hours=azar.randint(1, 8))).strftime('%Y-%m-%dT%H:%M'),
+        'fertilizante_nombre': '',
+        'fertilizante_litros': '',
+        'responsable': MARCA,
+    }
+
+
+def _pedido(escenario, ruta, azar, trabajadores):
+    """(url relativa, cuerpo o None) para un pedido del escenario."""
+    if escenario == 'cargar_jornal':
+        return ruta, _datos_jornal(azar, trabajadores)
+    if escenario == 'cargar_riego':
+        return ruta, _datos_riego(azar)
+    if escenario.startswith('consultar_'):
+        # Distintas páginas, como quien recorre el listado
+        return f'{ruta}?page={azar.randint(1, 5)}', None
+    return ruta, None
+
+
+def usuario_virtual(servidor, cookies, csrf, mezcla, trabajadores, duracion, pausa, espera, semilla):
+    """
+    Un usuario simulado: elige escenarios según los pesos de la mezcla y los pide uno
+    tras otro durante `duracion` segundos, con una pausa al azar entre 0 y `pausa`.
+    Va a nivel de módulo para poder correr en otro proceso.
+
+    Devuelve una lista de (escenario, segundos, resultado), donde resultado es 'ok',
+    'invalido' (el formulario volvió con errores), 'timeout', 'conexion' o el código
+    HTTP inesperado. Las causas de los 500 se leen del log del servidor, no de la
+    respuesta: con DEBUG = False no dicen nada.
+    """
+    azar = random.Random(semilla)
+    abridor = urllib.request.build_opener(_SinRedirecciones)
+    encabezados = {'Cookie': cookies, 'X-CSRFToken': csrf}
+    nombres = list(mezcla)
+    pesos = [mezcla[nombre][2] for nombre in nombres]
+
+    resultados = []
+    final = time.monotonic() + duracion
+    while time.monotonic() < final:
+        escenario = azar.choices(nombres, pesos)[0]
+        metodo, ruta = mezcla[escenario][:2]
+        url, datos = _pedido(escenario, ruta, azar, trabajadores)
+        cuerpo = urllib.parse.urlencode({**datos, 'csrfmiddlewaretoken': csrf}).encode() if datos else None
+        pedido = urllib.request.Request(servidor + url, data=cuerpo, headers=encabezados, method=metodo)
+
+        inicio = time.perf_counter()
+        try:
+            with abridor.open(pedido, timeout=espera) as respuesta:
+                respuesta.read()
+            # Los formularios con errores se vuelven a mostrar con 200 en lugar de redirigir
+            resultado = 'ok' if metodo == 'GET' else 'invalido'
+        except urllib.error.HTTPError as error:
+            resultado = 'ok' if error.code == 302 and metodo == 'POST' else error.code
+        except (TimeoutError, socket.timeout):
+            resultado = 'timeout'
+        except urllib.error.URLError as error:
+            resultado = 'timeout' if isinstance(error.reason, (TimeoutError, socket.timeout)) else 'conexion'
+        resultados.append((escenario, time.perf_counter() - inicio, resultado))
+
+        if pausa:
+            time.sleep(azar.uniform(0, pausa))
+    return resultados
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga: varios usuarios simultáneos cargan jornales y riegos y consultan listados y dashboards contra un servidor en marcha'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help='Usuario con permisos de carga, consulta y análisis con el que se hacen los pedidos')
+        parser.add_argument('--servidor', default='http://127.0.0.1:8000', help='URL del servidor a probar (por defecto http://127.0.0.1:8000)')
+        parser.add_argument('--usuarios', type=int, default=10, help='Usuarios simultáneos (por defecto 10)')
+        parser.add_argument('--modo', choices=['hilos', 'procesos'], default='hilos', help='Un hilo o un proceso por usuario (por defecto hilos)')
+        parser.add_argument('--duracion', type=float, default=30, help='Segundos de prueba (por defecto 30)')
+        parser.add_argument('--pausa', type=float, default=1.0, help='Pausa máxima entre pedidos de un usuario, en segundos (por defecto 1; 0 para ir a fondo)')
+        parser.add_argument('--espera', type=float, default=30, help='Segundos hasta dar un pedido por vencido (por defecto 30)')
+        parser.add_argument('--mezcla', help='Pesos por escenario, p. ej. "cargar_riego=5,consultar_riego=1"; los no nombrados quedan fuera. Escenarios: ' + ', '.join(ESCENARIOS))
+        parser.add_argument('--semilla', type=int, help='Semilla del azar, para repetir exactamente la misma secuencia de pedidos')
+        parser.add_argument('--conservar', action='store_true', help='No borrar al final los jornales y riegos creados por la prueba')
+        parser.add_argument('--log', help='Archivo de log del servidor: se cuentan los bloqueos de la base registrados durante la prueba')
+
+    def handle(self, *args, **options):
+        if options['usuarios'] < 1 or options['duracion'] <= 0:
+            raise CommandError('--usuarios y --duracion tienen que ser mayores que cero')
+        try:
+            usuario = get_user_model().objects.get(username=options['usuario'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+
+        mezcla = self._mezcla(options['mezcla'])
+        trabajadores = list(
+            registro_trabajo.objects.exclude(detalle=MARCA).values_list('nombre_trabajador', flat=True).distinct()[:50]
+        ) or ['Prueba Carga']
+
+        # La sesión queda en la tabla django_session, así que el servidor la reconoce; el token
+        # CSRF puede ser cualquiera mientras la cookie y el encabezado coincidan.
+        cliente = Client()
+        cliente.force_login(usuario)
+        csrf = secrets.token_hex(16)
+        cookies = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}; {settings.CSRF_COOKIE_NAME}={csrf}"
+
+        servidor = options['servidor'].rstrip('/')
+        local = urllib.parse.urlsplit(servidor).hostname in SERVIDORES_LOCALES
+        log_inicio = self._tamanio_log(options['log'])
+        semilla = options['semilla'] if options['semilla'] is not None else random.randrange(2 ** 32)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['usuarios']} usuarios ({options['modo']}) durante {options['duracion']:g} s contra {servidor}, semilla {semilla}"
+        ))
+
+        Pool = ThreadPoolExecutor if options['modo'] == 'hilos' else ProcessPoolExecutor
+        argumentos = (servidor, cookies, csrf, mezcla, trabajadores, options['duracion'], options['pausa'], options['espera'])
+        inicio = time.perf_counter()
+        try:
+            with Pool(max_workers=options['usuarios']) as pool:
+                tareas = [pool.submit(usuario_virtual, *argumentos, semilla + i) for i in range(options['usuarios'])]
+                resultados = [resultado for tarea in tareas for resultado in tarea.result()]
+        finally:
+            cliente.logout()
+            if not options['conservar'] and local:
+                self._limpiar()
+            elif not options['conservar']:
+                # La base de un servidor remoto no es esta: borrar acá no alcanzaría sus registros
+                self.stdout.write(self.style.WARNING(
+                    f"No se borran los registros de prueba en {servidor}: son los jornales con detalle "
+                    f"'{MARCA}' y los riegos con responsable '{MARCA}'."
+                ))
+        self._informar(resultados, time.perf_counter() - inicio)
+        if options['log']:
+            self._informar_log(options['log'], log_inicio)
+
+    def _mezcla(self, texto):
+        """{escenario: (método, ruta, peso)} a partir de --mezcla o de los pesos por defecto."""
+        pesos = {nombre: peso for nombre, (_, _, _, peso) in ESCENARIOS.items()}
+        if texto:
+            pesos = {}
+            for parte in texto.split(','):
+                nombre, _, peso = parte.partition('=')
+                nombre = nombre.strip()
+                if nombre not in ESCENARIOS:
+                    raise CommandError(f"Escenario desconocido: {nombre}. Escenarios: {', '.join(ESCENARIOS)}")
+                try:
+                    pesos[nombre] = float(peso) if peso else 1.0
+                except ValueError:
+                    raise CommandError(f'Peso inválido para {nombre}: {peso}')
+        mezcla = {}
+        for nombre, peso in pesos.items():
+            if peso > 0:
+                metodo, nombre_url, argumentos, _ = ESCENARIOS[nombre]
+                mezcla[nombre] = (metodo, reverse(nombre_url, args=argumentos), peso)
+        if not mezcla:
+            raise CommandError('La mezcla no tiene ningún escenario con peso mayor que cero')
+        return mezcla
+
+    def _tamanio_log(self, ruta):
+        if not ruta:
+            return 0
+        try:
+            return os.path.getsize(ruta)
+        except OSError as error:
+            raise CommandError(f'No se puede leer el log {ruta}: {error}')
+
+    def _informar_log(self, ruta, desde):
+        """Cuenta los bloqueos de SQLite que el servidor registró desde que empezó la prueba."""
+        with open(ruta, encoding='utf-8', errors='replace') as log:
+            log.seek(desde)
+            bloqueos = sum(linea.count(TEXTO_BLOQUEO) for linea in log)
+        estilo = self.style.WARNING if bloqueos else self.style.SUCCESS
+        self.stdout.write(estilo(f"  Bloqueos de la base en {ruta}: {bloqueos}"))
+
+    def _limpiar(self):
+        jornales, _ = registro_trabajo.objects.filter(detalle=MARCA).delete()
+        riegos, _ = RegistroRiego.objects.filter(responsable=MARCA).delete()
+        if jornales or riegos:
+            self.stdout.write(f'Se borraron {jornales} jornales y {riegos} riegos creados por la prueba.')
+
+    def _informar(self, resultados, duracion):
+        if not resultados:
+            self.stdout.write(self.style.WARNING('No se completó ningún pedido.'))
+            return
+        por_escenario = defaultdict(list)
+        for escenario, latencia, resultado in resultados:
+            por_escenario[escenario].append((latencia, resultado))
+
+        self.stdout.write(
+            f"  {'escenario':<26} {'pedidos':>7} {'ped/s':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+            f"{'errores':>8} {'500':>8} {'vencidos':>8}"
+        )
+        for escenario in sorted(por_escenario):
+            self._linea(escenario, por_escenario[escenario], duracion)
+        self._linea('TOTAL', [(latencia, resultado) for _, latencia, resultado in resultados], duracion, total=True)
+
+        otros = defaultdict(int)
+        for _, _, resultado in resultados:
+            if resultado not in ('ok', 500, 'timeout'):
+                otros[resultado] += 1
+        if otros:
+            self.stdout.write('  Errores: ' + ', '.join(f'{resultado}: {cantidad}' for resultado, cantidad in sorted(otros.items(), key=str)))
+
+    def _linea(self, nombre, medidas, duracion, total=False):
+        latencias = sorted(latencia for latencia, _ in medidas)
+        if len(latencias) > 1:
+            cuantiles = statistics.quantiles(latencias, n=100, method='inclusive')
+            p50, p90, p99 = statistics.median(latencias), cuantiles[89], cuantiles[98]
+        else:
+            p50 = p90 = p99 = latencias[0]
+        cantidad = len(medidas)
+        errores = sum(1 for _, resultado in medidas if resultado != 'ok')
+        fallas = sum(1 for _, resultado in medidas if resultado == 500)
+        vencidos = sum(1 for _, resultado in medidas if resultado == 'timeout')
+        linea = (
+            f"  {nombre:<26} {cantidad:>7} {cantidad / duracion:>7.1f} {p50 * 1000:>8.1f} {p90 * 1000:>8.1f} {p99 * 1000:>8.1f} "
+            f"{errores / cantidad:>8.1%} {fallas / cantidad:>8.1%} {vencidos / cantidad:>8.1%}"
+        )
+        if errores:
+            self.stdout.write(self.style.WARNING(linea))
+        elif total:
+            self.stdout.write(self.style.SUCCESS(linea))
+        else:
+            self.stdout.write(linea)
@@ -0,0 +1,16 @@
+# contabilidad_loslirios/management/commands/reconstruir_saldos.py
+
+from django.core.management.base import BaseCommand
+from contabilidad_loslirios.cache_consultas import invalidar
+from contabilidad_loslirios.libro_mayor import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero las fotos mensuales de saldo a partir de ingresos y egresos'
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recalculando saldos mensuales...")
+        cantidad = reconstruir_saldos()
+        # Las fotos se reescriben con bulk_create, sin señales
+        invalidar('finanzas')
+        self.stdout.write(self.style.SUCCESS(f"¡Listo! Se generaron {cantidad} saldos mensuales."))
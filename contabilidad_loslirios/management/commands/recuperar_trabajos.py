@@ -0,0 +1,17 @@
+# contabilidad_loslirios/management/commands/recuperar_trabajos.py
+
+from django.core.management.base import BaseCommand
+from contabilidad_loslirios.tareas_fondo import esperar_trabajos, recuperar_trabajos
+
+
+class Command(BaseCommand):
+    help = 'Reencola los trabajos en segundo plano pendientes, cierra los interrumpidos y borra los vencidos con sus archivos'
+
+    def handle(self, *args, **options):
+        reencolados, interrumpidos, borrados = recuperar_trabajos()
+        self.stdout.write(f"Reencolados: {reencolados}. Interrumpidos: {interrumpidos}. Vencidos borrados: {borrados}.")
+        if reencolados:
+            # El pool vive en este proceso: se espera a que terminen antes de salir
+            self.stdout.write("Ejecutando los trabajos reencolados...")
+            esperar_trabajos()
+        self.stdout.write(self.style.SUCCESS("¡Listo!"))
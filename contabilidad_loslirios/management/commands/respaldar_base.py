@@ -0,0 +1,182 @@
+# contabilidad_loslirios/management/commands/respaldar_base.py
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from contabilidad_loslirios.archivo import anios_en_disco, ruta_archivo
+
+PREFIJO = 'db_'
+MAXIMO_REINICIOS = 5
+
+
+class _DemasiadosReinicios(Exception):
+    pass
+
+
+def _copia_en_linea(origen, destino, paginas, pausa, reinicios=MAXIMO_REINICIOS):
+    """
+    Copia consistente con la API de backup de SQLite: avanza de a `paginas` páginas y
+    descansa `pausa` segundos entre pasos, así las escrituras de la aplicación no
+    esperan más que un paso. Si alguien escribe durante la copia, SQLite la reinicia;
+    después de `reinicios` reinicios se abandona y se copia con VACUUM INTO, que lee
+    la base en una sola transacción (las escrituras esperan a que termine).
+    Devuelve la cantidad de reinicios.
+    """
+    fuente = sqlite3.connect(f'file:{origen}?mode=ro', uri=True)
+    estado = {'restantes': None, 'reinicios': 0}
+
+    def progreso(_, restantes, total):
+        # Un reinicio se ve como páginas restantes que vuelven a crecer
+        if estado['restantes'] is not None and restantes > estado['restantes']:
+            estado['reinicios'] += 1
+            if estado['reinicios'] > reinicios:
+                raise _DemasiadosReinicios
+        estado['restantes'] = restantes
+        time.sleep(pausa)
+
+    try:
+        copia = sqlite3.connect(destino)
+        try:
+            fuente.backup(copia, pages=paginas, progress=progreso)
+            return estado['reinicios']
+        except _DemasiadosReinicios:
+            pass
+        finally:
+            copia.close()
+        os.remove(destino)
+        fuente.execute('VACUUM INTO ?', (destino,))
+        return estado['reinicios']
+    finally:
+        fuente.close()
+
+
+def _conteos(ruta):
+    """integrity_check y cantidad de filas por tabla de una base SQLite."""
+    conexion = sqlite3.connect(f'file:{ruta}?mode=ro', uri=True)
+    try:
+        integridad = conexion.execute('PRAGMA integrity_check').fetchone()[0]
+        tablas = [fila[0] for fila in conexion.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        return integridad, {tabla: conexion.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0] for tabla in tablas}
+    finally:
+        conexion.close()
+
+
+def _comprimir(ruta, destino):
+    with open(ruta, 'rb') as entrada, gzip.open(destino, 'wb', compresslevel=6) as salida:
+        shutil.copyfileobj(entrada, salida, 1024 * 1024)
+
+
+def _restaurar_temporal(respaldo, directorio):
+    """Deja el respaldo como una base lista para abrir en `directorio` (descomprimido si hace falta)."""
+    ruta = os.path.join(directorio, 'restaurada.sqlite3')
+    abrir = gzip.open if respaldo.endswith('.gz') else open
+    with abrir(respaldo, 'rb') as entrada, open(ruta, 'wb') as salida:
+        shutil.copyfileobj(entrada, salida, 1024 * 1024)
+    return ruta
+
+
+class Command(BaseCommand):
+    help = 'Respalda la base en uso (y los archivos anuales que cambiaron) sin detener la aplicación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', default=None, help='Carpeta de los respaldos (por defecto RESPALDO_DIR)')
+        parser.add_argument('--paginas', type=int, default=256, help='Páginas copiadas por paso (por defecto 256)')
+        parser.add_argument('--pausa', type=float, default=0.05, help='Segundos de descanso entre pasos (por defecto 0.05)')
+        parser.add_argument('--reinicios', type=int, default=MAXIMO_REINICIOS,
+                            help=f'Reinicios de la copia por escrituras antes de copiar con VACUUM INTO (por defecto {MAXIMO_REINICIOS})')
+        parser.add_argument('--sin-comprimir', action='store_true', help='Guarda los .sqlite3 sin gzip')
+        parser.add_argument('--conservar', type=int, default=7, help='Cantidad de respaldos de la base que se conservan (por defecto 7)')
+        parser.add_argument('--verificar', metavar='RESPALDO', help='No respalda: solo verifica un respaldo existente')
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            integridad, conteos = self._verificar(options['verificar'])
+            self._informar(options['verificar'], integridad, conteos)
+            return
+
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError("El respaldo en línea solo está disponible con SQLite.")
+        destino = options['destino'] or settings.RESPALDO_DIR
+        os.makedirs(destino, exist_ok=True)
+        comprimir = not options['sin_comprimir']
+
+        marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+        origen = str(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        self.stdout.write(f"Respaldando {origen}...")
+        inicio = time.perf_counter()
+        respaldo, conteos = self._respaldar(origen, os.path.join(destino, f'{PREFIJO}{marca}.sqlite3'), options, comprimir)
+        self.stdout.write(f"  {os.path.basename(respaldo)} ({os.path.getsize(respaldo) / 1e6:.1f} MB, {time.perf_counter() - inicio:.1f} s)")
+
+        # Los archivos anuales solo cambian al archivar: se copian cuando son más nuevos que su respaldo
+        for anio in anios_en_disco():
+            nombre = os.path.basename(ruta_archivo(anio))
+            previo = os.path.join(destino, nombre + ('.gz' if comprimir else ''))
+            if os.path.exists(previo) and os.path.getmtime(previo) >= os.path.getmtime(ruta_archivo(anio)):
+                continue
+            self._respaldar(ruta_archivo(anio), os.path.join(destino, nombre), options, comprimir)
+            self.stdout.write(f"  {os.path.basename(previo)}")
+
+        borrados = self._rotar(destino, options['conservar'])
+        self.stdout.write(self.style.SUCCESS(
+            f"¡Listo! Respaldo verificado: {sum(conteos.values())} filas en {len(conteos)} tablas."
+            + (f" Se borraron {borrados} respaldos viejos." if borrados else "")
+        ))
+
+    def _respaldar(self, origen, ruta, options, comprimir):
+        """Copia, comprime y verifica que el respaldo se pueda restaurar con las mismas filas."""
+        temporal = ruta + '.tmp'
+        try:
+            reinicios = _copia_en_linea(origen, temporal, options['paginas'], options['pausa'], options['reinicios'])
+            if reinicios > options['reinicios']:
+                self.stdout.write(self.style.WARNING(
+                    f"  {os.path.basename(origen)} cambió {reinicios} veces durante la copia: se copió con VACUUM INTO."
+                ))
+            integridad, conteos = _conteos(temporal)
+            if integridad != 'ok':
+                raise CommandError(f"La copia de {origen} no pasó integrity_check: {integridad}")
+            final = ruta + '.gz' if comprimir else ruta
+            if comprimir:
+                _comprimir(temporal, final)
+            else:
+                os.replace(temporal, final)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        integridad, restaurados = self._verificar(final)
+        if integridad != 'ok' or restaurados != conteos:
+            os.remove(final)
+            raise CommandError(f"El respaldo {final} no se restauró igual a la copia; se descartó.")
+        return final, conteos
+
+    def _verificar(self, respaldo):
+        if not os.path.exists(respaldo):
+            raise CommandError(f"No existe {respaldo}")
+        with tempfile.TemporaryDirectory() as directorio:
+            try:
+                return _conteos(_restaurar_temporal(respaldo, directorio))
+            except (OSError, EOFError, sqlite3.DatabaseError) as exc:
+                raise CommandError(f"No se pudo restaurar {respaldo}: {exc}")
+
+    def _informar(self, respaldo, integridad, conteos):
+        for tabla, cantidad in conteos.items():
+            self.stdout.write(f"  {tabla}: {cantidad}")
+        if integridad != 'ok':
+            raise CommandError(f"{respaldo} no pasó integrity_check: {integridad}")
+        self.stdout.write(self.style.SUCCESS(f"{respaldo}: integridad ok, {sum(conteos.values())} filas."))
+
+    def _rotar(self, destino, conservar):
+        respaldos = sorted(nombre for nombre in os.listdir(destino) if nombre.startswith(PREFIJO))
+        viejos = respaldos[:-conservar] if conservar > 0 else []
+        for nombre in viejos:
+            os.remove(os.path.join(destino, nombre))
+        return len(viejos)
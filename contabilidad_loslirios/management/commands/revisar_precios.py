@@ -0,0 +1,46 @@
+# contabilidad_loslirios/management/commands/revisar_precios.py
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from contabilidad_loslirios.precios import jornales_a_revisar, revisar_precios, simular_revision
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor} (usar AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = 'Cambia el precio de los jornales de una tarea, clasificación o rango de fechas y recalcula sus montos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('precio', help='Precio nuevo por unidad')
+        parser.add_argument('--tarea', default=None)
+        parser.add_argument('--clasificacion', default=None)
+        parser.add_argument('--desde', type=_fecha, default=None, help='Fecha desde (AAAA-MM-DD, inclusive)')
+        parser.add_argument('--hasta', type=_fecha, default=None, help='Fecha hasta (AAAA-MM-DD, inclusive)')
+        parser.add_argument('--simular', action='store_true', help='Solo muestra qué cambiaría')
+
+    def handle(self, *args, **options):
+        try:
+            precio = Decimal(options['precio']).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise CommandError(f"Precio inválido: {options['precio']}")
+        if precio < 0:
+            raise CommandError("El precio no puede ser negativo.")
+        try:
+            jornales = jornales_a_revisar(options['tarea'], options['clasificacion'], options['desde'], options['hasta'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        resumen = simular_revision(jornales, precio)
+        self.stdout.write(
+            f"{resumen['jornales']} jornales: ${resumen['monto_actual'] or 0:.2f} -> ${resumen['monto_nuevo'] or 0:.2f}"
+        )
+        if options['simular']:
+            return
+        actualizados = revisar_precios(jornales, precio)
+        self.stdout.write(self.style.SUCCESS(f"¡Listo! Se actualizaron {actualizados} jornales a ${precio}."))
@@ -0,0 +1,36 @@
+# contabilidad_loslirios/management/commands/sincronizar_analitica.py
+
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from contabilidad_loslirios.analitica import ALIAS, replica_configurada, sincronizar
+
+
+class Command(BaseCommand):
+    help = 'Copia a la base analítica los cambios de la base principal (correrlo seguido, p. ej. con cron cada minuto)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Vuelve a copiar las tablas enteras')
+        parser.add_argument('--cada', type=int, default=0, metavar='SEGUNDOS', help='Repite la sincronización cada tantos segundos')
+
+    def handle(self, *args, **options):
+        if not replica_configurada():
+            raise CommandError(f"No hay una base '{ALIAS}' en DATABASES.")
+        # La réplica necesita el mismo esquema que la principal
+        call_command('migrate', database=ALIAS, interactive=False, verbosity=0)
+
+        completo = options['completo']
+        while True:
+            inicio = time.perf_counter()
+            try:
+                copiadas = sincronizar(completo=completo)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(self.style.SUCCESS(
+                f"Réplica sincronizada en {segundos:.2f} s: {sum(copiadas.values())} registros copiados."
+            ))
+            if not options['cada']:
+                break
+            completo = False
+            time.sleep(options['cada'])
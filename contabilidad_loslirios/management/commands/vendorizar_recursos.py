@@ -0,0 +1,45 @@
+# contabilidad_loslirios/management/commands/vendorizar_recursos.py
+
+import base64
+import hashlib
+import os
+import urllib.request
+from django.core.management.base import BaseCommand, CommandError
+from contabilidad_loslirios.recursos_vendor import RECURSOS
+
+DIRECTORIO_STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'static')
+
+
+class Command(BaseCommand):
+    help = 'Descarga a static/vendor las librerías de terceros que usan las plantillas (correr antes de collectstatic)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Vuelve a descargar los archivos que ya existen')
+
+    def handle(self, *args, **options):
+        descargados = 0
+        for nombre, recurso in RECURSOS.items():
+            archivos = {recurso['archivo']: recurso['cdn'], **recurso.get('extras', {})}
+            for archivo, url in archivos.items():
+                destino = os.path.join(DIRECTORIO_STATIC, archivo)
+                if os.path.exists(destino) and not options['forzar']:
+                    continue
+                try:
+                    with urllib.request.urlopen(url, timeout=30) as respuesta:
+                        contenido = respuesta.read()
+                except OSError as exc:
+                    raise CommandError(f"No se pudo descargar {url}: {exc}")
+
+                # Misma verificación que hace el navegador con el atributo integrity
+                if archivo == recurso['archivo'] and recurso.get('integridad'):
+                    huella = 'sha256-' + base64.b64encode(hashlib.sha256(contenido).digest()).decode()
+                    if huella != recurso['integridad']:
+                        raise CommandError(f"{url} no coincide con la integridad esperada para '{nombre}'")
+
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                with open(destino, 'wb') as salida:
+                    salida.write(contenido)
+                descargados += 1
+                self.stdout.write(f"  {archivo}")
+
+        self.stdout.write(self.style.SUCCESS(f"Se descargaron {descargados} archivos en {DIRECTORIO_STATIC}."))
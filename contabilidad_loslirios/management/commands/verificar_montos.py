@@ -0,0 +1,26 @@
+# contabilidad_loslirios/management/commands/verificar_montos.py
+
+from django.core.management.base import BaseCommand
+from contabilidad_loslirios.precios import verificar_montos
+
+
+class Command(BaseCommand):
+    help = 'Busca jornales cuyo monto_total no coincide con cantidad * precio y, opcionalmente, los corrige'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reparar', action='store_true', help='Recalcula los montos desfasados')
+        parser.add_argument('--lote', type=int, default=5000, help='Pks revisados por lote (por defecto 5000)')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Verificando montos de jornales...")
+        desfasados, reparados = verificar_montos(
+            reparar=options['reparar'],
+            lote=max(options['lote'], 1),
+            avanzar=lambda hecho, total: self.stdout.write(f"  {hecho}/{total}"),
+        )
+        if not desfasados:
+            self.stdout.write(self.style.SUCCESS("¡Listo! Todos los montos coinciden."))
+        elif options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f"¡Listo! Se corrigieron {reparados} de {desfasados} montos desfasados."))
+        else:
+            self.stdout.write(self.style.WARNING(f"Hay {desfasados} montos desfasados. Usá --reparar para corregirlos."))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+def poblar_trabajadores(apps, schema_editor):
+    """Crea un Trabajador por cada nombre distinto ya cargado en los jornales y unifica sus variantes."""
+    from contabilidad_loslirios.trabajadores import limpiar_nombre, normalizar_nombre
+
+    Trabajador = apps.get_model('contabilidad_loslirios', 'Trabajador')
+    registro_trabajo = apps.get_model('contabilidad_loslirios', 'registro_trabajo')
+
+    trabajadores = {}
+    variantes = []
+    for nombre in registro_trabajo.objects.values_list('nombre_trabajador', flat=True).distinct().order_by('nombre_trabajador'):
+        normalizado = normalizar_nombre(nombre)
+        if not normalizado:
+            continue
+        if normalizado not in trabajadores:
+            trabajadores[normalizado] = Trabajador(nombre=limpiar_nombre(nombre), nombre_normalizado=normalizado)
+        variantes.append((nombre, trabajadores[normalizado].nombre))
+    Trabajador.objects.bulk_create(trabajadores.values())
+
+    # Unificamos las variantes de escritura ya cargadas bajo el nombre canónico
+    for nombre, canonico in variantes:
+        if nombre != canonico:
+            registro_trabajo.objects.filter(nombre_trabajador=nombre).update(nombre_trabajador=canonico)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0008_ingresofinanciero'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('nombre_normalizado', models.CharField(help_text='Nombre en minúsculas, sin acentos ni espacios repetidos', max_length=50, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Trabajador',
+                'verbose_name_plural': 'Trabajadores',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.RunPython(poblar_trabajadores, migrations.RunPython.noop),
+    ]
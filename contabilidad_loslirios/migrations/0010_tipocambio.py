@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0009_trabajador'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TipoCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(db_index=True)),
+                ('moneda', models.CharField(choices=[('ARS', 'Pesos'), ('USD', 'USD')], max_length=3)),
+                ('valor', models.DecimalField(decimal_places=4, help_text='Pesos por unidad de la moneda', max_digits=15)),
+            ],
+            options={
+                'verbose_name': 'Tipo de Cambio',
+                'verbose_name_plural': 'Tipos de Cambio',
+                'ordering': ['-fecha'],
+                'constraints': [models.UniqueConstraint(fields=('moneda', 'fecha'), name='tipo_cambio_unico_por_fecha')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0010_tipocambio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finca', models.CharField(choices=[('Los Mimbres', 'Los Mimbres'), ('Media Agua', 'Media Agua'), ('Caucete', 'Caucete')], max_length=20)),
+                ('moneda', models.CharField(choices=[('ARS', 'Pesos'), ('USD', 'USD')], max_length=3)),
+                ('origen', models.CharField(choices=[('Oficial', 'Oficial'), ('No Oficial', 'No Oficial')], max_length=20)),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('egresos', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('saldo_acumulado', models.DecimalField(decimal_places=2, default=0, help_text='Saldo al cierre del mes', max_digits=17)),
+            ],
+            options={
+                'verbose_name': 'Saldo Mensual',
+                'verbose_name_plural': 'Saldos Mensuales',
+                'ordering': ['finca', 'moneda', 'origen', 'mes'],
+                'constraints': [models.UniqueConstraint(fields=('finca', 'moneda', 'origen', 'mes'), name='saldo_mensual_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0011_saldomensual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoSegundoPlano',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('exportar_jornales', 'Exportar jornales'), ('exportar_movimientos', 'Exportar movimientos'), ('exportar_ingresos', 'Exportar ingresos'), ('exportar_riegos', 'Exportar riegos'), ('reporte_flujo_caja', 'Reporte de flujo de caja')], max_length=30)),
+                ('parametros', models.JSONField(blank=True, default=dict, help_text='Filtros GET con los que se pidió el trabajo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('terminado', 'Terminado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=10)),
+                ('progreso', models.PositiveSmallIntegerField(default=0, help_text='Porcentaje completado')),
+                ('archivo', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('finalizado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo en Segundo Plano',
+                'verbose_name_plural': 'Trabajos en Segundo Plano',
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
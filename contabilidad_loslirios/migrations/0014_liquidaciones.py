@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0013_clave_idempotencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodoLiquidacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.DateField()),
+                ('hasta', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('cantidad_trabajadores', models.PositiveIntegerField(default=0)),
+                ('cerrado', models.DateTimeField(auto_now_add=True)),
+                ('cerrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Período de Liquidación',
+                'verbose_name_plural': 'Períodos de Liquidación',
+                'ordering': ['-desde'],
+                'permissions': [('can_view_liquidaciones', 'Can view pay statements'), ('can_close_liquidaciones', 'Can close pay periods')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Liquidacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_trabajador', models.CharField(max_length=50)),
+                ('cantidad_jornales', models.PositiveIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('detalle', models.JSONField(default=list)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liquidaciones', to='contabilidad_loslirios.periodoliquidacion')),
+            ],
+            options={
+                'verbose_name': 'Liquidación',
+                'verbose_name_plural': 'Liquidaciones',
+                'ordering': ['nombre_trabajador'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='periodoliquidacion',
+            constraint=models.UniqueConstraint(fields=('desde', 'hasta'), name='periodo_liquidacion_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='liquidacion',
+            constraint=models.UniqueConstraint(fields=('periodo', 'nombre_trabajador'), name='liquidacion_unica_por_periodo'),
+        ),
+    ]
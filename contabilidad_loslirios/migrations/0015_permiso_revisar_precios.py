@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:41
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0014_liquidaciones'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='registro_trabajo',
+            options={'permissions': [('can_view_jornales', 'Can view all jornal entries'), ('can_add_jornales', 'Can add new jornal entries'), ('can_export_jornales', 'Can export jornal data'), ('can_revise_precios', 'Can revise jornal prices')], 'verbose_name': 'Registro de Trabajo', 'verbose_name_plural': 'Registros de Trabajo'},
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+def calcular_geometrias(apps, schema_editor):
+    """Completa área, centroide y caja de las parcelas ya importadas."""
+    from contabilidad_loslirios.geometria import area_geodesica_ha, caja, centroide
+
+    Parcela = apps.get_model('contabilidad_loslirios', 'Parcela')
+    parcelas = list(Parcela.objects.filter(coordenadas__isnull=False))
+    for parcela in parcelas:
+        if not parcela.coordenadas:
+            continue
+        parcela.area_ha = round(area_geodesica_ha(parcela.coordenadas), 4)
+        parcela.centroide_lat, parcela.centroide_lon = centroide(parcela.coordenadas)
+        parcela.lat_min, parcela.lon_min, parcela.lat_max, parcela.lon_max = caja(parcela.coordenadas)
+    Parcela.objects.bulk_update(
+        parcelas, ['area_ha', 'centroide_lat', 'centroide_lon', 'lat_min', 'lat_max', 'lon_min', 'lon_max'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0015_permiso_revisar_precios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parcela',
+            name='area_ha',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Área medida (ha)'),
+        ),
+        migrations.AddField(
+            model_name='parcela',
+            name='centroide_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='parcela',
+            name='centroide_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='parcela',
+            name='lat_max',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='parcela',
+            name='lat_min',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='parcela',
+            name='lon_max',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='parcela',
+            name='lon_min',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(calcular_geometrias, migrations.RunPython.noop),
+    ]
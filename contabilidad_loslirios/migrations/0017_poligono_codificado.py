@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+def codificar_poligonos(apps, schema_editor):
+    """Pasa las coordenadas JSON de cada parcela a encoded polyline."""
+    from contabilidad_loslirios.geometria import codificar_polilinea
+
+    Parcela = apps.get_model('contabilidad_loslirios', 'Parcela')
+    parcelas = list(Parcela.objects.filter(coordenadas__isnull=False))
+    for parcela in parcelas:
+        parcela.poligono = codificar_polilinea(parcela.coordenadas) if parcela.coordenadas else None
+    Parcela.objects.bulk_update(parcelas, ['poligono'])
+
+
+def decodificar_poligonos(apps, schema_editor):
+    from contabilidad_loslirios.geometria import decodificar_polilinea
+
+    Parcela = apps.get_model('contabilidad_loslirios', 'Parcela')
+    parcelas = list(Parcela.objects.filter(poligono__isnull=False))
+    for parcela in parcelas:
+        parcela.coordenadas = decodificar_polilinea(parcela.poligono) if parcela.poligono else None
+    Parcela.objects.bulk_update(parcelas, ['coordenadas'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0016_geometria_parcela'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parcela',
+            name='poligono',
+            field=models.TextField(blank=True, help_text='Contorno del polígono como encoded polyline (lat, lon con 6 decimales).', null=True),
+        ),
+        migrations.RunPython(codificar_poligonos, decodificar_poligonos),
+        migrations.RemoveField(
+            model_name='parcela',
+            name='coordenadas',
+        ),
+    ]
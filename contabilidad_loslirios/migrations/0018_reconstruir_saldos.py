@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:02
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def reconstruir(apps, schema_editor):
+    """
+    Carga las fotos mensuales a partir de los ingresos y egresos ya registrados. Sin
+    ellas, el primer recalcular_mes de una cuenta con historial parte de saldo cero y
+    deja mal todos los saldos acumulados.
+
+    Repite la lógica de libro_mayor.reconstruir_saldos con los modelos históricos para
+    no depender del código actual. En este punto todavía no puede haber años
+    archivados, así que alcanza con las tablas principales.
+    """
+    SaldoMensual = apps.get_model('contabilidad_loslirios', 'SaldoMensual')
+    cero = Decimal('0.00')
+    por_mes = {}
+    for modelo, campo in (('IngresoFinanciero', 'ingresos'), ('MovimientoFinanciero', 'egresos')):
+        agrupadas = (
+            apps.get_model('contabilidad_loslirios', modelo).objects
+            .annotate(mes=TruncMonth('fecha'))
+            .values('finca', 'moneda', 'origen', 'mes')
+            .annotate(total=Sum('monto')).order_by()
+        )
+        for fila in agrupadas:
+            clave = (fila['finca'], fila['moneda'], fila['origen'], fila['mes'])
+            por_mes.setdefault(clave, {'ingresos': cero, 'egresos': cero})[campo] += fila['total']
+
+    fotos = []
+    saldos = {}
+    for finca, moneda, origen, mes in sorted(por_mes):
+        totales = por_mes[(finca, moneda, origen, mes)]
+        saldo = saldos.get((finca, moneda, origen), cero) + totales['ingresos'] - totales['egresos']
+        saldos[(finca, moneda, origen)] = saldo
+        fotos.append(SaldoMensual(
+            finca=finca, moneda=moneda, origen=origen, mes=mes,
+            ingresos=totales['ingresos'], egresos=totales['egresos'], saldo_acumulado=saldo,
+        ))
+
+    SaldoMensual.objects.all().delete()
+    SaldoMensual.objects.bulk_create(fotos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0017_poligono_codificado'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconstruir, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contabilidad_loslirios', '0018_reconstruir_saldos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajosegundoplano',
+            name='latido',
+            field=models.DateTimeField(blank=True, help_text='Última señal de vida del hilo que lo ejecuta', null=True),
+        ),
+    ]
@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.db import models
+from .geometria import area_geodesica_ha, caja, centroide, codificar_polilinea, decodificar_polilinea
 
 # Create your models here.
 
 #Model for main page 
+# Columnas de Parcela que se derivan del polígono
+CAMPOS_GEOMETRIA = ('area_ha', 'centroide_lat', 'centroide_lon', 'lat_min', 'lat_max', 'lon_min', 'lon_max')
+
 class Parcela(models.Model):
     """
     Representa una parcela individual (parral, potrero, etc.) en una finca.
@@ -11,7 +16,15 @@ class Parcela(models.Model):
     variedad = models.CharField(max_length=100, null=True, blank=True)
     superficie_ha = models.FloatField(null=True, blank=True, verbose_name="Superficie (ha)")
     cabezal_riego = models.CharField(max_length=50, null=True, blank=True, verbose_name="Cabezal de Riego")
-    coordenadas = models.JSONField(null=True, help_text="Lista de coordenadas [[lat, lon], ...] que forman el polígono.")
+    poligono = models.TextField(null=True, blank=True, help_text="Contorno del polígono como encoded polyline (lat, lon con 6 decimales).")
+    # Calculados a partir del polígono al guardar (ver geometria.py)
+    area_ha = models.FloatField(null=True, blank=True, editable=False, verbose_name="Área medida (ha)")
+    centroide_lat = models.FloatField(null=True, blank=True, editable=False)
+    centroide_lon = models.FloatField(null=True, blank=True, editable=False)
+    lat_min = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    lat_max = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    lon_min = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    lon_max = models.FloatField(null=True, blank=True, editable=False, db_index=True)
 
     class Meta:
         verbose_name = "Parcela"
@@ -21,8 +34,55 @@ class Parcela(models.Model):
     def __str__(self):
         return self.nombre
 
+    @property
+    def coordenadas(self):
+        """Lista de coordenadas [[lat, lon], ...] que forman el polígono (se decodifica una vez por instancia)."""
+        if not self.poligono:
+            return None
+        if getattr(self, '_coordenadas', (None, None))[0] != self.poligono:
+            self._coordenadas = (self.poligono, decodificar_polilinea(self.poligono))
+        return self._coordenadas[1]
+
+    @coordenadas.setter
+    def coordenadas(self, valor):
+        self.poligono = codificar_polilinea(valor) if valor else None
+
+    def actualizar_geometria(self):
+        """Recalcula área, centroide y caja a partir de las coordenadas."""
+        if self.coordenadas:
+            self.area_ha = round(area_geodesica_ha(self.coordenadas), 4)
+            self.centroide_lat, self.centroide_lon = centroide(self.coordenadas)
+            self.lat_min, self.lon_min, self.lat_max, self.lon_max = caja(self.coordenadas)
+        else:
+            self.area_ha = self.centroide_lat = self.centroide_lon = None
+            self.lat_min = self.lon_min = self.lat_max = self.lon_max = None
+
+    def save(self, *args, **kwargs):
+        self.actualizar_geometria()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'coordenadas', 'poligono'} & set(update_fields):
+            kwargs['update_fields'] = (set(update_fields) - {'coordenadas'}) | {'poligono'} | set(CAMPOS_GEOMETRIA)
+        super().save(*args, **kwargs)
+
 #Administration
 
+#Model for workers
+class Trabajador(models.Model):
+    """
+    Registro normalizado de trabajadores. Evita que las variantes de escritura
+    de un mismo nombre dividan los totales de jornales.
+    """
+    nombre = models.CharField(max_length=50, unique=True)
+    nombre_normalizado = models.CharField(max_length=50, unique=True, help_text="Nombre en minúsculas, sin acentos ni espacios repetidos")
+
+    class Meta:
+        verbose_name = "Trabajador"
+        verbose_name_plural = "Trabajadores"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return self.nombre
+
 #Model for daily work
 # Choices for the classification field
 CLASIFICACION_CHOICES = [
@@ -48,6 +108,8 @@ class registro_trabajo(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     ubicacion = models.CharField(max_length=50)
     monto_total = models.DecimalField(max_digits=15, decimal_places=2)
+    # Generada por el cliente al cargar sin conexión: reenviar el mismo registro no lo duplica
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     def save(self, *args, **kwargs):
         self.monto_total = self.cantidad * self.precio
@@ -64,6 +126,7 @@ class registro_trabajo(models.Model):
             ("can_view_jornales", "Can view all jornal entries"),
             ("can_add_jornales", "Can add new jornal entries"),
             ("can_export_jornales", "Can export jornal data"),
+            ("can_revise_precios", "Can revise jornal prices"),
         ]
 
 #Modelo para Movimientos Financieros 
@@ -82,6 +145,27 @@ FORMA_PAGO_CHOICES = [('Efectivo', 'Efectivo'),
     ('Transferencia', 'Transferencia'),
     ('Credito', 'Crédito'),
     ('Cheque', 'Cheque'),]
+#Modelo Tipo de Cambio
+class TipoCambio(models.Model):
+    """
+    Cotización diaria de una moneda expresada en pesos (moneda base).
+    Los tableros la usan para llevar los montos a una moneda de reporte.
+    """
+    fecha = models.DateField(db_index=True)
+    moneda = models.CharField(max_length=3, choices=MONEDA_CHOICES)
+    valor = models.DecimalField(max_digits=15, decimal_places=4, help_text="Pesos por unidad de la moneda")
+
+    def __str__(self):
+        return f"{self.fecha} | {self.moneda} = ARS {self.valor}"
+
+    class Meta:
+        verbose_name = "Tipo de Cambio"
+        verbose_name_plural = "Tipos de Cambio"
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['moneda', 'fecha'], name='tipo_cambio_unico_por_fecha'),
+        ]
+
 #Modelo Movimiento Financiero Egresos
 class MovimientoFinanciero(models.Model):
     id_movimiento = models.AutoField(primary_key=True)
@@ -131,6 +215,94 @@ class IngresoFinanciero(models.Model):
             ("can_export_ingresos", "Can export financial incomes data"),
         ]
 
+#Modelo Saldo Mensual (libro mayor)
+class SaldoMensual(models.Model):
+    """
+    Foto del saldo de una finca en una moneda y origen al cierre de cada mes.
+    Se mantiene al día con cada alta/baja de ingresos y egresos (ver libro_mayor.py)
+    y se puede reconstruir con el comando reconstruir_saldos.
+    """
+    finca = models.CharField(max_length=20, choices=FINCA_CHOICES)
+    moneda = models.CharField(max_length=3, choices=MONEDA_CHOICES)
+    origen = models.CharField(max_length=20, choices=ORIGEN_CHOICES)
+    mes = models.DateField(help_text="Primer día del mes")
+    ingresos = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    egresos = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    saldo_acumulado = models.DecimalField(max_digits=17, decimal_places=2, default=0, help_text="Saldo al cierre del mes")
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} | {self.finca} ({self.origen}) - {self.moneda} {self.saldo_acumulado}"
+
+    class Meta:
+        verbose_name = "Saldo Mensual"
+        verbose_name_plural = "Saldos Mensuales"
+        ordering = ['finca', 'moneda', 'origen', 'mes']
+        constraints = [
+            models.UniqueConstraint(fields=['finca', 'moneda', 'origen', 'mes'], name='saldo_mensual_unico'),
+        ]
+
+#Modelos de Liquidaciones (pago de jornales por período)
+class PeriodoLiquidacion(models.Model):
+    """
+    Período de pago cerrado (normalmente una semana). Al cerrarlo se guarda una
+    Liquidacion por trabajador; ninguna de las dos se modifica después, así que
+    consultar o reimprimir un período viejo no recalcula nada (ver liquidaciones.py).
+    """
+    desde = models.DateField()
+    hasta = models.DateField()
+    total = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    cantidad_trabajadores = models.PositiveIntegerField(default=0)
+    cerrado = models.DateTimeField(auto_now_add=True)
+    cerrado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Un período de liquidación cerrado no se modifica.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.desde:%d/%m/%Y} al {self.hasta:%d/%m/%Y}"
+
+    class Meta:
+        verbose_name = "Período de Liquidación"
+        verbose_name_plural = "Períodos de Liquidación"
+        ordering = ['-desde']
+        constraints = [
+            models.UniqueConstraint(fields=['desde', 'hasta'], name='periodo_liquidacion_unico'),
+        ]
+        permissions = [
+            ("can_view_liquidaciones", "Can view pay statements"),
+            ("can_close_liquidaciones", "Can close pay periods"),
+        ]
+
+class Liquidacion(models.Model):
+    """
+    Foto inmutable de lo que se le paga a un trabajador en un período.
+    `detalle` guarda una fila por tarea y unidad de medida: tarea, unidad_medida,
+    jornales, cantidad y monto (los decimales como texto).
+    """
+    periodo = models.ForeignKey(PeriodoLiquidacion, on_delete=models.CASCADE, related_name='liquidaciones')
+    nombre_trabajador = models.CharField(max_length=50)
+    cantidad_jornales = models.PositiveIntegerField()
+    total = models.DecimalField(max_digits=15, decimal_places=2)
+    detalle = models.JSONField(default=list)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Una liquidación cerrada no se modifica.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.nombre_trabajador} | {self.periodo} - ${self.total}"
+
+    class Meta:
+        verbose_name = "Liquidación"
+        verbose_name_plural = "Liquidaciones"
+        ordering = ['nombre_trabajador']
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'nombre_trabajador'], name='liquidacion_unica_por_periodo'),
+        ]
+
 
 # Production
 
@@ -145,6 +317,8 @@ class RegistroRiego(models.Model):
     fertilizante_nombre = models.CharField(max_length=100, blank=True, null=True, verbose_name="Nombre del Fertilizante")
     fertilizante_litros = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="Litros de Fertilizante")
     responsable = models.CharField(max_length=100)
+    # Generada por el cliente al cargar sin conexión: reenviar el mismo registro no lo duplica
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     @property
     def total_horas(self):
@@ -166,4 +340,45 @@ class RegistroRiego(models.Model):
         permissions = [
             ("can_view_riego", "Can view irrigation data"),
             ("can_add_riego", "Can add new irrigation entries"),
-        ]
\ No newline at end of file
+        ]
+
+
+# Background jobs
+
+#Model for exports and reports run outside the request
+TIPO_TRABAJO_CHOICES = [
+    ('exportar_jornales', 'Exportar jornales'),
+    ('exportar_movimientos', 'Exportar movimientos'),
+    ('exportar_ingresos', 'Exportar ingresos'),
+    ('exportar_riegos', 'Exportar riegos'),
+    ('reporte_flujo_caja', 'Reporte de flujo de caja'),
+]
+ESTADO_TRABAJO_CHOICES = [
+    ('pendiente', 'Pendiente'),
+    ('en_curso', 'En curso'),
+    ('terminado', 'Terminado'),
+    ('error', 'Error'),
+]
+class TrabajoSegundoPlano(models.Model):
+    """
+    Exportación o reporte que se ejecuta en el pool de hilos de tareas_fondo.py.
+    El resultado queda en un archivo dentro de settings.TRABAJOS_DIR.
+    """
+    tipo = models.CharField(max_length=30, choices=TIPO_TRABAJO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True, help_text="Filtros GET con los que se pidió el trabajo")
+    estado = models.CharField(max_length=10, choices=ESTADO_TRABAJO_CHOICES, default='pendiente', db_index=True)
+    progreso = models.PositiveSmallIntegerField(default=0, help_text="Porcentaje completado")
+    archivo = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    latido = models.DateTimeField(null=True, blank=True, help_text="Última señal de vida del hilo que lo ejecuta")
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+    class Meta:
+        verbose_name = "Trabajo en Segundo Plano"
+        verbose_name_plural = "Trabajos en Segundo Plano"
+        ordering = ['-creado']
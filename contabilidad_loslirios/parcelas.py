@@ -0,0 +1,110 @@
+import re
+
+from django.db.models import DurationField, ExpressionWrapper, F, Sum
+
+from .archivo import partes
+from .models import Parcela, RegistroRiego, registro_trabajo
+
+# Indicadores por parcela: se suman por parcela y se informan también por hectárea
+INDICADORES = ('costo_mano_obra', 'horas_riego', 'litros_fertilizante')
+
+_PREFIJOS = re.compile(r'^(parral|potrero|pasero)\s+')
+
+
+def _texto(valor):
+    return re.sub(r'\s+', ' ', valor or '').strip().lower()
+
+
+def _claves(nombre):
+    """
+    Formas en que un jornal o un riego nombra a la parcela: el nombre completo y el
+    número o sigla sin prefijo ('Parral 16' -> '16'). 'Parral 4-5' abarca el 4 y el 5.
+    """
+    completo = _texto(nombre)
+    corto = _PREFIJOS.sub('', completo)
+    claves = {completo, corto}
+    numeros = corto.split('-')
+    if len(numeros) > 1 and all(numero.isdigit() for numero in numeros):
+        claves.update(numeros)
+    return claves
+
+
+def indice_parcelas(nombres):
+    """
+    {clave: nombre de la parcela} para ubicar los textos libres de ubicacion (jornales)
+    y parral (riegos). Una clave corta que comparten dos parcelas (p. ej. 'Potrero 1' y
+    'Parral 1') no se asigna a ninguna; el nombre completo siempre identifica a la suya.
+    """
+    indice = {}
+    repetidas = set()
+    for nombre in nombres:
+        for clave in _claves(nombre):
+            if clave in indice and indice[clave] != nombre:
+                repetidas.add(clave)
+            indice.setdefault(clave, nombre)
+    for clave in repetidas:
+        del indice[clave]
+    for nombre in nombres:
+        indice[_texto(nombre)] = nombre
+    return indice
+
+
+def _unir(queryset, desde, hasta):
+    consultas = partes(queryset, desde, hasta)
+    return consultas[0].union(*consultas[1:], all=True)
+
+
+def kpis_parcelas(desde=None, hasta=None):
+    """
+    Costo de mano de obra, horas de riego y litros de fertilizante por parcela entre
+    `desde` y `hasta`: una consulta agrupada por tabla de origen (más los años
+    archivados del rango), cruzada en memoria con las parcelas por nombre.
+
+    Los valores por hectárea usan el área medida sobre el polígono y, si la parcela
+    no tiene contorno, la superficie cargada del CSV.
+
+    Devuelve {'parcelas': {nombre: {indicador: valor, indicador_ha: valor o None}},
+    'sin_parcela': {indicador: valor}} con lo que no se pudo ubicar en el mapa.
+    """
+    superficies = {
+        nombre: area_ha or superficie_ha
+        for nombre, area_ha, superficie_ha in Parcela.objects.values_list('nombre', 'area_ha', 'superficie_ha')
+    }
+    indice = indice_parcelas(list(superficies))
+    totales = {nombre: dict.fromkeys(INDICADORES, 0.0) for nombre in superficies}
+    sin_parcela = dict.fromkeys(INDICADORES, 0.0)
+
+    def sumar(texto, indicador, valor):
+        nombre = indice.get(_texto(texto))
+        (totales[nombre] if nombre else sin_parcela)[indicador] += float(valor or 0)
+
+    jornales = registro_trabajo.objects.all()
+    riegos = RegistroRiego.objects.filter(fin__gt=F('inicio'))
+    if desde:
+        jornales = jornales.filter(fecha__gte=desde)
+        riegos = riegos.filter(inicio__date__gte=desde)
+    if hasta:
+        jornales = jornales.filter(fecha__lte=hasta)
+        riegos = riegos.filter(inicio__date__lte=hasta)
+
+    jornales = jornales.values('ubicacion').annotate(costo=Sum('monto_total')).order_by()
+    for fila in _unir(jornales, desde, hasta):
+        sumar(fila['ubicacion'], 'costo_mano_obra', fila['costo'])
+
+    duracion = ExpressionWrapper(F('fin') - F('inicio'), output_field=DurationField())
+    riegos = riegos.values('parral').annotate(duracion=Sum(duracion), litros=Sum('fertilizante_litros')).order_by()
+    for fila in _unir(riegos, desde, hasta):
+        sumar(fila['parral'], 'horas_riego', fila['duracion'].total_seconds() / 3600 if fila['duracion'] else 0)
+        sumar(fila['parral'], 'litros_fertilizante', fila['litros'])
+
+    resultado = {}
+    for nombre, valores in totales.items():
+        superficie = superficies[nombre]
+        resultado[nombre] = {}
+        for indicador, valor in valores.items():
+            resultado[nombre][indicador] = round(valor, 2)
+            resultado[nombre][f'{indicador}_ha'] = round(valor / superficie, 2) if superficie else None
+    return {
+        'parcelas': resultado,
+        'sin_parcela': {indicador: round(valor, 2) for indicador, valor in sin_parcela.items()},
+    }
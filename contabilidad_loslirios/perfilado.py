@@ -0,0 +1,216 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Parámetro GET o encabezado que pide perfilar un pedido: 'cprofile' (o '1') o 'muestreo'
+PARAMETRO = 'perfilar'
+ENCABEZADO = 'X-Perfilar'
+MODOS = ('cprofile', 'muestreo')
+
+# Cada cuánto toma una muestra de las pilas el perfilador estadístico (segundos)
+INTERVALO_MUESTREO = 0.005
+
+_NOMBRE = re.compile(r'^[0-9]{8}_[0-9]{6}_[0-9]{6}_[A-Za-z0-9_]*$')
+
+
+class _Muestreador(threading.Thread):
+    """
+    Perfilador estadístico: cada `intervalo` segundos anota la pila de cada hilo del
+    proceso (salvo el propio). A diferencia de cProfile, ve también los hilos de
+    en_hilo y del loop de las vistas async, pero también a los pedidos simultáneos.
+    """
+
+    def __init__(self, intervalo):
+        super().__init__(name='perfilado-muestreo', daemon=True)
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pila.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})')
+                    frame = frame.f_back
+                self.pilas[';'.join(reversed(pila))] += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+def _pedido_perfilado(request):
+    """Modo pedido para este request, o None. Solo el staff puede perfilar."""
+    modo = request.GET.get(PARAMETRO) or request.headers.get(ENCABEZADO)
+    if not modo and settings.PERFILADO_MUESTREO and random.random() < settings.PERFILADO_MUESTREO:
+        modo = 'cprofile'
+    if not modo:
+        return None
+    if not getattr(request, 'user', None) or not request.user.is_staff:
+        return None
+    return modo if modo in MODOS else 'cprofile'
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila los pedidos del staff que lo piden con ?perfilar=1 (o el encabezado
+    X-Perfilar), o una fracción PERFILADO_MUESTREO de ellos al azar, y guarda el
+    resultado en PERFILADO_DIR (ver la página de perfiles). Va después de
+    AuthenticationMiddleware.
+
+    Con PERFILADO_ACTIVO = False, Django lo saca de la cadena al arrancar: no suma
+    nada a ningún pedido.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO_ACTIVO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        modo = _pedido_perfilado(request)
+        if modo is None:
+            return self.get_response(request)
+
+        inicio = time.perf_counter()
+        if modo == 'muestreo':
+            muestreador = _Muestreador(INTERVALO_MUESTREO)
+            muestreador.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                muestreador.detener()
+            resultado = muestreador.pilas
+        else:
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                perfil.disable()
+            resultado = perfil
+        duracion = time.perf_counter() - inicio
+
+        nombre = guardar_perfil(request, response, modo, resultado, duracion)
+        response.headers['X-Perfil'] = nombre
+        return response
+
+
+#Logic for stored profiles
+def guardar_perfil(request, response, modo, resultado, duracion):
+    """
+    Deja en PERFILADO_DIR el perfil (.prof de pstats o .folded con una pila por línea,
+    apto para flamegraph/speedscope) y un .json con la URL, los filtros y la duración.
+    Conserva solo los PERFILADO_CONSERVAR más recientes.
+    """
+    directorio = settings.PERFILADO_DIR
+    os.makedirs(directorio, exist_ok=True)
+    ruta = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_')[:60]
+    nombre = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{ruta}"
+
+    if modo == 'muestreo':
+        with open(os.path.join(directorio, nombre + '.folded'), 'w', encoding='utf-8') as archivo:
+            for pila, cantidad in resultado.most_common():
+                archivo.write(f'{pila} {cantidad}\n')
+    else:
+        resultado.dump_stats(os.path.join(directorio, nombre + '.prof'))
+
+    with open(os.path.join(directorio, nombre + '.json'), 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'nombre': nombre,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'metodo': request.method,
+            'ruta': request.path,
+            'parametros': {clave: request.GET.getlist(clave) for clave in request.GET if clave != PARAMETRO},
+            'usuario': request.user.get_username(),
+            'estado': response.status_code,
+            'duracion': round(duracion, 4),
+            'modo': modo,
+        }, archivo, ensure_ascii=False)
+
+    _rotar(directorio, settings.PERFILADO_CONSERVAR)
+    return nombre
+
+
+def _rotar(directorio, conservar):
+    nombres = sorted(archivo[:-5] for archivo in os.listdir(directorio) if archivo.endswith('.json'))
+    for viejo in nombres[:-conservar] if conservar > 0 else []:
+        for extension in ('.json', '.prof', '.folded'):
+            try:
+                os.remove(os.path.join(directorio, viejo + extension))
+            except FileNotFoundError:
+                pass
+
+
+def listar_perfiles():
+    """Metadatos de los perfiles guardados, del más reciente al más viejo."""
+    try:
+        archivos = sorted((archivo for archivo in os.listdir(settings.PERFILADO_DIR) if archivo.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+    perfiles = []
+    for archivo in archivos:
+        try:
+            with open(os.path.join(settings.PERFILADO_DIR, archivo), encoding='utf-8') as entrada:
+                perfiles.append(json.load(entrada))
+        except (OSError, ValueError):
+            continue  # Borrado por la rotación mientras se listaba, o incompleto
+    return perfiles
+
+
+def ruta_perfil(nombre):
+    """Ruta del .prof o .folded de un perfil (None si el nombre no es válido o no existe)."""
+    if not _NOMBRE.match(nombre):
+        return None
+    for extension in ('.prof', '.folded'):
+        ruta = os.path.join(settings.PERFILADO_DIR, nombre + extension)
+        if os.path.exists(ruta):
+            return ruta
+    return None
+
+
+def resumen_perfil(nombre, limite=40):
+    """
+    Texto con las funciones de mayor tiempo acumulado (cProfile) o con más muestras
+    propias e inclusivas (muestreo), para mostrar en la página del perfil.
+    """
+    ruta = ruta_perfil(nombre)
+    if ruta is None:
+        return None
+    if ruta.endswith('.prof'):
+        salida = io.StringIO()
+        pstats.Stats(ruta, stream=salida).strip_dirs().sort_stats('cumulative').print_stats(limite)
+        return salida.getvalue()
+
+    propias, inclusivas, total = Counter(), Counter(), 0
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            pila, _, cantidad = linea.rstrip('\n').rpartition(' ')
+            funciones = pila.split(';')
+            cantidad = int(cantidad)
+            total += cantidad
+            propias[funciones[-1]] += cantidad
+            for funcion in set(funciones):
+                inclusivas[funcion] += cantidad
+    lineas = [f'{total} muestras cada {INTERVALO_MUESTREO * 1000:.0f} ms (todos los hilos del proceso)', '',
+              f'{"inclusivas":>10} {"propias":>8}  función']
+    for funcion, cantidad in inclusivas.most_common(limite):
+        lineas.append(f'{cantidad:>10} {propias[funcion]:>8}  {funcion}')
+    return '\n'.join(lineas)
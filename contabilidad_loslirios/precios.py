@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value
+from django.db.models.functions import Abs, Round
+
+from .archivo import anios_en_rango
+from .cache_consultas import invalidar
+from .models import registro_trabajo
+
+# Diferencia a partir de la cual monto_total se considera desfasado (medio centavo)
+TOLERANCIA = Decimal('0.005')
+
+_MONTO = DecimalField(max_digits=15, decimal_places=2)
+
+
+def _monto(precio=None):
+    """cantidad * precio redondeado a centavos, calculado en la base (con el precio nuevo si se indica)."""
+    precio = F('precio') if precio is None else Value(precio, output_field=_MONTO)
+    return Round(ExpressionWrapper(F('cantidad') * precio, output_field=_MONTO), 2, output_field=_MONTO)
+
+
+def _despues_de_actualizar():
+    # update() no dispara señales: se invalida a mano lo que depende de los montos
+    invalidar('jornales')
+
+
+#Logic for price revisions
+def jornales_a_revisar(tarea=None, clasificacion=None, desde=None, hasta=None):
+    """
+    Jornales de la base activa que alcanza una revisión de precios. Falla con
+    ValueError si no hay ningún filtro o si el rango llega a años archivados, que
+    están cerrados y no se modifican.
+    """
+    if not any((tarea, clasificacion, desde, hasta)):
+        raise ValueError("Indicá al menos una tarea, clasificación o fecha para revisar precios.")
+    if (desde or hasta) and anios_en_rango(desde, hasta):
+        raise ValueError("El rango incluye años archivados; solo se pueden revisar precios de la base activa.")
+
+    filtros = Q()
+    if tarea:
+        filtros &= Q(tarea=tarea)
+    if clasificacion:
+        filtros &= Q(clasificacion=clasificacion)
+    if desde:
+        filtros &= Q(fecha__gte=desde)
+    if hasta:
+        filtros &= Q(fecha__lte=hasta)
+    return registro_trabajo.objects.filter(filtros)
+
+
+def simular_revision(queryset, precio):
+    """Cantidad de jornales, monto actual y monto con el precio nuevo, sin modificar nada."""
+    return queryset.aggregate(
+        jornales=Count('pk'),
+        monto_actual=Sum('monto_total'),
+        monto_nuevo=Sum(_monto(precio)),
+    )
+
+
+def revisar_precios(queryset, precio):
+    """
+    Cambia el precio de los jornales de `queryset` y recalcula monto_total en el
+    mismo UPDATE, sin cargar los registros. Devuelve la cantidad de filas modificadas.
+    """
+    with transaction.atomic():
+        actualizados = queryset.update(precio=precio, monto_total=_monto(precio))
+    if actualizados:
+        _despues_de_actualizar()
+    return actualizados
+
+
+#Logic for the consistency check
+def jornales_desfasados(queryset=None):
+    """Jornales cuyo monto_total difiere de cantidad * precio en más de medio centavo."""
+    queryset = registro_trabajo.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        diferencia=Abs(F('monto_total') - _monto()),
+    ).filter(diferencia__gt=TOLERANCIA)
+
+
+def verificar_montos(reparar=False, lote=5000, avanzar=None):
+    """
+    Recorre registro_trabajo de a `lote` pks buscando montos desfasados y, con
+    `reparar`, los recalcula con un UPDATE por lote (cada uno en su transacción, así
+    no se bloquea la base durante todo el recorrido). `avanzar(hecho, total)` se
+    llama después de cada lote. Devuelve (desfasados, reparados).
+    """
+    maximo = registro_trabajo.objects.aggregate(maximo=Max('pk'))['maximo'] or 0
+    desfasados = reparados = 0
+    for inicio in range(0, maximo, lote):
+        tramo = registro_trabajo.objects.filter(pk__gt=inicio, pk__lte=inicio + lote)
+        with transaction.atomic():
+            pks = list(jornales_desfasados(tramo).values_list('pk', flat=True))
+            desfasados += len(pks)
+            if reparar and pks:
+                reparados += registro_trabajo.objects.filter(pk__in=pks).update(monto_total=_monto())
+        if avanzar:
+            avanzar(min(inicio + lote, maximo), maximo)
+    if reparados:
+        _despues_de_actualizar()
+    return desfasados, reparados
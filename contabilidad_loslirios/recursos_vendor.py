@@ -0,0 +1,63 @@
+# Librerías de terceros que usan las plantillas, con versión fija.
+# `archivo` es la ruta dentro de static/ donde queda la copia local (la baja el comando
+# vendorizar_recursos); mientras no exista, las plantillas usan `cdn`. `extras` son los
+# archivos que la hoja de estilos referencia con url() y que también hay que copiar.
+
+RECURSOS = {
+    'tailwind_css': {
+        'tipo': 'css',
+        'archivo': 'vendor/tailwindcss/2.2.19/tailwind.min.css',
+        'cdn': 'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
+    },
+    'font_awesome_css': {
+        'tipo': 'css',
+        'archivo': 'vendor/font-awesome/6.4.0/css/all.min.css',
+        'cdn': 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+        'extras': {
+            f'vendor/font-awesome/6.4.0/webfonts/{fuente}.{extension}': f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/{fuente}.{extension}'
+            for fuente in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+            for extension in ('woff2', 'ttf')
+        },
+    },
+    'flatpickr_css': {
+        'tipo': 'css',
+        'archivo': 'vendor/flatpickr/4.6.13/flatpickr.min.css',
+        'cdn': 'https://cdn.jsdelivr.net/npm/flatpickr@4.6.13/dist/flatpickr.min.css',
+    },
+    'flatpickr_js': {
+        'tipo': 'js',
+        'archivo': 'vendor/flatpickr/4.6.13/flatpickr.min.js',
+        'cdn': 'https://cdn.jsdelivr.net/npm/flatpickr@4.6.13/dist/flatpickr.min.js',
+    },
+    'toastify_css': {
+        'tipo': 'css',
+        'archivo': 'vendor/toastify-js/1.12.0/toastify.min.css',
+        'cdn': 'https://cdn.jsdelivr.net/npm/toastify-js@1.12.0/src/toastify.min.css',
+    },
+    'toastify_js': {
+        'tipo': 'js',
+        'archivo': 'vendor/toastify-js/1.12.0/toastify.js',
+        'cdn': 'https://cdn.jsdelivr.net/npm/toastify-js@1.12.0/src/toastify.js',
+    },
+    'chartjs': {
+        'tipo': 'js',
+        'archivo': 'vendor/chart.js/4.4.1/chart.umd.min.js',
+        'cdn': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js',
+    },
+    'leaflet_css': {
+        'tipo': 'css',
+        'archivo': 'vendor/leaflet/1.9.4/leaflet.css',
+        'cdn': 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.css',
+        'integridad': 'sha256-p4NxAoJBhIIN+hmNHrzRCf9tD/miZyoHS5obTRR9BMY=',
+        'extras': {
+            f'vendor/leaflet/1.9.4/images/{imagen}': f'https://unpkg.com/leaflet@1.9.4/dist/images/{imagen}'
+            for imagen in ('layers.png', 'layers-2x.png', 'marker-icon.png', 'marker-icon-2x.png', 'marker-shadow.png')
+        },
+    },
+    'leaflet_js': {
+        'tipo': 'js',
+        'archivo': 'vendor/leaflet/1.9.4/leaflet.js',
+        'cdn': 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.js',
+        'integridad': 'sha256-20nQCchB9co0qIjJZRGuk2/Z9VM+kNiyxNV1lvTlZBo=',
+    },
+}
@@ -0,0 +1,115 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+
+from .cache_consultas import TIMEOUT_RESULTADOS, version_datos
+from .consultas_async import en_hilo
+
+
+def _clave_etag(request, grupos):
+    versiones = '.'.join(str(version_datos(grupo)) for grupo in grupos)
+    huella = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f'etag:{versiones}:{huella}'
+
+
+def _etags_cliente(request):
+    # GZipMiddleware debilita el ETag (W/"..."); para comparar alcanza con el valor
+    return {etag.strip().removeprefix('W/') for etag in request.headers.get('If-None-Match', '').split(',') if etag.strip()}
+
+
+def _responder_sin_cambios(request, clave):
+    """304 si el cliente ya tiene el ETag guardado para esta URL y versión de datos, sin ejecutar la vista."""
+    etag = cache.get(clave)
+    if etag and etag in _etags_cliente(request):
+        return HttpResponseNotModified(headers={'ETag': etag})
+    return None
+
+
+def _sin_cambios(respuesta, cache_control):
+    # Los mismos encabezados de caché que la respuesta completa
+    patch_cache_control(respuesta, **cache_control)
+    patch_vary_headers(respuesta, ('Cookie',))
+    return respuesta
+
+
+def _completar(request, respuesta, clave, cache_control):
+    if respuesta.status_code == 200 and not respuesta.streaming:
+        etag = '"%s"' % hashlib.md5(respuesta.content).hexdigest()
+        cache.set(clave, etag, TIMEOUT_RESULTADOS)
+        if etag in _etags_cliente(request):
+            respuesta = HttpResponseNotModified()
+        respuesta.headers['ETag'] = etag
+    patch_cache_control(respuesta, **cache_control)
+    patch_vary_headers(respuesta, ('Cookie',))
+    return respuesta
+
+
+def respuesta_api(grupos=(), **cache_control):
+    """
+    Decorador para las APIs JSON: ETag por contenido, 304 ante If-None-Match, gzip
+    negociado y la política de Cache-Control indicada (p. ej. private=True, max_age=300).
+
+    El ETag de cada URL se guarda en cache bajo la versión de `grupos`: mientras los
+    datos no cambien, un If-None-Match que coincide se responde sin ejecutar la vista.
+    Va debajo de los decoradores de permisos, para no saltearlos: los permisos que
+    dependen del pedido se verifican con @permiso_api, no dentro de la vista.
+    """
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltura(request, *args, **kwargs):
+                # Las versiones pueden leerse de la tabla del cache compartido: en el pool,
+                # fuera del event loop. Los ETags están en memoria del proceso.
+                clave = await en_hilo(_clave_etag, request, grupos)
+                respuesta = _responder_sin_cambios(request, clave)
+                if respuesta is None:
+                    respuesta = _completar(request, await vista(request, *args, **kwargs), clave, cache_control)
+                else:
+                    _sin_cambios(respuesta, cache_control)
+                return respuesta
+        else:
+            @wraps(vista)
+            def envoltura(request, *args, **kwargs):
+                clave = _clave_etag(request, grupos)
+                respuesta = _responder_sin_cambios(request, clave)
+                if respuesta is None:
+                    respuesta = _completar(request, vista(request, *args, **kwargs), clave, cache_control)
+                else:
+                    _sin_cambios(respuesta, cache_control)
+                return respuesta
+        return gzip_page(envoltura)
+    return decorador
+
+
+def permiso_api(permiso_de):
+    """
+    Decorador para las APIs JSON cuyo permiso depende del pedido: `permiso_de(request,
+    *args, **kwargs)` devuelve el permiso requerido, o None si no hace falta ninguno.
+    Sin ese permiso responde 403 en JSON. Va arriba de @respuesta_api, que puede
+    contestar 304 sin ejecutar la vista.
+    """
+    def sin_permiso():
+        return JsonResponse({'error': 'No tiene permiso para ver estos datos.'}, status=403)
+
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltura(request, *args, **kwargs):
+                permiso = permiso_de(request, *args, **kwargs)
+                if permiso and not await (await request.auser()).ahas_perm(permiso):
+                    return sin_permiso()
+                return await vista(request, *args, **kwargs)
+        else:
+            @wraps(vista)
+            def envoltura(request, *args, **kwargs):
+                permiso = permiso_de(request, *args, **kwargs)
+                if permiso and not request.user.has_perm(permiso):
+                    return sin_permiso()
+                return vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
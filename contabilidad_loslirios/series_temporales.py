@@ -0,0 +1,86 @@
+from datetime import date, datetime
+
+
+def truncar(fecha, agrupacion):
+    """Lleva una fecha al inicio de su período (mismo criterio que las funciones Trunc* de la base)."""
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    if agrupacion == 'anio':
+        return date(fecha.year, 1, 1)
+    if agrupacion == 'trimestre':
+        return date(fecha.year, 3 * ((fecha.month - 1) // 3) + 1, 1)
+    if agrupacion == 'dia':
+        return fecha
+    return date(fecha.year, fecha.month, 1)
+
+
+def _siguiente(periodo, agrupacion):
+    if agrupacion == 'dia':
+        return date.fromordinal(periodo.toordinal() + 1)
+    meses = {'anio': 12, 'trimestre': 3}.get(agrupacion, 1)
+    indice = periodo.year * 12 + periodo.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def generar_periodos(inicio, fin, agrupacion):
+    """
+    Espina de fechas: todos los períodos entre `inicio` y `fin` (inclusive), para
+    que los períodos sin movimientos aparezcan con valor cero en lugar de omitirse.
+    """
+    periodos = []
+    periodo = truncar(inicio, agrupacion)
+    fin = truncar(fin, agrupacion)
+    while periodo <= fin:
+        periodos.append(periodo)
+        if periodo == fin:
+            break  # Sin pedir el siguiente: después del 9999-12-31 no hay fechas
+        periodo = _siguiente(periodo, agrupacion)
+    return periodos
+
+
+def contar_periodos(inicio, fin, agrupacion):
+    """Cantidad de períodos que tendría generar_periodos(inicio, fin), sin generarlos."""
+    inicio, fin = truncar(inicio, agrupacion), truncar(fin, agrupacion)
+    if fin < inicio:
+        return 0
+    if agrupacion == 'dia':
+        return (fin - inicio).days + 1
+    meses = (fin.year - inicio.year) * 12 + fin.month - inicio.month
+    return meses // {'anio': 12, 'trimestre': 3}.get(agrupacion, 1) + 1
+
+
+def lttb(xs, ys, umbral):
+    """
+    Largest-Triangle-Three-Buckets: elige `umbral` índices de la serie (xs, ys)
+    conservando su forma visual. Devuelve la lista de índices elegidos, siempre
+    incluyendo el primero y el último. Si la serie ya es corta, la devuelve entera.
+    """
+    n = len(xs)
+    if umbral >= n or umbral < 3:
+        return list(range(n))
+
+    indices = [0]
+    tam_balde = (n - 2) / (umbral - 2)
+    a = 0
+    for i in range(umbral - 2):
+        # Promedio del balde siguiente (tercer vértice del triángulo)
+        sig_inicio = int((i + 1) * tam_balde) + 1
+        sig_fin = min(int((i + 2) * tam_balde) + 1, n)
+        cantidad = sig_fin - sig_inicio
+        prom_x = sum(xs[sig_inicio:sig_fin]) / cantidad
+        prom_y = sum(ys[sig_inicio:sig_fin]) / cantidad
+
+        # Punto del balde actual que forma el triángulo de mayor área
+        inicio = int(i * tam_balde) + 1
+        fin = int((i + 1) * tam_balde) + 1
+        ax, ay = xs[a], ys[a]
+        mejor, mejor_area = inicio, -1.0
+        for j in range(inicio, fin):
+            area = abs((ax - prom_x) * (ys[j] - ay) - (ax - xs[j]) * (prom_y - ay))
+            if area > mejor_area:
+                mejor, mejor_area = j, area
+        indices.append(mejor)
+        a = mejor
+
+    indices.append(n - 1)
+    return indices
@@ -0,0 +1,117 @@
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .analitica import ALIAS as ALIAS_ANALITICA, instalar_disparadores
+from .archivo import adjuntar_archivos, sincronizar_esquemas
+from .cache_consultas import invalidar
+from .libro_mayor import clave_saldo, recalcular_mes
+from .models import IngresoFinanciero, MovimientoFinanciero, Parcela, RegistroRiego, TipoCambio, Trabajador, registro_trabajo
+from .trabajadores import indice_trabajadores, registrar_trabajador
+
+
+#Signals for workers
+@receiver(post_save, sender=registro_trabajo)
+def registrar_trabajador_de_jornal(sender, instance, **kwargs):
+    """Cada jornal guardado deja a su trabajador en la tabla normalizada y en el índice."""
+    registrar_trabajador(instance.nombre_trabajador)
+
+
+@receiver(post_save, sender=Trabajador)
+def indexar_trabajador(sender, instance, **kwargs):
+    indice_trabajadores.agregar(instance.nombre)
+
+
+@receiver(post_delete, sender=Trabajador)
+def desindexar_trabajador(sender, instance, **kwargs):
+    indice_trabajadores.quitar(instance.nombre)
+
+
+#Signals for cached financial reports
+@receiver([post_save, post_delete], sender=IngresoFinanciero)
+@receiver([post_save, post_delete], sender=MovimientoFinanciero)
+@receiver([post_save, post_delete], sender=TipoCambio)
+def invalidar_finanzas(sender, **kwargs):
+    """Cualquier cambio en ingresos, egresos o cotizaciones deja obsoletos los reportes financieros cacheados."""
+    invalidar('finanzas')
+
+
+@receiver([post_save, post_delete], sender=registro_trabajo)
+def invalidar_jornales(sender, **kwargs):
+    invalidar('jornales')
+
+
+@receiver([post_save, post_delete], sender=RegistroRiego)
+def invalidar_riegos(sender, **kwargs):
+    invalidar('riegos')
+
+
+@receiver([post_save, post_delete], sender=Trabajador)
+def invalidar_trabajadores(sender, **kwargs):
+    invalidar('trabajadores')
+
+
+@receiver([post_save, post_delete], sender=Parcela)
+def invalidar_parcelas(sender, **kwargs):
+    invalidar('parcelas')
+
+
+#Signals for the balance ledger
+@receiver(pre_save, sender=IngresoFinanciero)
+@receiver(pre_save, sender=MovimientoFinanciero)
+def recordar_cuenta_anterior(sender, instance, **kwargs):
+    """Guarda la cuenta/mes que tenía el registro antes de editarlo, para corregir ambos saldos."""
+    instance._clave_saldo_anterior = None
+    if instance.pk:
+        anterior = sender.objects.filter(pk=instance.pk).only('finca', 'moneda', 'origen', 'fecha').first()
+        if anterior:
+            instance._clave_saldo_anterior = clave_saldo(anterior)
+
+
+@receiver(post_save, sender=IngresoFinanciero)
+@receiver(post_save, sender=MovimientoFinanciero)
+def actualizar_saldo(sender, instance, **kwargs):
+    clave = clave_saldo(instance)
+    anterior = getattr(instance, '_clave_saldo_anterior', None)
+    if anterior and anterior != clave:
+        recalcular_mes(*anterior)
+    recalcular_mes(*clave)
+
+
+@receiver(post_delete, sender=IngresoFinanciero)
+@receiver(post_delete, sender=MovimientoFinanciero)
+def descontar_saldo(sender, instance, **kwargs):
+    recalcular_mes(*clave_saldo(instance))
+
+
+#Signals for the shared cache
+@receiver(post_migrate)
+def crear_tabla_cache(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # El cache `versiones` usa DatabaseCache: la tabla no la crea ninguna migración (createcachetable es idempotente)
+    if sender.name == 'contabilidad_loslirios' and using == DEFAULT_DB_ALIAS:
+        call_command('createcachetable', database=using, verbosity=0)
+
+
+#Signals for the yearly archives
+@receiver(connection_created)
+def adjuntar_archivo_anual(sender, connection, **kwargs):
+    """Cada conexión a la base activa o a la réplica analítica ve los archivos anuales (ver archivo.py)."""
+    if connection.vendor == 'sqlite' and connection.alias in (DEFAULT_DB_ALIAS, ALIAS_ANALITICA):
+        adjuntar_archivos(connection)
+
+
+@receiver(post_migrate)
+def actualizar_esquemas_archivo(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # Las columnas que agregan las migraciones también se agregan a los archivos
+    if sender.name == 'contabilidad_loslirios' and using == DEFAULT_DB_ALIAS:
+        sincronizar_esquemas(using)
+
+
+#Signals for the analytics replica
+@receiver(post_migrate)
+def reinstalar_disparadores_analitica(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    # Una migración que reconstruye una tabla en SQLite borra sus triggers (ver analitica.py)
+    if sender.name == 'contabilidad_loslirios' and using == DEFAULT_DB_ALIAS and connections[using].vendor == 'sqlite':
+        instalar_disparadores(using)
@@ -0,0 +1,220 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from .models import TrabajoSegundoPlano
+
+logger = logging.getLogger(__name__)
+
+# tipo -> función(trabajo, archivo, avanzar). Las funciones se registran con @trabajo_en_segundo_plano
+TRABAJOS = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+_recuperado = False
+
+# Cada cuántos segundos un trabajo en curso renueva su latido, avance o no
+INTERVALO_LATIDO = 30
+
+
+def trabajo_en_segundo_plano(tipo):
+    """Registra la función que ejecuta un tipo de trabajo."""
+    def decorador(funcion):
+        TRABAJOS[tipo] = funcion
+        return funcion
+    return decorador
+
+
+def _obtener_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TRABAJOS_HILOS', 2),
+                thread_name_prefix='trabajos',
+            )
+    return _executor
+
+
+def esperar_trabajos():
+    """Espera a que el pool de este proceso termine lo que tiene encolado (para comandos de consola)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def parametros_de(trabajo):
+    """Reconstruye los filtros GET guardados en el trabajo como un QueryDict."""
+    parametros = QueryDict(mutable=True)
+    for clave, valores in trabajo.parametros.items():
+        parametros.setlist(clave, valores)
+    return parametros
+
+
+def encolar(tipo, parametros, usuario=None):
+    """
+    Crea el trabajo y lo envía al pool al confirmarse la transacción.
+    `parametros` es normalmente request.GET.
+    """
+    if tipo not in TRABAJOS:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    asegurar_recuperacion()
+    trabajo = TrabajoSegundoPlano.objects.create(
+        tipo=tipo,
+        parametros={clave: parametros.getlist(clave) for clave in parametros},
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+    transaction.on_commit(lambda: _obtener_executor().submit(_ejecutar, trabajo.pk))
+    return trabajo
+
+
+class _Progreso:
+    """Actualiza el porcentaje en la base como máximo una vez por cada punto porcentual."""
+
+    def __init__(self, trabajo_id):
+        self.trabajo_id = trabajo_id
+        self.ultimo = 0
+
+    def __call__(self, hechos, total):
+        porcentaje = min(99, int(hechos * 100 / total)) if total else 0
+        if porcentaje > self.ultimo:
+            self.ultimo = porcentaje
+            TrabajoSegundoPlano.objects.filter(pk=self.trabajo_id).update(progreso=porcentaje, latido=timezone.now())
+
+
+class _Latido(threading.Thread):
+    """
+    Renueva el latido cada INTERVALO_LATIDO segundos mientras el trabajo corre, aunque
+    la función no llame a avanzar (una consulta larga, un archivo grande). Así
+    recuperar_trabajos solo da por interrumpidos los trabajos cuyo proceso murió.
+    """
+
+    def __init__(self, trabajo_id):
+        super().__init__(name=f'latido-{trabajo_id}', daemon=True)
+        self.trabajo_id = trabajo_id
+        self._detenido = threading.Event()
+
+    def run(self):
+        try:
+            while not self._detenido.wait(INTERVALO_LATIDO):
+                try:
+                    TrabajoSegundoPlano.objects.filter(pk=self.trabajo_id, estado='en_curso').update(latido=timezone.now())
+                except DatabaseError:
+                    # Base ocupada: se reintenta en el próximo intervalo
+                    logger.exception("No se pudo renovar el latido del trabajo %s", self.trabajo_id)
+        finally:
+            connection.close()
+
+    def detener(self):
+        self._detenido.set()
+        self.join()
+
+
+def _ejecutar(trabajo_id):
+    close_old_connections()
+    try:
+        # Se toma solo si sigue pendiente: un trabajo reencolado por recuperar_trabajos no corre dos veces
+        tomado = TrabajoSegundoPlano.objects.filter(pk=trabajo_id, estado='pendiente').update(
+            estado='en_curso', latido=timezone.now(),
+        )
+        if not tomado:
+            return
+        trabajo = TrabajoSegundoPlano.objects.get(pk=trabajo_id)
+        os.makedirs(settings.TRABAJOS_DIR, exist_ok=True)
+        nombre = f"{trabajo.tipo}_{trabajo.pk}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        ruta = os.path.join(settings.TRABAJOS_DIR, nombre)
+        latido = _Latido(trabajo_id)
+        latido.start()
+        try:
+            with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+                TRABAJOS[trabajo.tipo](trabajo, archivo, _Progreso(trabajo_id))
+        except Exception as exc:
+            logger.exception("Falló el trabajo %s", trabajo_id)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            TrabajoSegundoPlano.objects.filter(pk=trabajo_id).update(
+                estado='error', error=str(exc), finalizado=timezone.now(),
+            )
+            return
+        finally:
+            latido.detener()
+        TrabajoSegundoPlano.objects.filter(pk=trabajo_id).update(
+            estado='terminado', progreso=100, archivo=nombre, finalizado=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def ruta_resultado(trabajo):
+    return os.path.join(settings.TRABAJOS_DIR, trabajo.archivo)
+
+
+#Logic for recovering jobs after a restart
+def recuperar_trabajos():
+    """
+    Los trabajos viven en el pool de un proceso: si el proceso se reinicia, los que
+    esperaban se pierden y los que corrían quedan 'en_curso' para siempre. Reencola
+    los pendientes, da por interrumpidos los en curso sin latido desde hace
+    TRABAJOS_SIN_LATIDO segundos y borra los finalizados hace más de
+    TRABAJOS_RETENCION_DIAS días, con sus archivos y los que quedaron a medio escribir.
+    Devuelve (reencolados, interrumpidos, borrados).
+    """
+    ahora = timezone.now()
+    sin_latido = ahora - timedelta(seconds=getattr(settings, 'TRABAJOS_SIN_LATIDO', 600))
+    colgados = Q(latido__lt=sin_latido) | Q(latido__isnull=True, creado__lt=sin_latido)
+    interrumpidos = TrabajoSegundoPlano.objects.filter(colgados, estado='en_curso').update(
+        estado='error', error='Interrumpido: se detuvo el proceso que lo ejecutaba.', finalizado=ahora,
+    )
+
+    pendientes = list(TrabajoSegundoPlano.objects.filter(estado='pendiente').values_list('pk', flat=True))
+    for trabajo_id in pendientes:
+        _obtener_executor().submit(_ejecutar, trabajo_id)
+
+    limite = ahora - timedelta(days=getattr(settings, 'TRABAJOS_RETENCION_DIAS', 7))
+    vencidos = TrabajoSegundoPlano.objects.filter(estado__in=['terminado', 'error'], finalizado__lt=limite)
+    for nombre in vencidos.exclude(archivo='').values_list('archivo', flat=True):
+        _borrar_archivo(os.path.join(settings.TRABAJOS_DIR, nombre))
+    borrados, _ = vencidos.delete()
+
+    # Archivos que ningún trabajo referencia (escrituras interrumpidas) y ya vencieron
+    try:
+        nombres = os.listdir(settings.TRABAJOS_DIR)
+    except FileNotFoundError:
+        nombres = []
+    referenciados = set(TrabajoSegundoPlano.objects.exclude(archivo='').values_list('archivo', flat=True))
+    for nombre in nombres:
+        ruta = os.path.join(settings.TRABAJOS_DIR, nombre)
+        if nombre not in referenciados and os.path.getmtime(ruta) < limite.timestamp():
+            _borrar_archivo(ruta)
+    return len(pendientes), interrumpidos, borrados
+
+
+def _borrar_archivo(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def asegurar_recuperacion():
+    """Ejecuta recuperar_trabajos una vez por proceso, con el primer uso de los trabajos."""
+    global _recuperado
+    with _executor_lock:
+        if _recuperado:
+            return
+        _recuperado = True
+    try:
+        recuperar_trabajos()
+    except Exception:
+        logger.exception("No se pudieron recuperar los trabajos pendientes")
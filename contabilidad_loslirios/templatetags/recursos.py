@@ -0,0 +1,39 @@
+from functools import cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from ..recursos_vendor import RECURSOS
+
+register = template.Library()
+
+
+@cache
+def _copia_local(archivo):
+    # Se resuelve una vez por proceso: después de vendorizar hay que reiniciar el servidor
+    return finders.find(archivo) is not None
+
+
+@register.simple_tag
+def recurso_vendor(nombre):
+    """
+    Etiqueta <link> o <script> de una librería de terceros (ver recursos_vendor.py).
+    Usa la copia local con nombre hasheado si existe y, si no, la versión fija del CDN.
+    """
+    recurso = RECURSOS[nombre]
+    if _copia_local(recurso['archivo']):
+        # collectstatic reescribe los url() de las hojas de estilo, así que la copia
+        # local ya no coincide con el hash de integridad (se verificó al descargarla)
+        url, integridad = static(recurso['archivo']), None
+    else:
+        url, integridad = recurso['cdn'], recurso.get('integridad')
+
+    if recurso['tipo'] == 'css':
+        if integridad:
+            return format_html('<link rel="stylesheet" href="{}" integrity="{}" crossorigin="">', url, integridad)
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    if integridad:
+        return format_html('<script src="{}" integrity="{}" crossorigin=""></script>', url, integridad)
+    return format_html('<script src="{}"></script>', url)
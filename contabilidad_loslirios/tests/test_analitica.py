@@ -0,0 +1,120 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TransactionTestCase
+
+from contabilidad_loslirios import analitica
+from contabilidad_loslirios.analitica import (
+    ALIAS, CLAVE_EN_COPIA, TABLA_CAMBIOS, TABLA_ESTADO, RouterAnalitica, sincronizar, usar_analitica,
+)
+from contabilidad_loslirios.cache_consultas import versiones
+from contabilidad_loslirios.models import registro_trabajo
+
+
+def jornal(nombre='Juan Perez', precio='100'):
+    return registro_trabajo.objects.create(
+        fecha=date(2025, 5, 2), nombre_trabajador=nombre, clasificacion='Invierno', tarea='Poda',
+        ubicacion='Parral 1', cantidad=Decimal('1'), unidad_medida='Días', precio=Decimal(precio),
+    )
+
+
+def base_de_lectura():
+    return registro_trabajo.objects.all().db
+
+
+class AnaliticaTests(TransactionTestCase):
+    """Triggers, sincronización y ruteo de lecturas hacia la réplica analítica."""
+
+    # ATTACH no corre dentro de una transacción: por eso TransactionTestCase
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        # Ni la marca de la réplica ni el registro de cambios son modelos: el flush no los vacía
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{TABLA_ESTADO}"')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{TABLA_CAMBIOS}"')
+        versiones.delete(CLAVE_EN_COPIA)
+        self.olvidar_estado()
+
+    def olvidar_estado(self):
+        analitica._disponible.update(valor=False, comprobado=None)
+        analitica._en_copia.update(valor=False, hasta=0)
+
+    def cambios_anotados(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT "registro" FROM "{TABLA_CAMBIOS}" ORDER BY "id"')
+            return [fila[0] for fila in cursor.fetchall()]
+
+    def en_replica(self):
+        return dict(registro_trabajo.objects.using(ALIAS).values_list('pk', 'precio'))
+
+    def test_triggers_anotan_cualquier_escritura(self):
+        registro = jornal()
+        pk = registro.pk
+        tabla = registro_trabajo._meta.db_table
+        escrituras = [
+            lambda: registro_trabajo.objects.filter(pk=pk).update(precio=Decimal('120')),
+            lambda: connection.cursor().execute(f'UPDATE "{tabla}" SET "precio" = 130'),
+            registro.delete,
+        ]
+        for escribir in escrituras:
+            # update() masivo, SQL directo y baja quedan anotados aunque no pasen por save()
+            anotados = len(self.cambios_anotados())
+            escribir()
+            self.assertGreater(len(self.cambios_anotados()), anotados)
+        self.assertEqual(set(self.cambios_anotados()), {pk})
+
+    def test_primera_sincronizacion_copia_todo_y_despues_solo_cambios(self):
+        primero, segundo = jornal(), jornal('Ana Gomez')
+        copiadas = sincronizar()
+        self.assertEqual(copiadas[registro_trabajo], 2)
+        self.assertEqual(self.cambios_anotados(), [])
+
+        registro_trabajo.objects.filter(pk=primero.pk).update(precio=Decimal('150'))
+        segundo.delete()
+        tercero = jornal('Luis Diaz')
+        copiadas = sincronizar()
+        # Solo se vuelven a copiar el editado y el nuevo; el borrado se borra
+        self.assertEqual(copiadas[registro_trabajo], 2)
+        self.assertEqual(self.en_replica(), {primero.pk: Decimal('150.00'), tercero.pk: Decimal('100.00')})
+        self.assertEqual(self.cambios_anotados(), [])
+
+    def test_con_demasiados_cambios_copia_todo(self):
+        registro, otro = jornal(), jornal('Ana Gomez')
+        sincronizar()
+        # Una fila que ningún cambio anotado toca solo vuelve con una copia completa
+        registro_trabajo.objects.using(ALIAS).filter(pk=otro.pk).delete()
+        for precio in ('110', '120', '130'):
+            registro_trabajo.objects.filter(pk=registro.pk).update(precio=Decimal(precio))
+        with mock.patch.object(analitica, 'MAXIMO_CAMBIOS', 2), mock.patch.object(analitica, 'SEGUNDOS_VERSION', 0):
+            sincronizar()
+        self.assertEqual(self.en_replica(), {registro.pk: Decimal('130.00'), otro.pk: Decimal('100.00')})
+        self.assertEqual(self.cambios_anotados(), [])
+        self.assertIsNone(versiones.get(CLAVE_EN_COPIA))
+
+    def test_lecturas_van_a_la_replica_solo_si_esta_lista(self):
+        leer = usar_analitica(base_de_lectura)
+        self.assertEqual(leer(), DEFAULT_DB_ALIAS)
+
+        jornal()
+        sincronizar()
+        self.olvidar_estado()
+        self.assertEqual(leer(), ALIAS)
+        # Fuera de @usar_analitica y para las escrituras, siempre la principal
+        self.assertEqual(base_de_lectura(), DEFAULT_DB_ALIAS)
+        self.assertEqual(RouterAnalitica().db_for_write(registro_trabajo), DEFAULT_DB_ALIAS)
+
+    def test_copia_completa_en_curso_devuelve_las_lecturas_a_la_principal(self):
+        jornal()
+        sincronizar()
+        self.olvidar_estado()
+        leer = usar_analitica(base_de_lectura)
+        self.assertEqual(leer(), ALIAS)
+
+        # Otro proceso empezó una copia completa: se ve en la próxima relectura de la marca
+        versiones.set(CLAVE_EN_COPIA, True, timeout=None)
+        analitica._en_copia['hasta'] = 0
+        self.assertEqual(leer(), DEFAULT_DB_ALIAS)
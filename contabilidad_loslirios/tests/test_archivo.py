@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+
+from contabilidad_loslirios.archivo import (
+    MAXIMO_ADJUNTOS, adjuntar_archivos, anios_archivados, archivar_anio, con_archivo, en_archivo,
+    esquema_archivo, partes, ruta_archivo,
+)
+from contabilidad_loslirios.cambio import anotar_monto_normalizado
+from contabilidad_loslirios.models import MovimientoFinanciero, TipoCambio, registro_trabajo
+
+
+def egreso(fecha, monto, finca='Los Mimbres', moneda='ARS'):
+    return MovimientoFinanciero.objects.create(
+        fecha=fecha, origen='Oficial', finca=finca, tipo='Produccion', clasificacion='Otros',
+        monto=Decimal(monto), moneda=moneda, forma_pago='Efectivo',
+    )
+
+
+class ArchivoTests(TransactionTestCase):
+    """Años cerrados movidos a su archivo y consultados junto con la base activa."""
+
+    def setUp(self):
+        # ATTACH no corre dentro de una transacción: por eso TransactionTestCase
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajuste = override_settings(ARCHIVO_DIR=directorio)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(self.desadjuntar)
+
+        egreso(date(2023, 3, 1), '100')
+        egreso(date(2023, 9, 1), '200', finca='Media Agua')
+        egreso(date(2024, 5, 1), '400')
+        egreso(date(2025, 6, 1), '800')
+        registro_trabajo.objects.create(
+            fecha=date(2023, 4, 1), nombre_trabajador='Juan Perez', clasificacion='Invierno',
+            tarea='Poda', ubicacion='Parral 1', cantidad=Decimal('1'), precio=Decimal('50'),
+        )
+
+    def desadjuntar(self):
+        with connection.cursor() as cursor:
+            for anio in anios_archivados():
+                cursor.execute(f'DETACH DATABASE "{esquema_archivo(anio)}"')
+        connection.anios_archivo = ()
+
+    def test_archivar_anio_mueve_las_filas(self):
+        movidas = archivar_anio(2023)
+        self.assertEqual(movidas[MovimientoFinanciero], 2)
+        self.assertEqual(movidas[registro_trabajo], 1)
+        self.assertTrue(os.path.exists(ruta_archivo(2023)))
+        self.assertEqual(anios_archivados(), (2023,))
+        self.assertEqual(MovimientoFinanciero.objects.count(), 2)
+        self.assertEqual(en_archivo(MovimientoFinanciero.objects.all(), 2023).count(), 2)
+        self.assertEqual(en_archivo(registro_trabajo.objects.all(), 2023).get().nombre_trabajador, 'Juan Perez')
+
+        # Un registro cargado tarde se lleva al mismo archivo
+        egreso(date(2023, 12, 31), '50')
+        self.assertEqual(archivar_anio(2023)[MovimientoFinanciero], 1)
+        self.assertEqual(en_archivo(MovimientoFinanciero.objects.all(), 2023).count(), 3)
+
+    def test_archivar_anio_abierto_falla(self):
+        with self.assertRaises(ValueError):
+            archivar_anio(date.today().year)
+
+    def test_no_archiva_mas_alla_del_maximo(self):
+        for anio in range(2000, 2000 + MAXIMO_ADJUNTOS):
+            open(ruta_archivo(anio), 'w').close()
+        with self.assertRaises(ValueError):
+            archivar_anio(2023)
+        self.assertFalse(os.path.exists(ruta_archivo(2023)))
+        self.assertEqual(MovimientoFinanciero.objects.count(), 4)
+
+    def test_demasiados_archivos_no_impiden_conectar(self):
+        # Archivos copiados a mano: se adjuntan los más recientes y se avisa
+        for anio in range(2000, 2001 + MAXIMO_ADJUNTOS):
+            open(ruta_archivo(anio), 'w').close()
+        with self.assertLogs('contabilidad_loslirios.archivo', 'WARNING'):
+            adjuntar_archivos(connection)
+        self.assertEqual(anios_archivados(), tuple(range(2001, 2001 + MAXIMO_ADJUNTOS)))
+
+    def test_con_archivo_une_los_anios_del_rango(self):
+        archivar_anio(2023)
+        archivar_anio(2024)
+        base = MovimientoFinanciero.objects.order_by('fecha')
+
+        desde_2024 = con_archivo(base.filter(fecha__gte=date(2024, 1, 1)), date(2024, 1, 1), None)
+        self.assertEqual([m.fecha for m in desde_2024], [date(2024, 5, 1), date(2025, 6, 1)])
+
+        todo = con_archivo(base.filter(fecha__gte=date(2020, 1, 1)), date(2020, 1, 1), date(2025, 12, 31))
+        self.assertEqual(todo.count(), 4)
+        self.assertEqual([m.monto for m in todo[1:3]], [Decimal('200.00'), Decimal('400.00')])
+
+        # Sin fechas se consulta solo la base activa
+        self.assertEqual(list(con_archivo(base)), list(base))
+
+    def test_partes_agrupa_y_convierte_en_cada_archivo(self):
+        archivar_anio(2023)
+        TipoCambio.objects.create(fecha=date(2023, 1, 1), moneda='USD', valor=Decimal('10'))
+        agrupadas = anotar_monto_normalizado(MovimientoFinanciero.objects.all(), 'USD').values('finca').annotate(
+            total=Sum('monto_normalizado'),
+        ).order_by()
+
+        consultas = partes(agrupadas)
+        self.assertEqual(len(consultas), 2)
+        totales = {}
+        for fila in consultas[0].union(*consultas[1:], all=True):
+            totales[fila['finca']] = totales.get(fila['finca'], 0) + fila['total']
+        self.assertEqual(totales, {'Los Mimbres': Decimal('130'), 'Media Agua': Decimal('20')})
+
+        # Un rango que no llega al año archivado no lo consulta
+        self.assertEqual(len(partes(agrupadas, date(2024, 1, 1), None)), 1)
@@ -0,0 +1,94 @@
+import json
+import struct
+from array import array
+from datetime import date, datetime
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from contabilidad_loslirios.calor_riego import VERSION_FORMATO, empaquetar, horas_por_dia, matriz_riego
+from contabilidad_loslirios.models import RegistroRiego
+
+
+def momento(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+def desempaquetar(contenido):
+    """Lee el formato de empaquetar() como lo hace el navegador."""
+    largo = struct.unpack_from('<I', contenido)[0]
+    encabezado = json.loads(contenido[4:4 + largo])
+    valores = array('f')
+    valores.frombytes(contenido[4 + largo:])
+    return largo, encabezado, list(valores)
+
+
+class HorasPorDiaTests(TestCase):
+    """Reparto de un riego entre los días que abarca."""
+
+    def test_riego_que_cruza_la_medianoche(self):
+        tramos = horas_por_dia(momento(2025, 3, 1, 20), momento(2025, 3, 2, 3), date(2025, 3, 1), date(2025, 3, 31))
+        self.assertEqual(tramos, [(date(2025, 3, 1).toordinal(), 4.0), (date(2025, 3, 2).toordinal(), 3.0)])
+
+    def test_recorta_al_rango(self):
+        tramos = horas_por_dia(momento(2025, 3, 1, 20), momento(2025, 3, 2, 3), date(2025, 3, 2), date(2025, 3, 31))
+        self.assertEqual(tramos, [(date(2025, 3, 2).toordinal(), 3.0)])
+
+    def test_termina_justo_a_medianoche(self):
+        # El día siguiente no recibe un tramo de 0 horas
+        tramos = horas_por_dia(momento(2025, 3, 1, 22), momento(2025, 3, 2), date(2025, 3, 1), date(2025, 3, 31))
+        self.assertEqual(tramos, [(date(2025, 3, 1).toordinal(), 2.0)])
+
+
+class MatrizRiegoTests(TestCase):
+    """Matriz de horas por parral y día, y su formato binario."""
+
+    def riego(self, parral, inicio, fin, cabezal='Cabezal 1'):
+        RegistroRiego.objects.create(
+            cabezal=cabezal, parral=parral, valvula_abierta='1', inicio=inicio, fin=fin, responsable='Juan Perez',
+        )
+
+    def test_matriz_por_parral_y_dia(self):
+        self.riego('10', momento(2025, 3, 1, 20), momento(2025, 3, 2, 3))
+        self.riego('2', momento(2025, 3, 2, 8), momento(2025, 3, 2, 10))
+        self.riego('2', momento(2025, 3, 3, 8), momento(2025, 3, 3, 9))
+        # Fuera del rango
+        self.riego('2', momento(2025, 2, 1, 8), momento(2025, 2, 1, 9))
+
+        filas, dias, valores = matriz_riego(date(2025, 3, 1), date(2025, 3, 3))
+        # Los parrales se ordenan por número, no alfabéticamente
+        self.assertEqual(filas, [('Cabezal 1', '2'), ('Cabezal 1', '10')])
+        self.assertEqual(dias, 3)
+        self.assertEqual(list(valores), [0.0, 2.0, 1.0, 4.0, 3.0, 0.0])
+
+    def test_empaquetar(self):
+        contenido = empaquetar(date(2025, 3, 1), [('Cabezal 1', '2')], 2, array('f', [1.5, 0.25]))
+        largo, encabezado, valores = desempaquetar(contenido)
+        # Los float32 quedan alineados a 4 bytes para leerlos sin copiar
+        self.assertEqual((4 + largo) % 4, 0)
+        self.assertEqual(encabezado, {'version': VERSION_FORMATO, 'desde': '2025-03-01', 'dias': 2, 'filas': [['Cabezal 1', '2']]})
+        self.assertEqual(valores, [1.5, 0.25])
+
+
+class RiegoCalorApiTests(TestCase):
+    """Validación de los parámetros del mapa de calor."""
+
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        usuario = User.objects.create_user('regador', password='clave')
+        usuario.user_permissions.add(Permission.objects.get(codename='can_view_riego'))
+        self.client.force_login(usuario)
+        self.url = reverse('riego_calor_api')
+
+    def test_rango_valido(self):
+        respuesta = self.client.get(self.url, {'desde': '2025-03-01', 'hasta': '2025-03-10'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(desempaquetar(respuesta.content)[1]['dias'], 10)
+
+    def test_fechas_invalidas(self):
+        for parametros in ({'desde': '2025-02-30'}, {'hasta': 'ayer'}, {'desde': '2025-03-10', 'hasta': '2025-03-01'}):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(self.url, parametros).status_code, 400)
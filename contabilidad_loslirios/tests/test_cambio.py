@@ -0,0 +1,41 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.test import TestCase
+
+from contabilidad_loslirios.cambio import anotar_monto_normalizado, monedas_sin_cotizacion
+from contabilidad_loslirios.models import MovimientoFinanciero, TipoCambio
+
+
+def egreso(fecha, monto, moneda):
+    return MovimientoFinanciero.objects.create(
+        fecha=fecha, origen='Oficial', finca='Los Mimbres', tipo='Produccion', clasificacion='Otros',
+        monto=Decimal(monto), moneda=moneda, forma_pago='Efectivo',
+    )
+
+
+class CotizacionesTests(TestCase):
+    """Los montos sin tipo de cambio no se convierten y se informan en lugar de perderse en silencio."""
+
+    def setUp(self):
+        egreso(date(2025, 3, 1), '1000', 'ARS')
+        egreso(date(2025, 3, 1), '10', 'USD')
+
+    def total(self, moneda_reporte):
+        queryset = anotar_monto_normalizado(MovimientoFinanciero.objects.all(), moneda_reporte)
+        return queryset.aggregate(total=Sum('monto_normalizado'))['total']
+
+    def test_sin_cotizacion_informa_la_moneda(self):
+        self.assertEqual(self.total('ARS'), Decimal('1000'))
+        self.assertEqual(monedas_sin_cotizacion({'ARS', 'USD'}), ['USD'])
+        # Para reportar en dólares hace falta su cotización aunque todas las filas sean en pesos
+        self.assertEqual(monedas_sin_cotizacion({'ARS'}, 'USD'), ['USD'])
+        self.assertEqual(monedas_sin_cotizacion({'ARS'}), [])
+
+    def test_con_cotizacion_convierte(self):
+        # Una cotización posterior vale para las fechas anteriores a la primera cargada
+        TipoCambio.objects.create(fecha=date(2025, 4, 1), moneda='USD', valor=Decimal('1000'))
+        self.assertEqual(monedas_sin_cotizacion({'ARS', 'USD'}, 'USD'), [])
+        self.assertEqual(self.total('ARS'), Decimal('11000'))
+        self.assertEqual(self.total('USD'), Decimal('11'))
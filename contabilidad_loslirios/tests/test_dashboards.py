@@ -0,0 +1,54 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from contabilidad_loslirios.models import MovimientoFinanciero, registro_trabajo
+
+
+class BloquesDashboardTests(TransactionTestCase):
+    """Cada bloque de los dashboards se calcula y cachea por separado, con los mismos totales."""
+
+    # Las APIs son async y leen el cache desde el pool: con TestCase la transacción
+    # abierta del hilo del test bloquea la tabla del cache
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='clave'))
+        for fecha, tarea, cantidad in [(date(2025, 1, 10), 'Poda', '2'), (date(2025, 2, 10), 'Atada', '1'), (date(2025, 2, 20), 'Poda', '1')]:
+            registro_trabajo.objects.create(
+                fecha=fecha, nombre_trabajador='Juan Perez', clasificacion='Invierno', tarea=tarea,
+                ubicacion='Parral 1', cantidad=Decimal(cantidad), unidad_medida='Días', precio=Decimal('100'),
+            )
+        for tipo, origen, monto in [('Energia', 'Oficial', '300'), ('Inversion', 'No Oficial', '100')]:
+            MovimientoFinanciero.objects.create(
+                fecha=date(2025, 3, 1), origen=origen, finca='Los Mimbres', tipo=tipo, clasificacion='Otros',
+                monto=Decimal(monto), moneda='ARS', forma_pago='Efectivo',
+            )
+
+    def bloque(self, nombre_url, bloque, **filtros):
+        respuesta = self.client.get(reverse(nombre_url, args=[bloque]), filtros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_bloques_de_jornales(self):
+        kpis = self.bloque('jornales_data_api', 'kpis')
+        self.assertEqual(kpis, {'costo_total': 400.0, 'total_registros': 3, 'trabajadores_activos': 1, 'costo_promedio': 400 / 3})
+        self.assertEqual(self.bloque('jornales_data_api', 'costo-tarea'), {'labels': ['Poda', 'Atada'], 'data': [300.0, 100.0]})
+        periodos = self.bloque('jornales_data_api', 'costo-periodo', agrupacion='mes')
+        self.assertEqual(periodos['data'], [200.0, 200.0])
+        # Otro filtro es otra clave de cache
+        self.assertEqual(self.bloque('jornales_data_api', 'kpis', fecha_desde='2025-02-01')['costo_total'], 200.0)
+
+    def test_bloques_de_movimientos(self):
+        kpis = self.bloque('movimientos_data_api', 'kpis')
+        self.assertEqual(kpis['gasto_total'], 400.0)
+        self.assertEqual(kpis['gasto_oficial'], 300.0)
+        self.assertEqual(kpis['porcentaje_energia'], 75.0)
+        self.assertEqual(kpis['sin_cotizacion'], [])
+        self.assertEqual(self.bloque('movimientos_data_api', 'gastos-tipo'), {'labels': ['Energia', 'Inversion'], 'data': [300.0, 100.0]})
+
+    def test_bloque_desconocido(self):
+        self.assertEqual(self.client.get(reverse('jornales_data_api', args=['otro'])).status_code, 404)
@@ -0,0 +1,218 @@
+import math
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from contabilidad_loslirios.geometria import (
+    RADIO_TIERRA, area_geodesica_ha, caja, centroide, codificar_polilinea, decodificar_polilinea, diferencia_superficie,
+)
+from contabilidad_loslirios.models import Parcela
+
+APP = 'contabilidad_loslirios'
+
+# Contorno de una parcela en Media Agua, con el primer vértice repetido al final como en el KML
+CONTORNO = [
+    [-31.979123, -68.422456], [-31.979087, -68.418902], [-31.981544, -68.418861],
+    [-31.981598, -68.422413], [-31.979123, -68.422456],
+]
+
+
+def rectangulo(sur, oeste, norte, este):
+    return [[sur, oeste], [sur, este], [norte, este], [norte, oeste], [sur, oeste]]
+
+
+class GeometriaTests(SimpleTestCase):
+    """Área, centroide y caja calculados a partir del contorno."""
+
+    def test_area_de_un_grado_en_el_ecuador(self):
+        # Área exacta de un rectángulo de latitud y longitud sobre la esfera: R² · Δλ · (sen φ2 - sen φ1)
+        esperada = RADIO_TIERRA ** 2 * math.radians(1) * math.sin(math.radians(1)) / 10000
+        self.assertAlmostEqual(area_geodesica_ha(rectangulo(0, 0, 1, 1)), esperada, delta=esperada * 1e-9)
+
+    def test_area_de_la_parcela(self):
+        # 9,19 ha según una proyección plana local, que a esta escala coincide con la esférica
+        self.assertAlmostEqual(area_geodesica_ha(CONTORNO), 9.191, places=2)
+        # Sin cerrar el anillo y recorrido al revés mide lo mismo
+        self.assertAlmostEqual(area_geodesica_ha(CONTORNO[-2::-1]), area_geodesica_ha(CONTORNO))
+
+    def test_poligonos_degenerados(self):
+        self.assertEqual(area_geodesica_ha([[-31.0, -68.0], [-31.1, -68.1]]), 0.0)
+        self.assertEqual(centroide([[-31.0, -68.0], [-31.2, -68.2], [-31.0, -68.0]]), (-31.1, -68.1))
+        self.assertIsNone(centroide([]))
+        self.assertIsNone(caja([]))
+
+    def test_centroide_y_caja(self):
+        lat, lon = centroide(rectangulo(-32.0, -68.5, -31.9, -68.4))
+        self.assertAlmostEqual(lat, -31.95)
+        self.assertAlmostEqual(lon, -68.45)
+        # En un triángulo, el promedio de los vértices
+        lat, lon = centroide([[-31.0, -68.0], [-31.0, -68.3], [-31.3, -68.0]])
+        self.assertAlmostEqual(lat, -31.1)
+        self.assertAlmostEqual(lon, -68.1)
+        self.assertEqual(caja(CONTORNO), (-31.981598, -68.422456, -31.979087, -68.418861))
+
+    def test_diferencia_superficie(self):
+        self.assertAlmostEqual(diferencia_superficie(9.0, 10.0), 0.1)
+        self.assertIsNone(diferencia_superficie(None, 10.0))
+        self.assertIsNone(diferencia_superficie(9.0, None))
+
+    def test_parcela_guarda_su_geometria(self):
+        parcela = Parcela(nombre='Parral 16', coordenadas=CONTORNO)
+        parcela.actualizar_geometria()
+        self.assertEqual(parcela.area_ha, 9.1911)
+        self.assertEqual((parcela.lat_min, parcela.lon_max), (-31.981598, -68.418861))
+        parcela.coordenadas = None
+        parcela.actualizar_geometria()
+        self.assertIsNone(parcela.area_ha)
+        self.assertIsNone(parcela.lat_min)
+
+
+class FiltroBboxTests(TransactionTestCase):
+    """?bbox= del GeoJSON de parcelas."""
+
+    # La vista es async y lee el cache desde el pool: con TestCase la transacción
+    # abierta del hilo del test bloquea la tabla del cache
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('capataz', password='clave'))
+        Parcela.objects.create(nombre='Parral 16', coordenadas=CONTORNO)
+        Parcela.objects.create(nombre='Parral 30', coordenadas=rectangulo(-32.01, -68.44, -32.0, -68.43))
+
+    def nombres(self, bbox):
+        respuesta = self.client.get(reverse('parcelas_geojson'), {'bbox': bbox})
+        self.assertEqual(respuesta.status_code, 200)
+        return [feature['properties']['nombre'] for feature in respuesta.json()['features']]
+
+    def test_filtra_por_caja(self):
+        self.assertEqual(self.nombres('-68.43,-31.99,-68.41,-31.97'), ['Parral 16'])
+        self.assertEqual(self.nombres('-68.45,-32.02,-68.41,-31.97'), ['Parral 16', 'Parral 30'])
+        # Alcanza con que las cajas se crucen
+        self.assertEqual(self.nombres('-68.4195,-31.99,-68.40,-31.98'), ['Parral 16'])
+        self.assertEqual(self.nombres('-68.0,-31.0,-67.9,-30.9'), [])
+
+    def test_bbox_en_la_respuesta(self):
+        feature = self.client.get(reverse('parcelas_geojson'), {'bbox': '-68.43,-31.99,-68.41,-31.97'}).json()['features'][0]
+        self.assertEqual(feature['bbox'], [-68.422456, -31.981598, -68.418861, -31.979087])
+
+    def test_bbox_mal_formado(self):
+        for bbox in ('-68.43,-31.99,-68.41', 'oeste,sur,este,norte', '-68.43,-31.99,-68.41,-31.97,0', '-68.43;-31.99;-68.41;-31.97'):
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.client.get(reverse('parcelas_geojson'), {'bbox': bbox}).status_code, 400)
+
+
+KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document>
+{}
+</Document></kml>
+"""
+
+
+class ImportarParcelasTests(TestCase):
+    """importar_parcelas avisa cuando el polígono del KML no coincide con la superficie del CSV."""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajuste = override_settings(BASE_DIR=directorio)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        os.makedirs(os.path.join(directorio, 'contabilidad_loslirios'))
+        self.directorio = os.path.join(directorio, 'contabilidad_loslirios')
+
+    def importar(self, filas_csv, parcelas_kml):
+        with open(os.path.join(self.directorio, 'parcelas_data.csv'), 'w', encoding='utf-8') as archivo:
+            archivo.write('PARRALES/POTREROS,VARIEDAD,SUPERFICIE,CABEZAL\n')
+            archivo.writelines(f'{fila}\n' for fila in filas_csv)
+        placemarks = ''.join(
+            f"<Placemark><name>{nombre}</name><Polygon><outerBoundaryIs><LinearRing><coordinates>"
+            f"{' '.join(f'{lon},{lat},0' for lat, lon in contorno)}"
+            f"</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>"
+            for nombre, contorno in parcelas_kml
+        )
+        with open(os.path.join(self.directorio, 'Los Lirios.kml'), 'w', encoding='utf-8') as archivo:
+            archivo.write(KML.format(placemarks))
+        salida = StringIO()
+        call_command('importar_parcelas', stdout=salida)
+        return salida.getvalue()
+
+    def test_avisa_si_la_superficie_no_coincide(self):
+        salida = self.importar(
+            ['16,Malbec,"9,2",Cabezal 1', '17,Bonarda,"12,5",Cabezal 2'],
+            [('Parral 16', CONTORNO), ('Parral 17', CONTORNO)],
+        )
+        self.assertNotIn("'Parral 16' mide", salida)
+        self.assertIn("ADVERTENCIA: 'Parral 17' mide 9.19 ha en el mapa y 12.5 ha en el CSV (26% de diferencia).", salida)
+        parcela = Parcela.objects.get(nombre='Parral 16')
+        self.assertEqual((parcela.superficie_ha, parcela.area_ha), (9.2, 9.1911))
+
+    def test_sin_superficie_en_el_csv_no_avisa(self):
+        salida = self.importar(['16,Malbec,-,Cabezal 1'], [('Parral 16', CONTORNO)])
+        self.assertNotIn('mide', salida)
+        self.assertIsNone(Parcela.objects.get().superficie_ha)
+
+
+class PolilineaTests(SimpleTestCase):
+    """Codificar y decodificar un polígono devuelve las mismas coordenadas a 6 decimales."""
+
+    def test_ida_y_vuelta(self):
+        texto = codificar_polilinea(CONTORNO)
+        self.assertEqual(decodificar_polilinea(texto), CONTORNO)
+        self.assertLess(len(texto), len(str(CONTORNO)) / 2)
+
+    def test_ejemplo_de_google(self):
+        # Ejemplo de la documentación del formato, con precisión 5
+        puntos = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+        self.assertEqual(codificar_polilinea(puntos, precision=5), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        self.assertEqual(decodificar_polilinea('_p~iF~ps|U_ulLnnqC_mqNvxq`@', precision=5), puntos)
+
+    def test_redondea_a_la_precision_y_vacio(self):
+        self.assertEqual(decodificar_polilinea(codificar_polilinea([[-31.1234567, 0.0000004]])), [[-31.123457, 0.0]])
+        self.assertEqual(codificar_polilinea([]), '')
+        self.assertEqual(decodificar_polilinea(''), [])
+
+    def test_propiedad_coordenadas_de_la_parcela(self):
+        parcela = Parcela(nombre='Parral 16', coordenadas=CONTORNO)
+        self.assertEqual(parcela.poligono, codificar_polilinea(CONTORNO))
+        self.assertEqual(parcela.coordenadas, CONTORNO)
+        parcela.coordenadas = None
+        self.assertIsNone(parcela.poligono)
+        self.assertIsNone(parcela.coordenadas)
+
+
+class MigracionPoligonoTests(TransactionTestCase):
+    """La 0017 pasa las coordenadas JSON a polyline y se puede revertir sin perderlas."""
+
+    antes = [(APP, '0016_geometria_parcela')]
+    despues = [(APP, '0017_poligono_codificado')]
+
+    def setUp(self):
+        self.addCleanup(self.migrar, MigrationExecutor(connection).loader.graph.leaf_nodes(APP))
+        self.migrar(self.antes)
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def test_migrar_y_revertir(self):
+        apps = self.migrar(self.antes)
+        ParcelaVieja = apps.get_model(APP, 'Parcela')
+        ParcelaVieja.objects.create(nombre='Parral 16', coordenadas=CONTORNO)
+        ParcelaVieja.objects.create(nombre='Parral 17')
+
+        apps = self.migrar(self.despues)
+        poligonos = dict(apps.get_model(APP, 'Parcela').objects.values_list('nombre', 'poligono'))
+        self.assertEqual(poligonos, {'Parral 16': codificar_polilinea(CONTORNO), 'Parral 17': None})
+
+        apps = self.migrar(self.antes)
+        coordenadas = dict(apps.get_model(APP, 'Parcela').objects.values_list('nombre', 'coordenadas'))
+        self.assertEqual(coordenadas, {'Parral 16': CONTORNO, 'Parral 17': None})
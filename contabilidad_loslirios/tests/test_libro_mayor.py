@@ -0,0 +1,125 @@
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+
+from contabilidad_loslirios import libro_mayor
+from contabilidad_loslirios.libro_mayor import reconstruir_saldos, recalcular_mes, saldo_a_fecha
+from contabilidad_loslirios.models import IngresoFinanciero, MovimientoFinanciero, SaldoMensual
+
+FINCA = 'Los Mimbres'
+
+
+def ingreso(fecha, monto, finca=FINCA, moneda='ARS', origen='Oficial'):
+    return IngresoFinanciero.objects.create(
+        fecha=fecha, origen=origen, finca=finca, monto=Decimal(monto), moneda=moneda, forma_pago='Efectivo',
+    )
+
+
+def egreso(fecha, monto, finca=FINCA, moneda='ARS', origen='Oficial'):
+    return MovimientoFinanciero.objects.create(
+        fecha=fecha, origen=origen, finca=finca, tipo='Produccion', clasificacion='Otros',
+        monto=Decimal(monto), moneda=moneda, forma_pago='Efectivo',
+    )
+
+
+class SaldosMensualesTests(TestCase):
+    """Las fotos mensuales se mantienen al día con altas, ediciones y bajas en meses pasados."""
+
+    def setUp(self):
+        ingreso(date(2025, 1, 10), '1000')
+        egreso(date(2025, 1, 20), '300')
+        ingreso(date(2025, 2, 5), '500')
+        egreso(date(2025, 3, 15), '200')
+
+    def saldos(self, finca=FINCA, moneda='ARS', origen='Oficial'):
+        return dict(
+            SaldoMensual.objects.filter(finca=finca, moneda=moneda, origen=origen)
+            .values_list('mes', 'saldo_acumulado')
+        )
+
+    def assertIgualAReconstruir(self):
+        # Lo mantenido incrementalmente coincide con una reconstrucción desde cero
+        antes = set(SaldoMensual.objects.values_list('finca', 'moneda', 'origen', 'mes', 'ingresos', 'egresos', 'saldo_acumulado'))
+        reconstruir_saldos()
+        despues = set(SaldoMensual.objects.values_list('finca', 'moneda', 'origen', 'mes', 'ingresos', 'egresos', 'saldo_acumulado'))
+        self.assertEqual(antes, despues)
+
+    def test_altas_acumulan_por_mes(self):
+        self.assertEqual(self.saldos(), {
+            date(2025, 1, 1): Decimal('700.00'),
+            date(2025, 2, 1): Decimal('1200.00'),
+            date(2025, 3, 1): Decimal('1000.00'),
+        })
+        self.assertEqual(saldo_a_fecha(FINCA, 'ARS', date(2025, 3, 14)), Decimal('1200.00'))
+        self.assertEqual(saldo_a_fecha(FINCA, 'ARS', date(2025, 3, 31)), Decimal('1000.00'))
+        self.assertIgualAReconstruir()
+
+    def test_alta_en_mes_pasado_corre_los_siguientes(self):
+        egreso(date(2025, 1, 25), '100')
+        self.assertEqual(self.saldos(), {
+            date(2025, 1, 1): Decimal('600.00'),
+            date(2025, 2, 1): Decimal('1100.00'),
+            date(2025, 3, 1): Decimal('900.00'),
+        })
+        self.assertIgualAReconstruir()
+
+    def test_edicion_que_cambia_de_mes_y_de_cuenta(self):
+        movimiento = IngresoFinanciero.objects.get(fecha=date(2025, 2, 5))
+        movimiento.fecha = date(2025, 3, 1)
+        movimiento.save()
+        # Febrero quedó sin movimientos: su foto se borra y vale la de enero
+        self.assertNotIn(date(2025, 2, 1), self.saldos())
+        self.assertEqual(saldo_a_fecha(FINCA, 'ARS', date(2025, 2, 28)), Decimal('700.00'))
+        self.assertEqual(self.saldos()[date(2025, 3, 1)], Decimal('1000.00'))
+
+        movimiento.finca = 'Caucete'
+        movimiento.save()
+        self.assertEqual(self.saldos()[date(2025, 3, 1)], Decimal('500.00'))
+        self.assertEqual(self.saldos(finca='Caucete'), {date(2025, 3, 1): Decimal('500.00')})
+        self.assertIgualAReconstruir()
+
+    def test_baja_en_mes_pasado(self):
+        MovimientoFinanciero.objects.get(fecha=date(2025, 1, 20)).delete()
+        self.assertEqual(self.saldos(), {
+            date(2025, 1, 1): Decimal('1000.00'),
+            date(2025, 2, 1): Decimal('1500.00'),
+            date(2025, 3, 1): Decimal('1300.00'),
+        })
+        self.assertEqual(saldo_a_fecha(FINCA, 'ARS', date(2025, 2, 28)), Decimal('1500.00'))
+        self.assertIgualAReconstruir()
+
+    def test_cuentas_separadas_por_moneda_y_origen(self):
+        ingreso(date(2025, 2, 1), '50', moneda='USD')
+        ingreso(date(2025, 2, 1), '80', origen='No Oficial')
+        self.assertEqual(self.saldos(moneda='USD'), {date(2025, 2, 1): Decimal('50.00')})
+        self.assertEqual(saldo_a_fecha(FINCA, 'ARS', date(2025, 2, 28)), Decimal('1280.00'))
+        self.assertEqual(saldo_a_fecha(FINCA, 'ARS', date(2025, 2, 28), origen='Oficial'), Decimal('1200.00'))
+
+    def test_historial_sin_fotos_se_reconstruye(self):
+        # Como una base anterior a la 0011: hay movimientos pero ninguna foto
+        SaldoMensual.objects.all().delete()
+        import_module('contabilidad_loslirios.migrations.0018_reconstruir_saldos').reconstruir(apps, None)
+        self.assertEqual(SaldoMensual.objects.count(), 3)
+        ingreso(date(2025, 2, 20), '10')
+        self.assertEqual(self.saldos()[date(2025, 3, 1)], Decimal('1010.00'))
+        self.assertIgualAReconstruir()
+
+    def test_recalculo_lee_los_movimientos_con_la_foto_tomada(self):
+        # El neto del mes se lee dentro de la misma transacción que bloquea la foto
+        anidadas = []
+        neto = libro_mayor._neto
+
+        def neto_en_transaccion(*args):
+            anidadas.append(len(connection.savepoint_ids))
+            return neto(*args)
+
+        fuera = len(connection.savepoint_ids)
+        with mock.patch.object(libro_mayor, '_neto', neto_en_transaccion):
+            recalcular_mes(FINCA, 'ARS', 'Oficial', date(2025, 2, 1))
+        self.assertEqual(anidadas, [fuera + 1])
+        self.assertEqual(self.saldos()[date(2025, 2, 1)], Decimal('1200.00'))
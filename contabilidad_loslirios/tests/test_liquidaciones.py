@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from contabilidad_loslirios.liquidaciones import cerrar_periodo
+from contabilidad_loslirios.models import Liquidacion, PeriodoLiquidacion, Trabajador, registro_trabajo
+
+
+def jornal(fecha, nombre, cantidad='1', precio='100', tarea='Poda'):
+    return registro_trabajo.objects.create(
+        fecha=fecha, nombre_trabajador=nombre, clasificacion='Invierno', tarea=tarea,
+        ubicacion='Parral 1', cantidad=Decimal(cantidad), unidad_medida='Días', precio=Decimal(precio),
+    )
+
+
+class CerrarPeriodoTests(TestCase):
+    """Al cerrar una semana se guarda una liquidación por trabajador y no se puede volver a cerrar el mismo rango."""
+
+    def setUp(self):
+        Trabajador.objects.create(nombre='José Pérez', nombre_normalizado='jose perez')
+        jornal(date(2025, 5, 5), 'José Pérez')
+        jornal(date(2025, 5, 6), 'jose  perez', cantidad='2')
+        jornal(date(2025, 5, 6), 'Ana Gómez', precio='150', tarea='Atadura')
+        # Fuera del rango
+        jornal(date(2025, 5, 12), 'Ana Gómez')
+
+    def test_cerrar_guarda_una_liquidacion_por_trabajador(self):
+        periodo = cerrar_periodo(date(2025, 5, 5), date(2025, 5, 11))
+        self.assertEqual(periodo.cantidad_trabajadores, 2)
+        self.assertEqual(periodo.total, Decimal('450.00'))
+
+        # Las variantes de escritura se juntan bajo el nombre de la tabla de trabajadores
+        jose = periodo.liquidaciones.get(nombre_trabajador='José Pérez')
+        self.assertEqual(jose.cantidad_jornales, 2)
+        self.assertEqual(jose.total, Decimal('300.00'))
+        self.assertEqual(jose.detalle, [{
+            'tarea': 'Poda', 'unidad_medida': 'Días', 'jornales': 2, 'cantidad': '3.00', 'monto': '300.00',
+        }])
+        self.assertEqual(periodo.liquidaciones.get(nombre_trabajador='Ana Gómez').total, Decimal('150.00'))
+
+        # Lo cerrado no cambia aunque después se corrijan los jornales
+        registro_trabajo.objects.filter(fecha=date(2025, 5, 5)).update(precio=Decimal('999'))
+        jose.refresh_from_db()
+        self.assertEqual(jose.total, Decimal('300.00'))
+        with self.assertRaises(ValueError):
+            jose.save()
+
+    def test_rango_superpuesto_falla(self):
+        cerrar_periodo(date(2025, 5, 5), date(2025, 5, 11))
+        for desde, hasta in [
+            (date(2025, 5, 5), date(2025, 5, 11)),
+            (date(2025, 5, 1), date(2025, 5, 5)),
+            (date(2025, 5, 11), date(2025, 5, 18)),
+            (date(2025, 5, 7), date(2025, 5, 8)),
+        ]:
+            with self.assertRaises(ValueError):
+                cerrar_periodo(desde, hasta)
+        self.assertEqual(PeriodoLiquidacion.objects.count(), 1)
+
+    def test_bloquea_antes_de_buscar_superposiciones(self):
+        # Con el bloqueo tomado antes del control, dos cierres simultáneos no pueden pasarlo los dos
+        tabla = PeriodoLiquidacion._meta.db_table
+        with CaptureQueriesContext(connection) as consultas:
+            cerrar_periodo(date(2025, 5, 5), date(2025, 5, 11))
+        sobre_periodos = [consulta['sql'] for consulta in consultas if f'"{tabla}"' in consulta['sql']]
+        self.assertTrue(sobre_periodos[0].startswith(f'UPDATE "{tabla}"'))
+        self.assertTrue(sobre_periodos[1].startswith('SELECT'))
+
+        # El período siguiente, pegado al cerrado, sí se puede cerrar
+        siguiente = cerrar_periodo(date(2025, 5, 12), date(2025, 5, 18))
+        self.assertEqual(siguiente.total, Decimal('100.00'))
+        self.assertEqual(Liquidacion.objects.count(), 3)
+
+    def test_rango_invalido_o_vacio_falla(self):
+        with self.assertRaises(ValueError):
+            cerrar_periodo(date(2025, 5, 11), date(2025, 5, 5))
+        with self.assertRaises(ValueError):
+            cerrar_periodo(date(2025, 6, 1), date(2025, 6, 7))
+        self.assertFalse(PeriodoLiquidacion.objects.exists())
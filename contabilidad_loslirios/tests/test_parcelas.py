@@ -0,0 +1,78 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from contabilidad_loslirios.models import Parcela, RegistroRiego, registro_trabajo
+from contabilidad_loslirios.parcelas import indice_parcelas, kpis_parcelas
+from contabilidad_loslirios.tests.test_geometria import CONTORNO
+
+
+def jornal(ubicacion, monto, fecha=date(2025, 3, 1)):
+    registro_trabajo.objects.create(
+        fecha=fecha, nombre_trabajador='Juan Perez', clasificacion='Invierno', tarea='Poda',
+        ubicacion=ubicacion, cantidad=Decimal('1'), unidad_medida='Días', precio=Decimal(monto),
+    )
+
+
+def riego(parral, inicio, fin, litros=None):
+    RegistroRiego.objects.create(
+        cabezal='Cabezal 1', parral=parral, valvula_abierta='1', responsable='Juan Perez',
+        inicio=timezone.make_aware(inicio), fin=timezone.make_aware(fin), fertilizante_litros=litros,
+    )
+
+
+class KpisParcelasTests(TestCase):
+    """Indicadores por parcela del mapa, totales y por hectárea."""
+
+    def setUp(self):
+        # Con contorno: el área medida (9,1911 ha) manda sobre la superficie del CSV
+        Parcela.objects.create(nombre='Parral 16', superficie_ha=10, coordenadas=CONTORNO)
+        # Sin contorno: se usa la superficie del CSV
+        Parcela.objects.create(nombre='Parral 17', superficie_ha=5)
+        # Sin ninguna de las dos: no hay valor por hectárea
+        Parcela.objects.create(nombre='Potrero 1')
+        Parcela.objects.create(nombre='Parral 1', superficie_ha=2)
+
+    def test_totales_y_por_hectarea(self):
+        jornal('Parral 16', '200')
+        jornal(' 16 ', '100')
+        jornal('17', '500')
+        jornal('Potrero 1', '30')
+        # '1' es tanto Potrero 1 como Parral 1: no se adivina
+        jornal('1', '50')
+        jornal('Parral 99', '7')
+        riego('16', datetime(2025, 3, 1, 8), datetime(2025, 3, 1, 11), litros=Decimal('4.5'))
+        riego('Parral 17', datetime(2025, 3, 2, 22), datetime(2025, 3, 3, 0, 30))
+
+        kpis = kpis_parcelas()
+        self.assertEqual(kpis['parcelas']['Parral 16'], {
+            'costo_mano_obra': 300.0, 'costo_mano_obra_ha': 32.64,
+            'horas_riego': 3.0, 'horas_riego_ha': 0.33,
+            'litros_fertilizante': 4.5, 'litros_fertilizante_ha': 0.49,
+        })
+        self.assertEqual(kpis['parcelas']['Parral 17']['costo_mano_obra_ha'], 100.0)
+        self.assertEqual(kpis['parcelas']['Parral 17']['horas_riego_ha'], 0.5)
+        self.assertEqual(kpis['parcelas']['Potrero 1']['costo_mano_obra'], 30.0)
+        self.assertIsNone(kpis['parcelas']['Potrero 1']['costo_mano_obra_ha'])
+        self.assertEqual(kpis['parcelas']['Parral 1']['costo_mano_obra'], 0.0)
+        self.assertEqual(kpis['sin_parcela'], {'costo_mano_obra': 57.0, 'horas_riego': 0.0, 'litros_fertilizante': 0.0})
+
+    def test_rango_de_fechas(self):
+        jornal('Parral 16', '200', fecha=date(2024, 12, 31))
+        jornal('Parral 16', '100', fecha=date(2025, 1, 1))
+        riego('16', datetime(2024, 12, 31, 8), datetime(2024, 12, 31, 9))
+        # Un riego con el fin antes del inicio no suma horas negativas
+        riego('16', datetime(2025, 1, 2, 9), datetime(2025, 1, 2, 8))
+
+        parral = kpis_parcelas(desde=date(2025, 1, 1))['parcelas']['Parral 16']
+        self.assertEqual((parral['costo_mano_obra'], parral['horas_riego']), (100.0, 0.0))
+        parral = kpis_parcelas(hasta=date(2024, 12, 31))['parcelas']['Parral 16']
+        self.assertEqual((parral['costo_mano_obra'], parral['horas_riego']), (200.0, 1.0))
+
+    def test_indice_de_nombres(self):
+        indice = indice_parcelas(['Parral 4-5', 'Parral 16', 'Potrero 16'])
+        self.assertEqual((indice['4'], indice['5'], indice['parral 4-5']), ('Parral 4-5',) * 3)
+        self.assertNotIn('16', indice)
+        self.assertEqual(indice['potrero 16'], 'Potrero 16')
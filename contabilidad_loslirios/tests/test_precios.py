@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from contabilidad_loslirios.cache_consultas import version_datos
+from contabilidad_loslirios.models import registro_trabajo
+from contabilidad_loslirios.precios import (
+    jornales_a_revisar, jornales_desfasados, revisar_precios, simular_revision, verificar_montos,
+)
+
+
+def jornal(fecha, cantidad, precio, tarea='Poda'):
+    return registro_trabajo.objects.create(
+        fecha=fecha, nombre_trabajador='Juan Perez', clasificacion='Invierno', tarea=tarea,
+        ubicacion='Parral 1', cantidad=Decimal(cantidad), unidad_medida='Días', precio=Decimal(precio),
+    )
+
+
+class RevisarPreciosTests(TestCase):
+    """El UPDATE masivo de precios recalcula los montos en la base y la verificación repara los desfasados."""
+
+    def setUp(self):
+        self.poda = jornal(date(2025, 5, 5), '2.5', '100')
+        self.poda_tardia = jornal(date(2025, 6, 5), '1', '100')
+        self.atadura = jornal(date(2025, 5, 5), '1', '80', tarea='Atadura')
+
+    def test_revisar_precios_recalcula_el_monto(self):
+        jornales = jornales_a_revisar(tarea='Poda', hasta=date(2025, 5, 31))
+        self.assertEqual(simular_revision(jornales, Decimal('120.10')), {
+            'jornales': 1, 'monto_actual': Decimal('250.00'), 'monto_nuevo': Decimal('300.25'),
+        })
+        # Simular no modifica nada
+        self.poda.refresh_from_db()
+        self.assertEqual(self.poda.precio, Decimal('100.00'))
+
+        version = version_datos('jornales')
+        self.assertEqual(revisar_precios(jornales, Decimal('120.10')), 1)
+        self.assertNotEqual(version_datos('jornales'), version)
+        self.poda.refresh_from_db()
+        self.assertEqual((self.poda.precio, self.poda.monto_total), (Decimal('120.10'), Decimal('300.25')))
+        # Lo que quedó fuera del filtro no cambia
+        self.assertEqual(
+            set(registro_trabajo.objects.exclude(pk=self.poda.pk).values_list('monto_total', flat=True)),
+            {Decimal('100.00'), Decimal('80.00')},
+        )
+        self.assertFalse(jornales_desfasados().exists())
+
+    def test_revisar_sin_filtros_falla(self):
+        with self.assertRaises(ValueError):
+            jornales_a_revisar()
+
+    def test_verificar_montos_encuentra_y_repara(self):
+        self.assertEqual(verificar_montos(), (0, 0))
+        # Montos desfasados como los que deja un update() que no recalcula
+        registro_trabajo.objects.filter(pk__in=[self.poda.pk, self.atadura.pk]).update(monto_total=Decimal('1'))
+        # Medio centavo de diferencia está dentro de la tolerancia
+        registro_trabajo.objects.filter(pk=self.poda_tardia.pk).update(monto_total=Decimal('100.005'))
+
+        avances = []
+        self.assertEqual(verificar_montos(lote=1, avanzar=lambda hecho, total: avances.append(hecho)), (2, 0))
+        self.assertEqual(avances, [1, 2, 3])
+        self.assertEqual(jornales_desfasados().count(), 2)
+
+        self.assertEqual(verificar_montos(reparar=True, lote=2), (2, 2))
+        self.poda.refresh_from_db()
+        self.atadura.refresh_from_db()
+        self.assertEqual((self.poda.monto_total, self.atadura.monto_total), (Decimal('250.00'), Decimal('80.00')))
+        self.assertEqual(verificar_montos(), (0, 0))
@@ -0,0 +1,84 @@
+import json
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from contabilidad_loslirios.archivo import anios_archivados, archivar_anio, esquema_archivo
+from contabilidad_loslirios.models import registro_trabajo
+
+
+def jornal(fecha, nombre='Juan Perez'):
+    return registro_trabajo.objects.create(
+        fecha=fecha, nombre_trabajador=nombre, clasificacion='Invierno', tarea='Poda',
+        ubicacion='Parral 1', cantidad=Decimal('1'), unidad_medida='Días', precio=Decimal('100'),
+    )
+
+
+class PaginadoPorClaveTests(TransactionTestCase):
+    """El cursor recorre la base activa y los años archivados sin saltear ni repetir registros."""
+
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajuste = override_settings(ARCHIVO_DIR=directorio)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(self.desadjuntar)
+
+        usuario = User.objects.create_user('capataz', password='clave')
+        usuario.user_permissions.add(Permission.objects.get(codename='can_view_jornales'))
+        self.client.force_login(usuario)
+
+        # Los años se cargan intercalados: las claves de un mismo año no son consecutivas
+        self.pks = [
+            jornal(fecha).pk for fecha in [
+                date(2023, 3, 1), date(2025, 3, 1), date(2024, 3, 1), date(2023, 9, 1),
+                date(2025, 9, 1), date(2024, 9, 1), date(2023, 12, 1),
+            ]
+        ]
+        jornal(date(2022, 5, 1), nombre='Fuera Del Rango')
+        archivar_anio(2023)
+        archivar_anio(2024)
+        self.url = reverse('registros_api', args=['jornales'])
+
+    def desadjuntar(self):
+        with connection.cursor() as cursor:
+            for anio in anios_archivados():
+                cursor.execute(f'DETACH DATABASE "{esquema_archivo(anio)}"')
+        connection.anios_archivo = ()
+
+    def test_paginas_recorren_archivos_y_base_activa(self):
+        vistos = []
+        url = f'{self.url}?fecha_desde=2023-01-01&fields=fecha&limite=2'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            datos = respuesta.json()
+            self.assertLessEqual(len(datos['resultados']), 2)
+            vistos += [fila['id_registro'] for fila in datos['resultados']]
+            url = datos['siguiente']
+        self.assertEqual(vistos, sorted(self.pks))
+        self.assertEqual(datos['cursor'], max(self.pks))
+
+        # Guardar el último cursor alcanza para traer solo lo nuevo
+        nuevo = jornal(date(2025, 10, 1)).pk
+        datos = self.client.get(self.url, {'fecha_desde': '2023-01-01', 'cursor': datos['cursor']}).json()
+        self.assertEqual([fila['id_registro'] for fila in datos['resultados']], [nuevo])
+        self.assertIsNone(datos['siguiente'])
+
+    def test_ndjson_desde_un_cursor(self):
+        respuesta = self.client.get(self.url, {
+            'fecha_desde': '2023-01-01', 'fecha_hasta': '2024-12-31', 'cursor': self.pks[2], 'formato': 'ndjson',
+        })
+        filas = [json.loads(linea) for linea in b''.join(respuesta.streaming_content).decode().splitlines()]
+        # Quedan los de 2023 y 2024 con clave mayor que el cursor, de los dos archivos
+        self.assertEqual([fila['id_registro'] for fila in filas], [self.pks[3], self.pks[5], self.pks[6]])
+        self.assertEqual([fila['fecha'] for fila in filas], ['2023-09-01', '2024-09-01', '2023-12-01'])
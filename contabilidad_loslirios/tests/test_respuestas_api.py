@@ -0,0 +1,79 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from contabilidad_loslirios.models import registro_trabajo
+
+
+class EtagTests(TestCase):
+    """Un If-None-Match se responde con 304 solo mientras los datos no cambien, aunque cambien por una vía sin señales."""
+
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        usuario = User.objects.create_user('capataz', password='clave')
+        usuario.user_permissions.add(*Permission.objects.filter(codename__in=['can_view_jornales', 'can_add_jornales']))
+        self.client.force_login(usuario)
+        registro_trabajo.objects.create(
+            fecha=date(2025, 5, 2), nombre_trabajador='Juan Perez', clasificacion='Invierno', tarea='Poda',
+            ubicacion='Parral 1', cantidad=Decimal('1'), unidad_medida='Días', precio=Decimal('100'),
+        )
+        self.url = reverse('registros_api', args=['jornales'])
+
+    def test_304_hasta_que_cambian_los_datos(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        etag = respuesta.headers['ETag']
+        sin_cambios = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(sin_cambios.status_code, 304)
+        self.assertIn('Cookie', sin_cambios.headers['Vary'])
+
+        # La carga por lotes usa bulk_create, que no dispara post_save
+        lote = [{'tipo': 'jornal', 'clave': 'lote-1', 'datos': {
+            'fecha': '2025-05-03', 'nombre_trabajador': 'Juan Perez', 'clasificacion': 'Invierno', 'tarea': 'Poda',
+            'detalle': 'N/A', 'cantidad': '1', 'unidad_medida': 'Días', 'precio': '100', 'ubicacion': 'Parral 1',
+        }}]
+        respuesta = self.client.post(reverse('sincronizar_registros'), json.dumps(lote), content_type='application/json')
+        self.assertEqual(respuesta.json()['resultados'][0]['estado'], 'creado')
+
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['resultados']), 2)
+
+    def test_304_sin_leer_el_cache_compartido(self):
+        etag = self.client.get(self.url).headers['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Las versiones se reusan por SEGUNDOS_VERSION y el ETag está en memoria del proceso
+        self.assertFalse([c['sql'] for c in consultas if 'cache_compartido' in c['sql']])
+
+    def test_sin_permiso_no_hay_304(self):
+        etag = self.client.get(self.url).headers['ETag']
+        # Otro usuario con el ETag de la misma URL (por ejemplo, en el mismo navegador)
+        self.client.force_login(User.objects.create_user('visitante', password='clave'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+
+
+class EtagMapaTests(TransactionTestCase):
+    """Los indicadores del mapa exigen permiso aunque el cliente traiga un ETag vigente."""
+
+    # La vista es async y lee el cache desde el pool: con TestCase la transacción
+    # abierta del hilo del test bloquea la tabla del cache
+    databases = {'default', 'analitica'}
+
+    def test_indicadores_sin_permiso_no_hay_304(self):
+        url = reverse('parcelas_geojson') + '?kpis=1'
+        self.client.force_login(User.objects.create_superuser('admin', password='clave'))
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+
+        self.client.force_login(User.objects.create_user('capataz', password='clave'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta.headers['ETag']).status_code, 403)
+        # Sin indicadores el mapa no pide permisos
+        self.assertEqual(self.client.get(reverse('parcelas_geojson')).status_code, 200)
@@ -0,0 +1,97 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from contabilidad_loslirios.models import MovimientoFinanciero
+from contabilidad_loslirios.series_temporales import contar_periodos, generar_periodos, lttb, truncar
+
+
+class PeriodosTests(SimpleTestCase):
+    """Espina de fechas del gráfico de líneas."""
+
+    def test_truncar(self):
+        self.assertEqual(truncar(date(2025, 8, 17), 'trimestre'), date(2025, 7, 1))
+        self.assertEqual(truncar(date(2025, 8, 17), 'anio'), date(2025, 1, 1))
+        self.assertEqual(truncar(date(2025, 8, 17), 'mes'), date(2025, 8, 1))
+        self.assertEqual(truncar(date(2025, 8, 17), 'dia'), date(2025, 8, 17))
+
+    def test_generar_periodos(self):
+        self.assertEqual(
+            generar_periodos(date(2024, 11, 15), date(2025, 2, 3), 'mes'),
+            [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)],
+        )
+        self.assertEqual(
+            generar_periodos(date(2024, 12, 31), date(2025, 4, 1), 'trimestre'),
+            [date(2024, 10, 1), date(2025, 1, 1), date(2025, 4, 1)],
+        )
+        self.assertEqual(generar_periodos(date(2025, 3, 1), date(2025, 2, 1), 'mes'), [])
+
+    def test_generar_periodos_hasta_la_ultima_fecha(self):
+        self.assertEqual(generar_periodos(date(9999, 12, 30), date(9999, 12, 31), 'dia'), [date(9999, 12, 30), date(9999, 12, 31)])
+        self.assertEqual(generar_periodos(date(9998, 6, 1), date(9999, 12, 31), 'anio'), [date(9998, 1, 1), date(9999, 1, 1)])
+
+    def test_contar_periodos_coincide_con_generar(self):
+        rangos = [(date(2024, 1, 31), date(2025, 3, 1)), (date(2023, 12, 31), date(2024, 1, 1)), (date(2025, 5, 1), date(2025, 4, 1))]
+        for inicio, fin in rangos:
+            for agrupacion in ('anio', 'trimestre', 'mes', 'dia'):
+                with self.subTest(inicio=inicio, fin=fin, agrupacion=agrupacion):
+                    self.assertEqual(contar_periodos(inicio, fin, agrupacion), len(generar_periodos(inicio, fin, agrupacion)))
+
+
+class LttbTests(SimpleTestCase):
+    """Reducción de series con Largest-Triangle-Three-Buckets."""
+
+    def test_conserva_extremos_y_picos(self):
+        xs = list(range(100))
+        ys = [0.0] * 100
+        ys[37] = 50.0
+        ys[80] = -20.0
+        indices = lttb(xs, ys, 10)
+        self.assertEqual(len(indices), 10)
+        self.assertEqual((indices[0], indices[-1]), (0, 99))
+        self.assertEqual(indices, sorted(set(indices)))
+        self.assertIn(37, indices)
+        self.assertIn(80, indices)
+
+    def test_serie_corta_queda_entera(self):
+        self.assertEqual(lttb([1, 2, 3], [1, 5, 2], 5), [0, 1, 2])
+        self.assertEqual(lttb([1, 2, 3, 4], [1, 5, 2, 0], 3)[::2], [0, 3])
+
+
+class LineaMovimientosApiTests(TransactionTestCase):
+    """Relleno de períodos vacíos y validación de parámetros del gráfico de líneas."""
+
+    # La API es async y lee el cache desde el pool: con TestCase la transacción
+    # abierta del hilo del test bloquea la tabla del cache
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='clave'))
+        for fecha, monto in [(date(2025, 1, 10), '100'), (date(2025, 4, 5), '50'), (date(2025, 4, 20), '25')]:
+            MovimientoFinanciero.objects.create(
+                fecha=fecha, origen='Oficial', finca='Los Mimbres', tipo='Energia', clasificacion='Otros',
+                monto=Decimal(monto), moneda='ARS', forma_pago='Efectivo',
+            )
+        self.url = reverse('line_chart_data_api')
+
+    def test_meses_sin_gastos_en_cero(self):
+        datos = self.client.get(self.url, {'agrupacion': 'mes'}).json()
+        self.assertEqual(datos['data'], [100.0, 0.0, 0.0, 75.0])
+        self.assertEqual(len(datos['labels']), 4)
+
+    def test_rango_del_filtro_completa_los_extremos(self):
+        datos = self.client.get(self.url, {'agrupacion': 'mes', 'fecha_desde': '2024-12-01', 'fecha_hasta': '2025-05-31'}).json()
+        self.assertEqual(datos['data'], [0.0, 100.0, 0.0, 0.0, 75.0, 0.0])
+
+    def test_reduccion_con_puntos(self):
+        datos = self.client.get(self.url, {'agrupacion': 'dia', 'puntos': '10'}).json()
+        self.assertEqual(len(datos['data']), 10)
+        self.assertEqual(sum(datos['data']), 175.0)
+
+    def test_puntos_invalidos(self):
+        for puntos in ('abc', '0', '-5', '2', '1.5'):
+            with self.subTest(puntos=puntos):
+                self.assertEqual(self.client.get(self.url, {'puntos': puntos}).status_code, 400)
@@ -0,0 +1,105 @@
+import json
+import shutil
+import tempfile
+from datetime import date
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from contabilidad_loslirios.archivo import anios_archivados, archivar_anio, esquema_archivo
+from contabilidad_loslirios.models import registro_trabajo
+
+
+def jornal(clave, fecha='2025-05-03', **datos):
+    return {'tipo': 'jornal', 'clave': clave, 'datos': {
+        'fecha': fecha, 'nombre_trabajador': 'Juan Perez', 'clasificacion': 'Invierno', 'tarea': 'Poda',
+        'detalle': 'N/A', 'cantidad': '2', 'unidad_medida': 'Días', 'precio': '100', 'ubicacion': 'Parral 1',
+        **datos,
+    }}
+
+
+class SincronizarMixin:
+    def iniciar_sesion(self):
+        usuario = User.objects.create_user('capataz', password='clave')
+        usuario.user_permissions.add(Permission.objects.get(codename='can_add_jornales'))
+        self.client.force_login(usuario)
+
+    def enviar(self, lote):
+        respuesta = self.client.post(reverse('sincronizar_registros'), json.dumps(lote), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()['resultados']
+
+
+class SincronizarRegistrosTests(SincronizarMixin, TestCase):
+    """La carga por lotes es idempotente por clave y valida cada registro por separado."""
+
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        self.iniciar_sesion()
+
+    def test_reenvio_con_la_misma_clave_no_crea_otra_fila(self):
+        primero = self.enviar([jornal('tablet-1')])
+        self.assertEqual(primero[0]['estado'], 'creado')
+        registro = registro_trabajo.objects.get()
+        self.assertEqual(registro.monto_total, 200)
+
+        reenvio = self.enviar([jornal('tablet-1')])
+        self.assertEqual(reenvio[0], {'clave': 'tablet-1', 'estado': 'duplicado', 'id': registro.pk})
+        self.assertEqual(registro_trabajo.objects.count(), 1)
+
+    def test_clave_repetida_dentro_del_lote(self):
+        resultados = self.enviar([jornal('tablet-1'), jornal('tablet-1', cantidad='5'), jornal('tablet-2')])
+        self.assertEqual([r['estado'] for r in resultados], ['creado', 'duplicado', 'creado'])
+        # Vale la primera aparición
+        self.assertEqual(registro_trabajo.objects.get(clave_idempotencia='tablet-1').cantidad, 2)
+        self.assertEqual(registro_trabajo.objects.count(), 2)
+
+    def test_errores_por_registro(self):
+        resultados = self.enviar([
+            jornal('tablet-1'),
+            jornal('tablet-2', cantidad='no es un número'),
+            {'tipo': 'jornal', 'datos': {}},
+            {'tipo': 'riego', 'clave': 'tablet-3', 'datos': {}},
+        ])
+        self.assertEqual([r['estado'] for r in resultados], ['creado', 'invalido', 'invalido', 'sin_permiso'])
+        self.assertIn('cantidad', resultados[1]['errores'])
+        # Los registros válidos del lote se guardan igual
+        self.assertEqual(list(registro_trabajo.objects.values_list('clave_idempotencia', flat=True)), ['tablet-1'])
+
+    def test_cuerpo_que_no_es_una_lista(self):
+        respuesta = self.client.post(reverse('sincronizar_registros'), '{"tipo": "jornal"}', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class SincronizarConArchivoTests(SincronizarMixin, TransactionTestCase):
+    """Un reenvío tardío de un registro que ya pasó a un año archivado sigue siendo un duplicado."""
+
+    databases = {'default', 'analitica'}
+
+    def setUp(self):
+        # ATTACH no corre dentro de una transacción: por eso TransactionTestCase
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajuste = override_settings(ARCHIVO_DIR=directorio)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(self.desadjuntar)
+        self.iniciar_sesion()
+
+    def desadjuntar(self):
+        with connection.cursor() as cursor:
+            for anio in anios_archivados():
+                cursor.execute(f'DETACH DATABASE "{esquema_archivo(anio)}"')
+        connection.anios_archivo = ()
+
+    def test_clave_de_un_registro_archivado(self):
+        creado = self.enviar([jornal('tablet-1', fecha='2023-05-03')])[0]
+        archivar_anio(2023)
+        self.assertFalse(registro_trabajo.objects.exists())
+
+        reenvio = self.enviar([jornal('tablet-1', fecha='2023-05-03')])
+        self.assertEqual(reenvio[0], {'clave': 'tablet-1', 'estado': 'duplicado', 'id': creado['id']})
+        self.assertFalse(registro_trabajo.objects.exists())
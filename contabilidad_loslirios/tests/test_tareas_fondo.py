@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.http import QueryDict
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from contabilidad_loslirios import tareas_fondo
+from contabilidad_loslirios.models import TrabajoSegundoPlano
+from contabilidad_loslirios.tareas_fondo import (
+    encolar, esperar_trabajos, parametros_de, recuperar_trabajos, ruta_resultado, trabajo_en_segundo_plano,
+)
+
+
+@trabajo_en_segundo_plano('prueba')
+def _trabajo_de_prueba(trabajo, archivo, avanzar):
+    parametros = parametros_de(trabajo)
+    if parametros.get('fallar'):
+        archivo.write('a medias')
+        raise RuntimeError('falló a propósito')
+    for i in range(4):
+        archivo.write(f"{parametros.get('texto', '')}{i}\n")
+        avanzar(i + 1, 4)
+    if parametros.get('dormir'):
+        # Sin llamar a avanzar: solo el hilo del latido da señales de vida
+        latido = TrabajoSegundoPlano.objects.get(pk=trabajo.pk).latido
+        time.sleep(float(parametros['dormir']))
+        archivo.write(str(TrabajoSegundoPlano.objects.get(pk=trabajo.pk).latido > latido))
+
+
+class TareasFondoTests(TransactionTestCase):
+    """Cola de trabajos en segundo plano: ejecución, errores, latido y recuperación tras un reinicio."""
+
+    # Los trabajos corren en otros hilos, con su propia conexión: necesitan ver los datos confirmados
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajuste = override_settings(TRABAJOS_DIR=directorio)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        # La recuperación automática del primer uso se prueba por separado
+        recuperado = mock.patch.object(tareas_fondo, '_recuperado', True)
+        recuperado.start()
+        self.addCleanup(recuperado.stop)
+        self.addCleanup(esperar_trabajos)
+
+    def encolar(self, **parametros):
+        consulta = QueryDict(mutable=True)
+        consulta.update(parametros)
+        trabajo = encolar('prueba', consulta)
+        esperar_trabajos()
+        trabajo.refresh_from_db()
+        return trabajo
+
+    def test_trabajo_terminado(self):
+        trabajo = self.encolar(texto='fila')
+        self.assertEqual((trabajo.estado, trabajo.progreso), ('terminado', 100))
+        self.assertIsNotNone(trabajo.finalizado)
+        with open(ruta_resultado(trabajo), encoding='utf-8') as archivo:
+            self.assertEqual(archivo.read(), 'fila0\nfila1\nfila2\nfila3\n')
+
+    def test_tipo_desconocido(self):
+        with self.assertRaises(ValueError):
+            encolar('otro', QueryDict())
+
+    def test_trabajo_que_falla_no_deja_archivo(self):
+        with self.assertLogs('contabilidad_loslirios.tareas_fondo', 'ERROR'):
+            trabajo = self.encolar(fallar='1')
+        self.assertEqual((trabajo.estado, trabajo.error, trabajo.archivo), ('error', 'falló a propósito', ''))
+        self.assertEqual(os.listdir(settings.TRABAJOS_DIR), [])
+
+    def test_latido_sin_avances(self):
+        with mock.patch.object(tareas_fondo, 'INTERVALO_LATIDO', 0.05):
+            trabajo = self.encolar(dormir='0.3')
+        self.assertEqual(trabajo.estado, 'terminado')
+        with open(ruta_resultado(trabajo), encoding='utf-8') as archivo:
+            self.assertTrue(archivo.read().endswith('True'))
+
+    def test_recuperar_tras_un_reinicio(self):
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        colgado = TrabajoSegundoPlano.objects.create(tipo='prueba', estado='en_curso', latido=hace_una_hora)
+        vivo = TrabajoSegundoPlano.objects.create(tipo='prueba', estado='en_curso', latido=timezone.now())
+        pendiente = TrabajoSegundoPlano.objects.create(tipo='prueba', parametros={'texto': ['x']})
+
+        reencolados, interrumpidos, borrados = recuperar_trabajos()
+        esperar_trabajos()
+        self.assertEqual((reencolados, interrumpidos, borrados), (1, 1, 0))
+        self.assertEqual(TrabajoSegundoPlano.objects.get(pk=colgado.pk).estado, 'error')
+        self.assertEqual(TrabajoSegundoPlano.objects.get(pk=vivo.pk).estado, 'en_curso')
+        self.assertEqual(TrabajoSegundoPlano.objects.get(pk=pendiente.pk).estado, 'terminado')
+
+    def test_vencimiento_de_resultados(self):
+        viejo = self.encolar()
+        nuevo = self.encolar()
+        hace_un_mes = timezone.now() - timedelta(days=30)
+        TrabajoSegundoPlano.objects.filter(pk=viejo.pk).update(finalizado=hace_un_mes)
+        # Un archivo a medio escribir que ningún trabajo referencia
+        huerfano = os.path.join(settings.TRABAJOS_DIR, 'prueba_huerfano.csv')
+        open(huerfano, 'w').close()
+        os.utime(huerfano, (hace_un_mes.timestamp(), hace_un_mes.timestamp()))
+
+        self.assertEqual(recuperar_trabajos(), (0, 0, 1))
+        self.assertEqual(list(TrabajoSegundoPlano.objects.values_list('pk', flat=True)), [nuevo.pk])
+        self.assertFalse(os.path.exists(ruta_resultado(viejo)))
+        self.assertFalse(os.path.exists(huerfano))
+        self.assertTrue(os.path.exists(ruta_resultado(nuevo)))
@@ -0,0 +1,141 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from .cache_consultas import version_datos
+
+
+def normalizar_nombre(nombre):
+    """
+    Devuelve la clave de búsqueda de un nombre: minúsculas, sin acentos y con
+    los espacios repetidos colapsados. 'José  Pérez ' -> 'jose perez'.
+    """
+    if not nombre:
+        return ''
+    sin_acentos = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', sin_acentos).strip().lower()
+
+
+def limpiar_nombre(nombre):
+    """Nombre para mostrar: espacios colapsados y cada palabra con mayúscula inicial."""
+    return re.sub(r'\s+', ' ', nombre or '').strip().title()
+
+
+class IndiceTrabajadores:
+    """
+    Índice en memoria para autocompletar nombres de trabajadores por prefijo.
+
+    Mantiene una lista ordenada de claves (una por cada palabra del nombre, así
+    'gonz' encuentra a 'Juan González') y resuelve cada búsqueda con bisect,
+    sin consultar la base de datos. Se carga la primera vez que se usa, se
+    actualiza desde las señales de guardado y se recarga cuando otro proceso
+    cambia la tabla (la versión del grupo 'trabajadores' vive en el cache compartido
+    y cada proceso la relee a lo sumo cada SEGUNDOS_VERSION).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._claves = []       # Lista ordenada de (clave, nombre)
+        self._canonicos = {}    # nombre_normalizado -> nombre
+        self._cargado = False
+        self._version = None
+
+    def _asegurar_carga(self):
+        if not self._cargado or self._version != version_datos('trabajadores'):
+            self.cargar()
+
+    def cargar(self):
+        """(Re)construye el índice a partir de la tabla de trabajadores."""
+        from .models import Trabajador
+
+        # La versión se lee antes que la tabla: un cambio durante la carga fuerza otra
+        version = version_datos('trabajadores')
+        canonicos = dict(Trabajador.objects.values_list('nombre_normalizado', 'nombre'))
+        claves = sorted(
+            (clave, nombre)
+            for normalizado, nombre in canonicos.items()
+            for clave in self._claves_de(normalizado)
+        )
+        with self._lock:
+            self._canonicos = canonicos
+            self._claves = claves
+            self._cargado = True
+            self._version = version
+
+    @staticmethod
+    def _claves_de(normalizado):
+        palabras = normalizado.split(' ')
+        return {' '.join(palabras[i:]) for i in range(len(palabras))}
+
+    def agregar(self, nombre):
+        """Incorpora un trabajador al índice (idempotente)."""
+        normalizado = normalizar_nombre(nombre)
+        if not normalizado:
+            return
+        with self._lock:
+            if not self._cargado or normalizado in self._canonicos:
+                return
+            self._canonicos[normalizado] = nombre
+            for clave in self._claves_de(normalizado):
+                insort(self._claves, (clave, nombre))
+
+    def quitar(self, nombre):
+        normalizado = normalizar_nombre(nombre)
+        with self._lock:
+            if self._canonicos.pop(normalizado, None) is None:
+                return
+            self._claves = [(c, n) for c, n in self._claves if n != nombre]
+
+    def buscar(self, prefijo, limite=10):
+        """Devuelve hasta `limite` nombres cuyo nombre o apellido empieza con `prefijo`."""
+        self._asegurar_carga()
+        prefijo = normalizar_nombre(prefijo)
+        if not prefijo:
+            return []
+        resultados = []
+        with self._lock:
+            i = bisect_left(self._claves, (prefijo, ''))
+            while i < len(self._claves) and len(resultados) < limite:
+                clave, nombre = self._claves[i]
+                if not clave.startswith(prefijo):
+                    break
+                if nombre not in resultados:
+                    resultados.append(nombre)
+                i += 1
+        return sorted(resultados)
+
+
+indice_trabajadores = IndiceTrabajadores()
+
+
+def nombre_registrado(nombre):
+    """
+    Nombre con el que está registrado el trabajador que coincide con `nombre` una vez
+    normalizado, o None. Se consulta la tabla (nombre_normalizado es único e indexado)
+    y no el índice, para ver también lo que registraron otros procesos.
+    """
+    from .models import Trabajador
+
+    normalizado = normalizar_nombre(nombre)
+    if not normalizado:
+        return None
+    return Trabajador.objects.filter(nombre_normalizado=normalizado).values_list('nombre', flat=True).first()
+
+
+def registrar_trabajador(nombre):
+    """
+    Asegura que el trabajador exista en la tabla normalizada y en el índice.
+    Devuelve el nombre canónico con el que quedó registrado.
+    """
+    from .models import Trabajador
+
+    normalizado = normalizar_nombre(nombre)
+    if not normalizado:
+        return nombre
+    trabajador, _ = Trabajador.objects.get_or_create(
+        nombre_normalizado=normalizado,
+        defaults={'nombre': limpiar_nombre(nombre)},
+    )
+    indice_trabajadores.agregar(trabajador.nombre)
+    return trabajador.nombre
@@ -18,17 +18,27 @@ urlpatterns = [
     path('administracion/movimientos/exportar/csv', views.exportar_movimientos_csv, name='exportar_movimientos_csv'),
     #APIs
     path('api/administracion/get-tasks/<str:classification>/', views.get_tasks_for_classification, name='get_tasks_for_classification'),
+    path('api/administracion/get-trabajadores/', views.get_trabajadores, name='get_trabajadores'),
     path('api/administracion/get-classifications/<str:tipo>/', views.get_classifications_for_type, name='get_classifications_for_type'),
     #Ingresos
     path('administracion/ingresos/cargar', views.cargar_ingresos, name='cargar_ingresos'),
     path('administracion/ingresos/consultar', views.consultar_ingresos, name='consultar_ingresos'),
     path('administracion/ingresos/exportar/csv', views.exportar_ingresos_csv, name='exportar_ingresos_csv'),
+    #Saldos
+    path('api/administracion/saldo/', views.saldo_a_fecha_api, name='saldo_a_fecha_api'),
+    #Liquidaciones
+    path('administracion/liquidaciones/', views.liquidaciones, name='liquidaciones'),
+    path('administracion/liquidaciones/<int:pk>/', views.liquidacion_periodo, name='liquidacion_periodo'),
+    path('administracion/liquidaciones/<int:pk>/exportar/csv', views.exportar_liquidaciones_csv, name='exportar_liquidaciones_csv'),
+    #Revisión de precios
+    path('administracion/jornales/revisar_precios', views.revisar_precios_jornales, name='revisar_precios'),
 #URLs for Producción
     path('produccion/', views.produccion, name='produccion'),
     # URLs para Riego y Fertilización
     path('produccion/riego/cargar/', views.cargar_riego, name='cargar_riego'),
     path('produccion/riego/consultar/', views.consultar_riego, name='consultar_riego'),
     path('produccion/riego/exportar/csv/', views.exportar_riegos_csv, name='exportar_riegos_csv'),
+    path('api/produccion/riego/calor/', views.riego_calor_api, name='riego_calor_api'),
     # APIs 
     path('api/produccion/get-parrales/<str:cabezal>/', views.get_parrales_for_cabezal, name='get_parrales_for_cabezal'),
     path('api/produccion/get-valvulas/<str:cabezal>/<str:parral>/', views.get_valvulas_for_parral, name='get_valvulas_for_parral'),
@@ -37,4 +47,19 @@ urlpatterns = [
     path('visualizacion/analisis/movimientos/', views.analisis_movimientos, name='analisis_movimientos'),
     # URL para la nueva API del gráfico de líneas
     path('api/visualizacion/movimientos/line-chart-data/', views.line_chart_data_api, name='line_chart_data_api'),
+    path('api/visualizacion/movimientos/<str:bloque>/', views.movimientos_data_api, name='movimientos_data_api'),
+    path('api/visualizacion/jornales/<str:bloque>/', views.jornales_data_api, name='jornales_data_api'),
+    path('visualizacion/analisis/flujo-caja/', views.analisis_flujo_caja, name='analisis_flujo_caja'),
+    path('api/visualizacion/flujo-caja/', views.flujo_caja_data_api, name='flujo_caja_data_api'),
+#URL for offline batch sync
+    path('api/sincronizar/', views.sincronizar_registros, name='sincronizar_registros'),
+#URL for the read API
+    path('api/registros/<str:recurso>/', views.registros_api, name='registros_api'),
+#URLs for background jobs
+    path('trabajos/<str:tipo>/encolar/', views.encolar_trabajo, name='encolar_trabajo'),
+    path('api/trabajos/<int:pk>/', views.estado_trabajo, name='estado_trabajo'),
+    path('trabajos/<int:pk>/descargar/', views.descargar_trabajo, name='descargar_trabajo'),
+#URLs for request profiles (staff)
+    path('administracion/perfiles/', views.perfiles, name='perfiles'),
+    path('administracion/perfiles/<str:nombre>/', views.perfil_detalle, name='perfil_detalle'),
     ]
\ No newline at end of file
@@ -1,18 +1,42 @@
 from django.shortcuts import render, redirect
+from django.conf import settings
 from .forms import *
 from .models import *
-from django.db.models import Q, Sum, F, Value, CharField, ExpressionWrapper, DecimalField
-from django.db.models.functions import TruncYear, TruncQuarter, TruncMonth, TruncDay, Coalesce, Cast
+from django.db import transaction
+from django.db.models import Q, Sum, Count, F, Value, ExpressionWrapper, DecimalField
+from django.db.models.functions import TruncYear, TruncQuarter, TruncMonth, TruncDay
 import csv
-from datetime import datetime
-from django.http import HttpResponse
+import os
+from datetime import date, datetime, timedelta
+from django.http import HttpResponse, FileResponse, Http404
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
-from django.http import JsonResponse
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 import json
 from decimal import Decimal
 from django.forms import modelformset_factory
+from .trabajadores import indice_trabajadores, registrar_trabajador
+from .cambio import MONEDA_BASE, anotar_monto_normalizado, monedas_sin_cotizacion
+from .cache_consultas import invalidar, obtener_o_calcular
+from .consultas_async import en_hilo
+from .respuestas_api import permiso_api, respuesta_api
+from .libro_mayor import saldo_a_fecha
+from .liquidaciones import cerrar_periodo, escribir_liquidaciones_csv
+from .precios import jornales_a_revisar, revisar_precios, simular_revision
+from .parcelas import kpis_parcelas
+from .calor_riego import empaquetar, matriz_riego
+from .geometria import PRECISION_POLILINEA
+from .perfilado import listar_perfiles, resumen_perfil, ruta_perfil
+from .archivo import con_archivo, partes
+from .analitica import usar_analitica
+from .series_temporales import contar_periodos, generar_periodos, lttb, truncar
+from .tareas_fondo import asegurar_recuperacion, encolar, parametros_de, ruta_resultado, trabajo_en_segundo_plano
 # Create your views here.
 
 #Logic for main page
@@ -21,19 +45,47 @@ def main(request):
     return render(request, 'contabilidad_loslirios/main.html')
 
 #API endpoint to get all parcelas in GeoJSON format
-def parcelas_geojson(request):
+@permiso_api(lambda request: 'contabilidad_loslirios.can_view_analisis_data' if request.GET.get('kpis') else None)
+@respuesta_api(grupos=['parcelas', 'jornales', 'riegos'], private=True, max_age=300)
+async def parcelas_geojson(request):
     """
     Esta vista devuelve todas las parcelas en formato GeoJSON.
+
+    Con ?kpis=1 (y opcionalmente desde/hasta en AAAA-MM-DD) agrega a cada parcela el
+    costo de mano de obra, las horas de riego y los litros de fertilizante del rango,
+    totales y por hectárea, para colorear el mapa.
+
+    Con ?bbox=oeste,sur,este,norte devuelve solo las parcelas cuya caja se cruza con
+    ese rectángulo (filtra por las columnas indexadas, sin leer los polígonos).
+
+    Con ?formato=codificado cada parcela lleva su contorno tal como está guardado
+    (encoded polyline de [lat, lon], ver geometria.py) en "poligono" y "geometry" va
+    vacío: la respuesta es mucho más chica y el servidor no decodifica nada.
     """
+    codificado = request.GET.get('formato') == 'codificado'
     parcelas = Parcela.objects.all()
+    if request.GET.get('bbox'):
+        try:
+            oeste, sur, este, norte = (float(valor) for valor in request.GET['bbox'].split(','))
+        except ValueError:
+            return JsonResponse({'error': 'bbox debe ser oeste,sur,este,norte en grados.'}, status=400)
+        parcelas = parcelas.filter(lat_min__lte=norte, lat_max__gte=sur, lon_min__lte=este, lon_max__gte=oeste)
+    kpis = None
+    if request.GET.get('kpis'):
+        desde, hasta = _fecha_param(request, 'desde'), _fecha_param(request, 'hasta')
+        kpis = await en_hilo(
+            obtener_o_calcular, 'parcelas:kpis', {'desde': str(desde), 'hasta': str(hasta)},
+            ['parcelas', 'jornales', 'riegos'], lambda: kpis_parcelas(desde, hasta),
+        )
     
     # Creamos la estructura base de un FeatureCollection de GeoJSON
     features = []
-    for parcela in parcelas:
-        if parcela.coordenadas: # Solo incluimos parcelas con coordenadas
+    async for parcela in parcelas:
+        if parcela.poligono: # Solo incluimos parcelas con coordenadas
             features.append({
                 "type": "Feature",
-                "geometry": {
+                "bbox": [parcela.lon_min, parcela.lat_min, parcela.lon_max, parcela.lat_max],
+                **({"geometry": None, "poligono": parcela.poligono} if codificado else {"geometry": {
                     "type": "Polygon",
                     # El formato GeoJSON para polígonos requiere una lista de anillos, 
                     # el primero es el contorno exterior.
@@ -41,12 +93,16 @@ def parcelas_geojson(request):
                         # Invertimos [lat, lon] a [lon, lat] como lo espera GeoJSON
                         [[lon, lat] for lat, lon in parcela.coordenadas]
                     ]
-                },
+                }}),
                 "properties": {
                     "nombre": parcela.nombre,
                     "variedad": parcela.variedad or "N/D",
                     "superficie_ha": parcela.superficie_ha or "N/D",
                     "cabezal_riego": parcela.cabezal_riego or "N/D",
+                    "area_ha": parcela.area_ha,
+                    # [lon, lat], para ubicar etiquetas sin recorrer el polígono
+                    "centroide": [parcela.centroide_lon, parcela.centroide_lat],
+                    **(kpis['parcelas'].get(parcela.nombre, {}) if kpis else {}),
                 }
             })
             
@@ -54,6 +110,11 @@ def parcelas_geojson(request):
         "type": "FeatureCollection",
         "features": features
     }
+    if codificado:
+        geojson_data["precision"] = PRECISION_POLILINEA
+    if kpis:
+        # Lo que no se pudo asociar a ninguna parcela del mapa (ubicaciones mal escritas, etc.)
+        geojson_data["sin_parcela"] = kpis['sin_parcela']
     
     return JsonResponse(geojson_data)
 
@@ -70,13 +131,27 @@ def contabilidad(request):
 
 #Logic for Jornales
 #API endpoint to get tasks based on classification
-def get_tasks_for_classification(request, classification):
+@respuesta_api(private=True, max_age=86400)
+async def get_tasks_for_classification(request, classification):
     """
     Devuelve una lista de tareas en formato JSON para una clasificación dada.
     """
     tasks = TAREAS_POR_CLASIFICACION.get(classification, [])
     return JsonResponse({'tasks': tasks})
 
+#API endpoint to autocomplete worker names
+@permission_required('contabilidad_loslirios.can_view_jornales', raise_exception=True)
+@login_required
+@respuesta_api(grupos=['trabajadores'], private=True, max_age=60)
+async def get_trabajadores(request):
+    """
+    Devuelve los trabajadores cuyo nombre o apellido empieza con el parámetro 'q'.
+    Se resuelve desde el índice en memoria, sin consultar la base de datos.
+    """
+    # La primera búsqueda del proceso carga el índice desde la base
+    trabajadores = await en_hilo(indice_trabajadores.buscar, request.GET.get('q', ''))
+    return JsonResponse({'trabajadores': trabajadores})
+
 #Logic for cargar_jornal page:
 @permission_required('contabilidad_loslirios.can_add_jornales', raise_exception=True)
 @login_required
@@ -132,8 +207,16 @@ def _obtener_registros_filtrados(request):
     Función auxiliar para obtener los registros filtrados basada en los parámetros GET.
     Reutiliza la lógica de filtrado de consultar_jornal.
     """
-    form = FormConsultaJornal(request.GET)
-    registros = registro_trabajo.objects.all().order_by('-fecha')
+    return _filtrar_registros(request.GET)
+
+def _filtrar_registros(datos, registros=None):
+    """
+    Aplica los filtros de FormConsultaJornal (datos: un QueryDict) sobre los jornales,
+    o sobre `registros` si se pasa otro queryset de partida (p. ej. con values()).
+    """
+    form = FormConsultaJornal(datos)
+    if registros is None:
+        registros = registro_trabajo.objects.all().order_by('-fecha')
 
     if form.is_valid():
         fecha_desde = form.cleaned_data.get('fecha_desde')
@@ -162,27 +245,36 @@ def _obtener_registros_filtrados(request):
         if detalle:
             filtros &= Q(detalle__icontains=detalle) 
 
-        registros = registros.filter(filtros)
+        # Si el rango de fechas llega a años archivados, se suman sus archivos (ver archivo.py)
+        registros = con_archivo(registros.filter(filtros), fecha_desde, fecha_hasta)
 
     return registros
 
 #import csv
 @permission_required('contabilidad_loslirios.can_export_jornales', raise_exception=True)
 @login_required
+@usar_analitica
 def exportar_jornales_csv(request):
     registros = _obtener_registros_filtrados(request)
 
     response = HttpResponse(content_type='text/csv')
     filename = f"jornales_consulta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    _escribir_jornales_csv(response, registros)
+    return response
 
-    writer = csv.writer(response)
+def _escribir_jornales_csv(archivo, registros, avanzar=None):
+    """Escribe los jornales en `archivo` (la respuesta HTTP o un archivo de un trabajo en segundo plano)."""
+    writer = csv.writer(archivo)
 
     # Encabezados del CSV (Añadimos 'Detalle')
-    writer.writerow(['Fecha', 'Nombre Trabajador', 'Clasificacion', 'Tarea', 'Detalle', 'Cantidad', 'Unidad Medida', 'Precio', 'Ubicacion'])
+    writer.writerow(['Fecha', 'Nombre Trabajador', 'Clasificacion', 'Tarea', 'Detalle', 'Cantidad', 'Unidad Medida', 'Precio', 'Ubicacion', 'Monto Total'])
 
     # Datos
-    for registro in registros:
+    total = registros.count() if avanzar else 0
+    for i, registro in enumerate(registros.iterator(chunk_size=2000), start=1):
+        if avanzar and i % 500 == 0:
+            avanzar(i, total)
         writer.writerow([
             registro.fecha.strftime('%Y-%m-%d'),
             registro.nombre_trabajador,
@@ -195,12 +287,12 @@ def exportar_jornales_csv(request):
             registro.ubicacion,
             registro.monto_total,
         ])
-    return response
 
 
 #Logic for movimientos
 # API endpoint to get classifications based on type
-def get_classifications_for_type(request, tipo):
+@respuesta_api(private=True, max_age=86400)
+async def get_classifications_for_type(request, tipo):
     classifications = CLASIFICACIONES_POR_TIPO.get(tipo, [])
     return JsonResponse({'classifications': classifications})
 
@@ -250,8 +342,12 @@ def consultar_movimiento(request):
 #Auxiliary function to export filtered records to CSV
 @login_required
 def _obtener_movimientos_filtrados(request):
-    form = FormConsultaMovimiento(request.GET)
-    movimientos = MovimientoFinanciero.objects.all() # El ordenado ya está en el Meta del modelo
+    return _filtrar_movimientos(request.GET)
+
+def _filtrar_movimientos(datos, movimientos=None):
+    form = FormConsultaMovimiento(datos)
+    if movimientos is None:
+        movimientos = MovimientoFinanciero.objects.all() # El ordenado ya está en el Meta del modelo
 
     if form.is_valid():
         filtros = Q()
@@ -265,29 +361,36 @@ def _obtener_movimientos_filtrados(request):
                 else:
                     filtros &= Q(**{f'{field}__exact': value})
 
-        movimientos = movimientos.filter(filtros)
+        movimientos = con_archivo(movimientos.filter(filtros), form.cleaned_data.get('fecha_desde'), form.cleaned_data.get('fecha_hasta'))
 
     return movimientos
 
 #import csv
 @permission_required('contabilidad_loslirios.can_export_movimientos', raise_exception=True)
 @login_required
+@usar_analitica
 def exportar_movimientos_csv(request):
     movimientos = _obtener_movimientos_filtrados(request)
     response = HttpResponse(content_type='text/csv')
     filename = f"movimientos_consulta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
+    _escribir_movimientos_csv(response, movimientos)
+    return response
+
+def _escribir_movimientos_csv(archivo, movimientos, avanzar=None):
+    writer = csv.writer(archivo)
 
     # Nuevos encabezados
     writer.writerow(['Fecha', 'Origen', 'Finca', 'Tipo', 'Clasificacion', 'Detalle', 'Monto', 'Moneda', 'Forma de Pago'])
 
     # Nuevos datos
-    for m in movimientos:
+    total = movimientos.count() if avanzar else 0
+    for i, m in enumerate(movimientos.iterator(chunk_size=2000), start=1):
+        if avanzar and i % 500 == 0:
+            avanzar(i, total)
         writer.writerow([
             m.fecha.strftime('%Y-%m-%d'), m.origen, m.finca, m.tipo, m.clasificacion, m.detalle, f"{m.monto:.2f}", m.moneda, m.forma_pago
         ])
-    return response
 
 #Logic for ingresos page:
 #Logic for cargar_ingresos page:
@@ -335,8 +438,12 @@ def consultar_ingresos(request):
 #Auxiliary function to export filtered ingresos to CSV
 @login_required
 def _obtener_ingresos_filtrados(request):
-    form = FormConsultaIngreso(request.GET)
-    ingresos = IngresoFinanciero.objects.all() 
+    return _filtrar_ingresos(request.GET)
+
+def _filtrar_ingresos(datos, ingresos=None):
+    form = FormConsultaIngreso(datos)
+    if ingresos is None:
+        ingresos = IngresoFinanciero.objects.all()
 
     if form.is_valid():
         filtros = Q()
@@ -349,31 +456,143 @@ def _obtener_ingresos_filtrados(request):
                 else:
                     filtros &= Q(**{f'{field}__exact': value})
 
-        ingresos = ingresos.filter(filtros)
+        ingresos = con_archivo(ingresos.filter(filtros), form.cleaned_data.get('fecha_desde'), form.cleaned_data.get('fecha_hasta'))
 
     return ingresos
 
 #import csv
 @permission_required('contabilidad_loslirios.can_export_ingresos', raise_exception=True)
 @login_required
+@usar_analitica
 def exportar_ingresos_csv(request):
     ingresos = _obtener_ingresos_filtrados(request)
     response = HttpResponse(content_type='text/csv')
     filename = f"ingresos_consulta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
+    _escribir_ingresos_csv(response, ingresos)
+    return response
+
+def _escribir_ingresos_csv(archivo, ingresos, avanzar=None):
+    writer = csv.writer(archivo)
 
     # Nuevos encabezados
     writer.writerow(['Fecha', 'Origen', 'Finca', 'Detalle', 'Monto', 'Moneda', 'Forma de Pago'])
 
     # Nuevos datos
-    for ingreso in ingresos:
+    total = ingresos.count() if avanzar else 0
+    for i, ingreso in enumerate(ingresos.iterator(chunk_size=2000), start=1):
+        if avanzar and i % 500 == 0:
+            avanzar(i, total)
         writer.writerow([
             ingreso.fecha.strftime('%Y-%m-%d'), ingreso.origen, ingreso.finca, ingreso.detalle, f"{ingreso.monto:.2f}", ingreso.moneda, ingreso.forma_pago
         ])
+
+
+
+#API endpoint for balance at a given date
+@permission_required(['contabilidad_loslirios.can_view_movimientos', 'contabilidad_loslirios.can_view_ingresos'], raise_exception=True)
+@login_required
+@respuesta_api(grupos=['finanzas'], private=True, no_cache=True)
+@usar_analitica
+def saldo_a_fecha_api(request):
+    """
+    Devuelve el saldo de una finca en una moneda (y opcionalmente un origen) al
+    cierre de la fecha pedida, a partir de las fotos mensuales del libro mayor.
+    """
+    form = FormConsultaSaldo(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errores': form.errors}, status=400)
+    datos = form.cleaned_data
+    saldo = saldo_a_fecha(datos['finca'], datos['moneda'], datos['fecha'], origen=datos.get('origen') or None)
+    return JsonResponse({
+        'finca': datos['finca'],
+        'moneda': datos['moneda'],
+        'origen': datos.get('origen') or None,
+        'fecha': datos['fecha'].isoformat(),
+        'saldo': float(saldo),
+    })
+
+#Logic for liquidaciones page:
+@permission_required('contabilidad_loslirios.can_view_liquidaciones', raise_exception=True)
+@login_required
+def liquidaciones(request):
+    lunes = date.today() - timedelta(days=date.today().weekday())
+    form = FormCerrarLiquidacion(request.POST or None, initial={'desde': lunes - timedelta(days=7), 'hasta': lunes - timedelta(days=1)})
+    if request.method == 'POST':
+        if not request.user.has_perm('contabilidad_loslirios.can_close_liquidaciones'):
+            raise PermissionDenied
+        if form.is_valid():
+            try:
+                periodo = cerrar_periodo(form.cleaned_data['desde'], form.cleaned_data['hasta'], request.user)
+            except ValueError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, f'Período {periodo} cerrado: {periodo.cantidad_trabajadores} liquidaciones.')
+                return redirect('liquidacion_periodo', pk=periodo.pk)
+        else:
+            messages.error(request, f'Error al cerrar el período: {form.errors.as_text()}')
+
+    paginator = Paginator(PeriodoLiquidacion.objects.all(), 10)
+    context = {
+        'form': form,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'contabilidad_loslirios/administracion/liquidaciones.html', context)
+
+@permission_required('contabilidad_loslirios.can_view_liquidaciones', raise_exception=True)
+@login_required
+def liquidacion_periodo(request, pk):
+    # Las liquidaciones son fotos guardadas al cerrar el período: no se recalcula nada
+    periodo = get_object_or_404(PeriodoLiquidacion, pk=pk)
+    plantilla = 'liquidacion_imprimir.html' if request.GET.get('imprimir') else 'liquidacion_periodo.html'
+    context = {
+        'periodo': periodo,
+        'liquidaciones': periodo.liquidaciones.all(),
+    }
+    return render(request, f'contabilidad_loslirios/administracion/{plantilla}', context)
+
+@permission_required('contabilidad_loslirios.can_view_liquidaciones', raise_exception=True)
+@login_required
+def exportar_liquidaciones_csv(request, pk):
+    periodo = get_object_or_404(PeriodoLiquidacion, pk=pk)
+    response = HttpResponse(content_type='text/csv')
+    filename = f"liquidaciones_{periodo.desde:%Y%m%d}_{periodo.hasta:%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    escribir_liquidaciones_csv(response, periodo)
     return response
 
 
+#Logic for revisar_precios page:
+@permission_required('contabilidad_loslirios.can_revise_precios', raise_exception=True)
+@login_required
+def revisar_precios_jornales(request):
+    """
+    Primero muestra cuántos jornales cambiarían y cómo quedan los montos; con
+    'confirmar' aplica el precio nuevo en un solo UPDATE.
+    """
+    form = FormRevisarPrecios(request.POST or None)
+    resumen = None
+    if request.method == 'POST':
+        if form.is_valid():
+            datos = form.cleaned_data
+            try:
+                jornales = jornales_a_revisar(datos['tarea'], datos['clasificacion'], datos['fecha_desde'], datos['fecha_hasta'])
+            except ValueError as exc:
+                messages.error(request, str(exc))
+            else:
+                if 'confirmar' in request.POST:
+                    actualizados = revisar_precios(jornales, datos['precio'])
+                    messages.success(request, f'Se actualizaron {actualizados} jornales a ${datos["precio"]}.')
+                    return redirect('revisar_precios')
+                resumen = simular_revision(jornales, datos['precio'])
+        else:
+            messages.error(request, f'Error en la revisión: {form.errors.as_text()}')
+
+    context = {
+        'form': form,
+        'resumen': resumen,
+    }
+    return render(request, 'contabilidad_loslirios/administracion/revisar_precios.html', context)
 
 
 #Logic for produccion page:
@@ -383,7 +602,8 @@ def produccion(request):
     return render(request, 'contabilidad_loslirios/produccion.html')
 
 # API endpoint to get parrales based on the selected cabezal
-def get_parrales_for_cabezal(request, cabezal):
+@respuesta_api(private=True, max_age=86400)
+async def get_parrales_for_cabezal(request, cabezal):
     """
     Devuelve una lista de parrales en formato JSON para un cabezal dado.
     """
@@ -391,7 +611,8 @@ def get_parrales_for_cabezal(request, cabezal):
     return JsonResponse({'parrales': parrales})
 
 # API endpoint to get valves based on the selected cabezal and parral
-def get_valvulas_for_parral(request, cabezal, parral):
+@respuesta_api(private=True, max_age=86400)
+async def get_valvulas_for_parral(request, cabezal, parral):
     """
     Devuelve una lista de válvulas en formato JSON para un parral y cabezal dados.
     """
@@ -440,12 +661,17 @@ def consultar_riego(request):
 # Logic for exportar_riego page 
 @permission_required('contabilidad_loslirios.can_view_riego', raise_exception=True) # O un nuevo permiso de exportación si lo creas
 @login_required
+@usar_analitica
 def exportar_riegos_csv(request):
     registros = _obtener_riegos_filtrados(request)
     response = HttpResponse(content_type='text/csv')
     filename = f"registros_riego_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
+    _escribir_riegos_csv(response, registros)
+    return response
+
+def _escribir_riegos_csv(archivo, registros, avanzar=None):
+    writer = csv.writer(archivo)
 
     # Encabezados del CSV
     writer.writerow([
@@ -454,9 +680,12 @@ def exportar_riegos_csv(request):
     ])
 
     # Datos
-    for r in registros:
+    total = registros.count() if avanzar else 0
+    for i, r in enumerate(registros.iterator(chunk_size=2000), start=1):
+        if avanzar and i % 500 == 0:
+            avanzar(i, total)
         writer.writerow([
-            r.cabezal, r.parral, r.valvulas_abiertas,
+            r.cabezal, r.parral, r.valvula_abierta,
             r.inicio.strftime('%Y-%m-%d %H:%M'),
             r.fin.strftime('%Y-%m-%d %H:%M'),
             f"{r.total_horas:.2f}",
@@ -464,15 +693,46 @@ def exportar_riegos_csv(request):
             f"{r.fertilizante_litros:.2f}" if r.fertilizante_litros is not None else 'N/A',
             r.responsable
         ])
-    return response
+# API endpoint with the irrigation heatmap (binary)
+# Rango máximo del mapa de calor (≈ 3 años: 40 parrales ocupan menos de 200 KB)
+MAXIMO_DIAS_CALOR_RIEGO = 1100
+
+@permission_required('contabilidad_loslirios.can_view_riego', raise_exception=True)
+@login_required
+@respuesta_api(grupos=['riegos'], private=True, no_cache=True)
+@usar_analitica
+def riego_calor_api(request):
+    """
+    Horas de riego por parral y por día entre desde y hasta (por defecto, el último
+    año) en el formato binario de calor_riego.empaquetar: un encabezado JSON con las
+    filas y los días, seguido de los valores como float32 little-endian.
+    """
+    for nombre in ('desde', 'hasta'):
+        if request.GET.get(nombre) and _fecha_param(request, nombre) is None:
+            return JsonResponse({'error': f'"{nombre}" debe ser una fecha AAAA-MM-DD.'}, status=400)
+    hasta = _fecha_param(request, 'hasta') or date.today()
+    desde = _fecha_param(request, 'desde') or hasta - timedelta(days=364)
+    if desde > hasta or (hasta - desde).days >= MAXIMO_DIAS_CALOR_RIEGO:
+        return JsonResponse({'error': f'El rango debe tener entre 1 y {MAXIMO_DIAS_CALOR_RIEGO} días.'}, status=400)
+
+    contenido = obtener_o_calcular(
+        'riego:calor', {'desde': desde.isoformat(), 'hasta': hasta.isoformat()}, ['riegos'],
+        lambda: empaquetar(desde, *matriz_riego(desde, hasta)),
+    )
+    return HttpResponse(contenido, content_type='application/octet-stream')
+
 # Auxiliary function to get filtered irrigation records
 @login_required
 def _obtener_riegos_filtrados(request):
     """
     Función auxiliar para obtener los registros de riego filtrados.
     """
-    registros = RegistroRiego.objects.all()
-    form = FormConsultaRiego(request.GET)
+    return _filtrar_riegos(request.GET)
+
+def _filtrar_riegos(datos, registros=None):
+    if registros is None:
+        registros = RegistroRiego.objects.all()
+    form = FormConsultaRiego(datos)
 
     if form.is_valid():
         filtros = Q()
@@ -488,210 +748,727 @@ def _obtener_riegos_filtrados(request):
         if form.cleaned_data.get('responsable'):
             filtros &= Q(responsable__icontains=form.cleaned_data['responsable'])
         
-        registros = registros.filter(filtros)
+        registros = con_archivo(registros.filter(filtros), form.cleaned_data.get('fecha_desde'), form.cleaned_data.get('fecha_hasta'))
         
     return registros
 
 
+#Logic for the read API
+# Recurso: (modelo, permiso, formulario de filtros, función que los aplica)
+RECURSOS_API = {
+    'jornales': (registro_trabajo, 'contabilidad_loslirios.can_view_jornales', FormConsultaJornal, _filtrar_registros),
+    'movimientos': (MovimientoFinanciero, 'contabilidad_loslirios.can_view_movimientos', FormConsultaMovimiento, _filtrar_movimientos),
+    'ingresos': (IngresoFinanciero, 'contabilidad_loslirios.can_view_ingresos', FormConsultaIngreso, _filtrar_ingresos),
+    'riego': (RegistroRiego, 'contabilidad_loslirios.can_view_riego', FormConsultaRiego, _filtrar_riegos),
+}
+# Registros por página del JSON paginado
+LIMITE_API = 500
+MAXIMO_LIMITE_API = 5000
+
+def _campos_api(modelo):
+    return [campo.name for campo in modelo._meta.concrete_fields if campo.name != 'clave_idempotencia']
+
+@login_required
+@permiso_api(lambda request, recurso: RECURSOS_API[recurso][1] if recurso in RECURSOS_API else None)
+@respuesta_api(grupos=['jornales', 'finanzas', 'riegos'], private=True, no_cache=True)
+@usar_analitica
+def registros_api(request, recurso):
+    """
+    Lista de solo lectura de jornales, movimientos, ingresos o riegos con los mismos
+    filtros GET que su página consultar_*, ordenada por clave primaria.
+
+      fields=fecha,monto   solo esas columnas (la clave primaria va siempre); se leen
+                           con values(), sin construir instancias
+      cursor=<pk>          registros con clave mayor que la indicada (paginado por
+                           clave: cada página es una consulta por índice, sin OFFSET)
+      limite=<n>           tamaño de página (por defecto LIMITE_API)
+      formato=ndjson       un objeto JSON por línea, en streaming y sin límite salvo
+                           que se pase `limite`
+
+    El JSON paginado trae `cursor` y `siguiente` (la URL de la página siguiente, o null
+    al final). Para traer solo lo nuevo, basta guardar el último cursor.
+    """
+    if recurso not in RECURSOS_API:
+        raise Http404
+    modelo, _, Formulario, filtrar = RECURSOS_API[recurso]
+    form = Formulario(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Filtros inválidos.', 'errores': form.errors}, status=400)
+
+    clave = modelo._meta.pk.name
+    disponibles = _campos_api(modelo)
+    campos = [campo.strip() for campo in request.GET.get('fields', '').split(',') if campo.strip()] or disponibles
+    desconocidos = [campo for campo in campos if campo not in disponibles]
+    if desconocidos:
+        return JsonResponse({'error': f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(disponibles)}."}, status=400)
+    campos = [clave] + [campo for campo in campos if campo != clave]
+
+    ndjson = request.GET.get('formato') == 'ndjson' or 'application/x-ndjson' in request.headers.get('Accept', '')
+    try:
+        cursor = int(request.GET.get('cursor') or 0)
+        limite = int(request.GET['limite']) if request.GET.get('limite') else (None if ndjson else LIMITE_API)
+    except ValueError:
+        return JsonResponse({'error': 'cursor y limite deben ser números enteros.'}, status=400)
+    if limite is not None and not 1 <= limite <= MAXIMO_LIMITE_API:
+        return JsonResponse({'error': f'limite debe estar entre 1 y {MAXIMO_LIMITE_API}.'}, status=400)
+
+    # La base se fija ahora: el NDJSON se lee después de salir de la vista (y de usar_analitica)
+    base = modelo.objects.all()
+    base = base.using(base.db).filter(pk__gt=cursor).order_by(clave).values(*campos)
+    registros = filtrar(request.GET, base)
+
+    if ndjson:
+        if limite is not None:
+            registros = registros[:limite]
+        lineas = (json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for fila in registros.iterator(chunk_size=2000))
+        return StreamingHttpResponse(lineas, content_type='application/x-ndjson; charset=utf-8')
+
+    filas = list(registros[:limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        parametros = request.GET.copy()
+        parametros['cursor'] = filas[-1][clave]
+        siguiente = f'{request.path}?{parametros.urlencode()}'
+    return JsonResponse({
+        'recurso': recurso,
+        'campos': campos,
+        'resultados': filas,
+        'cursor': filas[-1][clave] if filas else cursor or None,
+        'siguiente': siguiente,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 
 
 
 #Logic for analisis page:
+def _filtros_dashboard(form):
+    """Q con los filtros válidos de un formulario de dashboard: rango de fechas y listas de valores admitidos."""
+    filtros = Q()
+    if form.is_valid():
+        for field, value in form.cleaned_data.items():
+            if value and field != 'moneda_reporte':
+                if field == 'fecha_desde':
+                    filtros &= Q(fecha__gte=value)
+                elif field == 'fecha_hasta':
+                    filtros &= Q(fecha__lte=value)
+                else:
+                    filtros &= Q(**{f'{field}__in': value})
+    return filtros
+
+def _rango_dashboard(form):
+    if not form.is_valid():
+        return None, None
+    return form.cleaned_data.get('fecha_desde'), form.cleaned_data.get('fecha_hasta')
+
+def _sumar(queryset, valor, desde, hasta, agrupar_por=None):
+    """
+    Suma `valor` en SQL sobre `queryset`, en la base activa y los años archivados del
+    rango (ver archivo.py). Sin `agrupar_por` devuelve (total, cantidad de filas); con
+    un campo, {valor del campo: suma}, y con una tupla de campos, {tupla de valores:
+    suma}. Los montos quedan en Decimal.
+    """
+    if agrupar_por is None:
+        total, cantidad = Decimal('0.00'), 0
+        for parte in partes(queryset.order_by(), desde, hasta):
+            fila = parte.aggregate(total=Sum(valor), cantidad=Count('pk'))
+            total += fila['total'] or 0
+            cantidad += fila['cantidad']
+        return total, cantidad
+    campos = agrupar_por if isinstance(agrupar_por, tuple) else (agrupar_por,)
+    agrupadas = queryset.values(*campos).annotate(total=Sum(valor)).order_by()
+    consultas = partes(agrupadas, desde, hasta)
+    sumas = {}
+    for fila in consultas[0].union(*consultas[1:], all=True):
+        clave = tuple(fila[campo] for campo in campos) if isinstance(agrupar_por, tuple) else fila[agrupar_por]
+        sumas[clave] = sumas.get(clave, Decimal('0.00')) + (fila['total'] or 0)
+    return sumas
+
+def _ordenar_grupo(grupo, limite=None):
+    """Pasa un {etiqueta: monto} a {'labels', 'data'} ordenado de mayor a menor."""
+    filas = sorted(grupo.items(), key=lambda g: g[1], reverse=True)[:limite]
+    return {'labels': [etiqueta for etiqueta, _ in filas], 'data': [float(monto) for _, monto in filas]}
+
 #Logic for dashbooard jornales page:
 @permission_required('contabilidad_loslirios.can_view_analisis_data', raise_exception=True)
 @login_required
+@usar_analitica
 def analisis(request):
-    # --- 1. PROCESAR FILTROS ---
+    # Solo la estructura de la página: los KPIs y cada gráfico se piden en paralelo a jornales_data_api
     form = FormFiltroDashboardJornales(request.GET or None)
-    queryset = registro_trabajo.objects.all()
+    context = {
+        'form': form,
+        'agrupacion': request.GET.get('agrupacion', 'mes'),
+    }
+    return render(request, 'contabilidad_loslirios/analisis.html', context)
 
-    if form.is_valid():
-        if form.cleaned_data.get('fecha_desde'):
-            queryset = queryset.filter(fecha__gte=form.cleaned_data['fecha_desde'])
-        if form.cleaned_data.get('fecha_hasta'):
-            queryset = queryset.filter(fecha__lte=form.cleaned_data['fecha_hasta'])
-        if form.cleaned_data.get('clasificacion'):
-            queryset = queryset.filter(clasificacion__in=form.cleaned_data['clasificacion'])
-        if form.cleaned_data.get('tarea'):
-            queryset = queryset.filter(tarea__in=form.cleaned_data['tarea'])
-        if form.cleaned_data.get('ubicacion'):
-            queryset = queryset.filter(ubicacion__in=form.cleaned_data['ubicacion'])
-
-    # --- 2. CALCULAR KPIs ---
-    costo_total_calculado = queryset.annotate(
-        costo=ExpressionWrapper(
-            F('cantidad') * F('precio'),
-            output_field=DecimalField()
-        )
-    ).aggregate(total=Coalesce(Sum('costo'), Decimal('0.00'), output_field=DecimalField()))
-    
-    kpis = {
-        'costo_total': costo_total_calculado['total'],
-        'total_registros': queryset.count(),
-        'trabajadores_activos': queryset.values('nombre_trabajador').distinct().count(),
+def _jornales_dashboard(parametros):
+    """Jornales filtrados con el costo de cada uno, y el rango de fechas del filtro."""
+    form = FormFiltroDashboardJornales(parametros or None)
+    queryset = registro_trabajo.objects.filter(_filtros_dashboard(form)).annotate(
+        costo=ExpressionWrapper(F('cantidad') * F('precio'), output_field=DecimalField(max_digits=15, decimal_places=2))
+    )
+    return (queryset,) + _rango_dashboard(form)
+
+def _jornales_kpis(parametros):
+    queryset, desde, hasta = _jornales_dashboard(parametros)
+    costo_total, total_registros = _sumar(queryset, 'costo', desde, hasta)
+    trabajadores = set()
+    for parte in partes(queryset.values_list('nombre_trabajador', flat=True).distinct().order_by(), desde, hasta):
+        trabajadores.update(parte)
+    return {
+        'costo_total': float(costo_total),
+        'total_registros': total_registros,
+        'trabajadores_activos': len(trabajadores),
+        'costo_promedio': float(costo_total / total_registros) if total_registros > 0 else 0,
     }
-    kpis['costo_promedio'] = kpis['costo_total'] / kpis['total_registros'] if kpis['total_registros'] > 0 else 0
 
+def _jornales_costo_periodo(parametros):
+    queryset, desde, hasta = _jornales_dashboard(parametros)
+    agrupacion = parametros.get('agrupacion', 'mes')
+    trunc_func, date_format = _agrupacion_fecha(agrupacion)
+    # Cada archivo devuelve sus propios períodos: se vuelven a juntar por período
+    costo_por_periodo = {}
+    for periodo, costo in _sumar(queryset.annotate(periodo=trunc_func), 'costo', desde, hasta, 'periodo').items():
+        periodo = truncar(periodo, agrupacion)
+        costo_por_periodo[periodo] = costo_por_periodo.get(periodo, Decimal('0.00')) + costo
+    periodos = sorted(costo_por_periodo)
+    return {
+        'labels': [date_format(periodo) for periodo in periodos],
+        'data': [float(costo_por_periodo[periodo]) for periodo in periodos],
+    }
 
-    # --- 3. DATOS PARA GRÁFICOS (usando el queryset filtrado) ---
-    # Gráfico de Líneas
-    agrupacion = request.GET.get('agrupacion', 'mes')
+def _jornales_costo_tarea(parametros):
+    queryset, desde, hasta = _jornales_dashboard(parametros)
+    return _ordenar_grupo(_sumar(queryset, 'costo', desde, hasta, 'tarea'))
 
-    if agrupacion == 'anio':
-        trunc_func = TruncYear('fecha')
-        date_format = lambda d: d.strftime('%Y')
-    elif agrupacion == 'trimestre':
-        trunc_func = TruncQuarter('fecha')
-        date_format = lambda d: f"T{((d.month-1)//3)+1} {d.year}"
-    elif agrupacion == 'dia':
-        trunc_func = TruncDay('fecha')
-        date_format = lambda d: d.strftime('%d/%m/%Y')
-    else:  # mes por defecto
-        trunc_func = TruncMonth('fecha')
-        date_format = lambda d: d.strftime('%b %Y')
-
-    costo_mensual = queryset.annotate(
-        costo=ExpressionWrapper(
-            F('cantidad') * F('precio'),
-            output_field=DecimalField()
-        ),
-        periodo=trunc_func
-    ).values('periodo').annotate(total_costo=Sum('costo')).order_by('periodo')
-
-    line_chart_labels = [date_format(c['periodo']) for c in costo_mensual]
-    line_chart_data = [float(c['total_costo']) for c in costo_mensual]
-
-    # Gráfico de Barras
-    costo_por_tarea = queryset.annotate(
-        costo=ExpressionWrapper(
-            Cast(F('cantidad'), output_field=DecimalField()) * Cast(F('precio'), output_field=DecimalField()),
-            output_field=DecimalField()
-        )
-    ).values('tarea').annotate(total_costo=Sum('costo')).order_by('-total_costo')
-    bar_chart_labels = [c['tarea'] for c in costo_por_tarea]
-    bar_chart_data = [float(c['total_costo']) for c in costo_por_tarea]
-    
-    # Gráfico de Torta
-    costo_por_clasificacion = queryset.annotate(
-        costo=ExpressionWrapper(
-            Cast(F('cantidad'), output_field=DecimalField()) * Cast(F('precio'), output_field=DecimalField()),
-            output_field=DecimalField()
-        )
-    ).values('clasificacion').annotate(total_costo=Sum('costo')).order_by('-total_costo')
-    pie_chart_labels = [c['clasificacion'] for c in costo_por_clasificacion]
-    pie_chart_data = [float(c['total_costo']) for c in costo_por_clasificacion]
-    
-    # --- CONTEXTO PARA LA PLANTILLA ---
-    context = {
-        'form': form,
-        'kpis': kpis,
-        'line_chart_labels': json.dumps(line_chart_labels),
-        'line_chart_data': json.dumps(line_chart_data),
-        'bar_chart_labels': json.dumps(bar_chart_labels),
-        'bar_chart_data': json.dumps(bar_chart_data),
-        'pie_chart_labels': json.dumps(pie_chart_labels),
-        'pie_chart_data': json.dumps(pie_chart_data),
-        'agrupacion': agrupacion,
-    }
-    return render(request, 'contabilidad_loslirios/analisis.html', context)
+def _jornales_costo_clasificacion(parametros):
+    queryset, desde, hasta = _jornales_dashboard(parametros)
+    return _ordenar_grupo(_sumar(queryset, 'costo', desde, hasta, 'clasificacion'))
+
+# Bloques del dashboard de jornales; la plantilla pide cada uno por separado
+BLOQUES_JORNALES = {
+    'kpis': _jornales_kpis,
+    'costo-periodo': _jornales_costo_periodo,
+    'costo-tarea': _jornales_costo_tarea,
+    'costo-clasificacion': _jornales_costo_clasificacion,
+}
+
+@permission_required('contabilidad_loslirios.can_view_analisis_data', raise_exception=True)
+@login_required
+@respuesta_api(grupos=['jornales'], private=True, no_cache=True)
+@usar_analitica
+async def jornales_data_api(request, bloque):
+    """
+    API con un bloque del dashboard de jornales (KPIs o un gráfico). Cada bloque tiene su
+    propia consulta y su clave de cache por filtros: los pedidos en paralelo de la página
+    se calculan a la vez, y los repetidos del mismo bloque esperan al primero.
+    """
+    calcular = BLOQUES_JORNALES.get(bloque)
+    if calcular is None:
+        raise Http404("Bloque desconocido")
+    return JsonResponse(await en_hilo(obtener_o_calcular, f'jornales:{bloque}', request.GET, ['jornales'], lambda: calcular(request.GET)))
 
 #Logic for analisis_movimientos page:
 @permission_required('contabilidad_loslirios.can_view_analisis_data', raise_exception=True)
 @login_required 
-def analisis_movimientos(request):
-    # Usamos la función auxiliar para obtener el queryset filtrado
-    queryset = _get_movimientos_filtrados_queryset(request)
-    form = FormFiltroDashboardMovimientos(request.GET or None)
+@usar_analitica
+async def analisis_movimientos(request):
+    # Solo la estructura de la página: los KPIs y cada gráfico se piden en paralelo a movimientos_data_api
+    def contexto():
+        # El formulario consulta las clasificaciones existentes
+        form = FormFiltroDashboardMovimientos(request.GET or None)
+        return {
+            'form': form,
+            'moneda_reporte': (form.is_valid() and form.cleaned_data.get('moneda_reporte')) or MONEDA_BASE,
+        }
+    context = await en_hilo(contexto)
+    return await en_hilo(render, request, 'contabilidad_loslirios/visualizacion/analisis_movimientos.html', context)
+
+def _movimientos_dashboard(parametros):
+    """
+    Movimientos filtrados con `monto_normalizado` en la moneda de reporte, el rango de
+    fechas del filtro y la moneda de reporte.
+    """
+    form = FormFiltroDashboardMovimientos(parametros or None)
+    moneda_reporte = (form.is_valid() and form.cleaned_data.get('moneda_reporte')) or MONEDA_BASE
+    return (_get_movimientos_filtrados_queryset(form),) + _rango_dashboard(form) + (moneda_reporte,)
+
+def _movimientos_kpis(parametros):
+    queryset, desde, hasta, moneda_reporte = _movimientos_dashboard(parametros)
+    # Una sola consulta agrupada alimenta todos los KPIs
+    por_tipo, por_origen, monedas = {}, {}, set()
+    for (tipo, origen, moneda), monto in _sumar(queryset, 'monto_normalizado', desde, hasta, ('tipo', 'origen', 'moneda')).items():
+        por_tipo[tipo] = por_tipo.get(tipo, Decimal('0.00')) + monto
+        por_origen[origen] = por_origen.get(origen, Decimal('0.00')) + monto
+        monedas.add(moneda)
+    gasto_total = sum(por_tipo.values(), Decimal('0.00'))
+    gasto_oficial_calculado = por_origen.get('Oficial', Decimal('0.00'))
+
+    def porcentaje(tipo):
+        return float(por_tipo.get(tipo, 0) / gasto_total * 100) if gasto_total > 0 else 0
+
+    return {
+        'gasto_oficial': float(gasto_oficial_calculado),
+        'gasto_no_oficial': float(por_origen.get('No Oficial', 0)),
+        'gasto_total': float(gasto_total),
+        'porcentaje_energia': porcentaje('Energia'),
+        'porcentaje_sueldos_personal': porcentaje('Sueldos Personal'),
+        'porcentaje_inversion': porcentaje('Inversion'),
+        'iva': float(gasto_oficial_calculado * Decimal('0.21')),
+        # Monedas sin cotización, que por eso faltan en los totales
+        'sin_cotizacion': monedas_sin_cotizacion(monedas, moneda_reporte),
+    }
+
+def _movimientos_top5_clasificaciones(parametros):
+    queryset, desde, hasta, _ = _movimientos_dashboard(parametros)
+    return _ordenar_grupo(_sumar(queryset, 'monto_normalizado', desde, hasta, 'clasificacion'), limite=5)
+
+def _movimientos_gastos_finca(parametros):
+    queryset, desde, hasta, _ = _movimientos_dashboard(parametros)
+    return _ordenar_grupo(_sumar(queryset, 'monto_normalizado', desde, hasta, 'finca'))
+
+def _movimientos_gastos_tipo(parametros):
+    queryset, desde, hasta, _ = _movimientos_dashboard(parametros)
+    return _ordenar_grupo(_sumar(queryset, 'monto_normalizado', desde, hasta, 'tipo'))
+
+# Bloques del dashboard de movimientos (el gráfico de líneas tiene su propia API)
+BLOQUES_MOVIMIENTOS = {
+    'kpis': _movimientos_kpis,
+    'top5-clasificaciones': _movimientos_top5_clasificaciones,
+    'gastos-finca': _movimientos_gastos_finca,
+    'gastos-tipo': _movimientos_gastos_tipo,
+}
+
+@permission_required('contabilidad_loslirios.can_view_analisis_data', raise_exception=True)
+@login_required
+@respuesta_api(grupos=['finanzas'], private=True, no_cache=True)
+@usar_analitica
+async def movimientos_data_api(request, bloque):
+    """API con un bloque del dashboard de movimientos; cacheado por bloque y filtros, como en jornales_data_api."""
+    calcular = BLOQUES_MOVIMIENTOS.get(bloque)
+    if calcular is None:
+        raise Http404("Bloque desconocido")
+    return JsonResponse(await en_hilo(obtener_o_calcular, f'movimientos:{bloque}', request.GET, ['finanzas'], lambda: calcular(request.GET)))
+#Logic for line_chart_data_api
+def _get_movimientos_filtrados_queryset(form):
+    """
+    Función auxiliar para obtener el queryset de movimientos filtrado, anotado con
+    `monto_normalizado` en la moneda de reporte elegida (pesos por defecto).
+    """
+    queryset = MovimientoFinanciero.objects.filter(_filtros_dashboard(form))
+    moneda_reporte = (form.is_valid() and form.cleaned_data.get('moneda_reporte')) or MONEDA_BASE
+    return anotar_monto_normalizado(queryset, moneda_reporte)
 
-    # --- CALCULAR KPIs ---
-    gasto_total = queryset.aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total')
-    gasto_energia = queryset.filter(tipo='Energia').aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total')
-    gasto_sueldos_personal = queryset.filter(tipo='Sueldos Personal').aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total')
-    gasto_inversion = queryset.filter(tipo='Inversion').aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total')
-    gasto_oficial_calculado = queryset.filter(origen='Oficial').aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total')
-
-
-    kpis = {
-        'gasto_oficial': queryset.filter(origen='Oficial').aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total'),
-        'gasto_no_oficial': queryset.filter(origen='No Oficial').aggregate(total=Coalesce(Sum('monto'), Decimal('0.0'))).get('total'),
-        'gasto_total': gasto_total,
-        'porcentaje_energia': (gasto_energia / gasto_total * 100) if gasto_total > 0 else 0,
-        'porcentaje_sueldos_personal': (gasto_sueldos_personal / gasto_total * 100) if gasto_total > 0 else 0,
-        'porcentaje_inversion': (gasto_inversion / gasto_total * 100) if gasto_total > 0 else 0,
-        'iva': gasto_oficial_calculado * Decimal('0.21'),
+def _agrupacion_fecha(agrupacion, campo='fecha'):
+    """Devuelve la función de truncado y el formato de etiqueta para una agrupación temporal."""
+    if agrupacion == 'anio':
+        return TruncYear(campo), lambda d: d.strftime('%Y')
+    if agrupacion == 'trimestre':
+        return TruncQuarter(campo), lambda d: f"T{((d.month-1)//3)+1} {d.year}"
+    if agrupacion == 'dia':
+        return TruncDay(campo), lambda d: d.strftime('%d/%m/%Y')
+    return TruncMonth(campo), lambda d: d.strftime('%b %Y')
+
+# Campos por los que se puede abrir el gráfico de líneas en varias series
+CAMPOS_SERIES = ('tipo', 'finca', 'origen')
+# Tope de períodos de la espina (p. ej. tres años por día); más allá se responde 400
+MAXIMO_PERIODOS_LINEA = 1100
+
+@respuesta_api(grupos=['finanzas'], private=True, no_cache=True)
+@usar_analitica
+async def line_chart_data_api(request):
+    """
+    API que devuelve los datos para el gráfico de líneas, con filtros y agrupación.
+
+    Parámetros opcionales:
+      - series=tipo|finca|origen: además del total, devuelve una serie por cada valor.
+      - puntos=N: reduce las series a N puntos con LTTB (útil con agrupacion=dia); N >= 3.
+    Los períodos sin gastos se completan con cero. La respuesta es columnar:
+    {'labels': [...], 'data': [...total...], 'series': {'nombre': [...]},
+    'sin_cotizacion': [monedas sin tipo de cambio, que faltan en los totales]}.
+    Filtros o `puntos` inválidos, o un rango de más de MAXIMO_PERIODOS_LINEA períodos: 400.
+    """
+    try:
+        datos = await en_hilo(obtener_o_calcular, 'movimientos:linea', request.GET, ['finanzas'], lambda: _calcular_linea_movimientos(request))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(datos)
+
+def _calcular_linea_movimientos(request):
+    form = FormFiltroDashboardMovimientos(request.GET or None)
+    if form.is_bound and not form.is_valid():
+        raise ValueError('Filtros inválidos: ' + ' '.join(f'{campo}: {" ".join(errores)}' for campo, errores in form.errors.items()))
+    filtros = form.cleaned_data if form.is_bound else {}
+    fecha_desde, fecha_hasta = filtros.get('fecha_desde'), filtros.get('fecha_hasta')
+    if fecha_desde and fecha_hasta and fecha_desde > fecha_hasta:
+        raise ValueError('La fecha "Hasta" no puede ser anterior a la fecha "Desde".')
+    puntos = request.GET.get('puntos')
+    if puntos is not None:
+        # LTTB conserva siempre el primero y el último: con menos de 3 no reduce nada
+        puntos = int(puntos) if puntos.isdigit() else 0
+        if puntos < 3:
+            raise ValueError('"puntos" debe ser un número entero mayor o igual a 3.')
+
+    queryset = _get_movimientos_filtrados_queryset(form)
+    agrupacion = request.GET.get('agrupacion', 'mes')
+    campo_serie = request.GET.get('series')
+    if campo_serie not in CAMPOS_SERIES:
+        campo_serie = None
+    trunc_func, date_format_func = _agrupacion_fecha(agrupacion)
+
+    columnas = ['periodo', 'moneda', campo_serie] if campo_serie else ['periodo', 'moneda']
+    gastos_agrupados = queryset.annotate(periodo=trunc_func).values(*columnas).annotate(total_monto=Sum('monto_normalizado')).order_by()
+
+    # Los años archivados del rango se agrupan en el mismo UNION ALL (ver archivo.py)
+    consultas = partes(gastos_agrupados, fecha_desde, fecha_hasta)
+    valores = {}
+    monedas = set()
+    for g in consultas[0].union(*consultas[1:], all=True):
+        monedas.add(g['moneda'])
+        periodo = truncar(g['periodo'], agrupacion)
+        clave = g[campo_serie] if campo_serie else None
+        valores[(periodo, clave)] = valores.get((periodo, clave), 0.0) + float(g['total_monto'] or 0)
+
+    # --- Espina de fechas: desde/hasta del filtro o, si faltan, el rango con datos ---
+    periodos_con_datos = [periodo for periodo, _ in valores]
+    inicio = fecha_desde or (min(periodos_con_datos) if periodos_con_datos else None)
+    fin = fecha_hasta or (max(periodos_con_datos) if periodos_con_datos else None)
+    if inicio and fin and contar_periodos(inicio, fin, agrupacion) > MAXIMO_PERIODOS_LINEA:
+        raise ValueError(f'El rango abarca más de {MAXIMO_PERIODOS_LINEA} períodos: acorte las fechas o elija una agrupación mayor.')
+    periodos = generar_periodos(inicio, fin, agrupacion) if inicio and fin else []
+
+    nombres = sorted({clave for _, clave in valores if clave is not None})
+    series = {nombre: [valores.get((periodo, nombre), 0.0) for periodo in periodos] for nombre in nombres}
+    if campo_serie:
+        total = [sum(columna) for columna in zip(*series.values())] if series else [0.0] * len(periodos)
+    else:
+        total = [valores.get((periodo, None), 0.0) for periodo in periodos]
+
+    # --- Reducción opcional: los mismos índices para todas las series ---
+    if puntos:
+        indices = lttb([periodo.toordinal() for periodo in periodos], total, puntos)
+        periodos = [periodos[i] for i in indices]
+        total = [total[i] for i in indices]
+        series = {nombre: [datos[i] for i in indices] for nombre, datos in series.items()}
+
+    respuesta = {
+        'labels': [date_format_func(periodo) for periodo in periodos],
+        'data': total,
+        'sin_cotizacion': monedas_sin_cotizacion(monedas, filtros.get('moneda_reporte') or MONEDA_BASE),
     }
+    if campo_serie:
+        respuesta['series'] = series
+    return respuesta
 
-    # --- DATOS PARA GRÁFICOS (excepto el de líneas) ---
-    # Gráfico de Barras: Top 5 Clasificaciones
-    top5_clasificaciones = queryset.values('clasificacion').annotate(total_monto=Sum('monto')).order_by('-total_monto')[:5]
-    top5_bar_chart_labels = [g['clasificacion'] for g in top5_clasificaciones]
-    top5_bar_chart_data = [float(g['total_monto']) for g in top5_clasificaciones]
-    
-    # Gráfico de Torta: Distribución de Gastos por Finca
-    gastos_por_finca = queryset.values('finca').annotate(total_monto=Sum('monto')).order_by('-total_monto')
-    pie_chart_labels = [g['finca'] for g in gastos_por_finca]
-    pie_chart_data = [float(g['total_monto']) for g in gastos_por_finca]
+def _fecha_param(request, nombre):
+    """Lee una fecha AAAA-MM-DD de los parámetros GET (None si falta o es inválida)."""
+    try:
+        return datetime.strptime(request.GET.get(nombre, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
 
-    # Gráfico de Barras: Gastos Totales por Tipo
-    gastos_por_tipo = queryset.values('tipo').annotate(total_monto=Sum('monto')).order_by('-total_monto')
-    bar_chart_labels = [g['tipo'] for g in gastos_por_tipo]
-    bar_chart_data = [float(g['total_monto']) for g in gastos_por_tipo]
+#Logic for analisis_flujo_caja page:
+def _calcular_flujo_caja(parametros):
+    """
+    Calcula ingresos, egresos y neto por período, finca y moneda.
+    Ambas tablas (y sus archivos anuales) se agrupan en una única consulta (UNION ALL
+    de SELECT agrupados); en Python solo se juntan las pocas filas de cada combinación.
+    """
+    form = FormFiltroFlujoCaja(parametros)
+    filtros = Q()
+    agrupacion = 'mes'
+    fecha_desde = fecha_hasta = None
+    if form.is_valid():
+        agrupacion = form.cleaned_data.get('agrupacion') or 'mes'
+        fecha_desde = form.cleaned_data.get('fecha_desde')
+        fecha_hasta = form.cleaned_data.get('fecha_hasta')
+        if fecha_desde:
+            filtros &= Q(fecha__gte=fecha_desde)
+        if fecha_hasta:
+            filtros &= Q(fecha__lte=fecha_hasta)
+        for campo in ('origen', 'finca', 'moneda'):
+            if form.cleaned_data.get(campo):
+                filtros &= Q(**{f'{campo}__in': form.cleaned_data[campo]})
+    trunc_func, date_format = _agrupacion_fecha(agrupacion)
+    cero = Value(Decimal('0.00'), output_field=DecimalField())
+
+    ingresos = IngresoFinanciero.objects.filter(filtros).annotate(periodo=trunc_func).values('periodo', 'finca', 'moneda').annotate(ingreso=Sum('monto'), egreso=cero).order_by()
+    egresos = MovimientoFinanciero.objects.filter(filtros).annotate(periodo=trunc_func).values('periodo', 'finca', 'moneda').annotate(ingreso=cero, egreso=Sum('monto')).order_by()
+
+    # Más una parte por cada año archivado del rango, todo en el mismo UNION ALL
+    consultas = partes(ingresos, fecha_desde, fecha_hasta) + partes(egresos, fecha_desde, fecha_hasta)
+    acumulado = {}
+    for fila in consultas[0].union(*consultas[1:], all=True):
+        clave = (fila['periodo'], fila['finca'], fila['moneda'])
+        ingreso, egreso = acumulado.get(clave, (Decimal('0'), Decimal('0')))
+        acumulado[clave] = (ingreso + (fila['ingreso'] or 0), egreso + (fila['egreso'] or 0))
+
+    periodos = sorted({periodo for periodo, _, _ in acumulado})
+    indice_periodo = {periodo: i for i, periodo in enumerate(periodos)}
+    series = {}
+    totales = {}
+    for (periodo, finca, moneda), (ingreso, egreso) in acumulado.items():
+        serie = series.setdefault((finca, moneda), {
+            'finca': finca,
+            'moneda': moneda,
+            'ingresos': [0.0] * len(periodos),
+            'egresos': [0.0] * len(periodos),
+            'neto': [0.0] * len(periodos),
+        })
+        i = indice_periodo[periodo]
+        serie['ingresos'][i] = float(ingreso)
+        serie['egresos'][i] = float(egreso)
+        serie['neto'][i] = float(ingreso - egreso)
+        total = totales.setdefault(moneda, {'ingresos': 0.0, 'egresos': 0.0, 'neto': 0.0})
+        total['ingresos'] += float(ingreso)
+        total['egresos'] += float(egreso)
+        total['neto'] += float(ingreso - egreso)
+
+    return {
+        'periodos': [date_format(periodo) for periodo in periodos],
+        'series': [series[clave] for clave in sorted(series)],
+        'totales': totales,
+    }
+
+def _flujo_caja_cacheado(request):
+    # Se cachea por combinación de filtros; cualquier alta o baja financiera cambia la versión
+    return obtener_o_calcular('flujo_caja', request.GET, ['finanzas'], lambda: _calcular_flujo_caja(request.GET))
 
-    # --- CONTEXTO ---
+@permission_required('contabilidad_loslirios.can_view_analisis_data', raise_exception=True)
+@login_required
+@usar_analitica
+def analisis_flujo_caja(request):
+    form = FormFiltroFlujoCaja(request.GET or None, initial={'agrupacion': 'mes'})
+    flujo = _flujo_caja_cacheado(request)
     context = {
         'form': form,
-        'kpis': kpis,
-        'top5_bar_chart_labels': json.dumps(top5_bar_chart_labels),
-        'top5_bar_chart_data': json.dumps(top5_bar_chart_data),
-        'pie_chart_labels': json.dumps(pie_chart_labels),
-        'pie_chart_data': json.dumps(pie_chart_data),
-        'bar_chart_labels': json.dumps(bar_chart_labels),      
-        'bar_chart_data': json.dumps(bar_chart_data),          
+        'totales': flujo['totales'],
     }
-    return render(request, 'contabilidad_loslirios/visualizacion/analisis_movimientos.html', context)
-#Logic for line_chart_data_api
-def _get_movimientos_filtrados_queryset(request):
-    """Función auxiliar para obtener el queryset de movimientos filtrado."""
-    form = FormFiltroDashboardMovimientos(request.GET or None)
-    queryset = MovimientoFinanciero.objects.all()
+    return render(request, 'contabilidad_loslirios/visualizacion/analisis_flujo_caja.html', context)
 
-    if form.is_valid():
-        filtros = Q()
-        for field, value in form.cleaned_data.items():
-            if value:
-                if field == 'fecha_desde':
-                    filtros &= Q(fecha__gte=value)
-                elif field == 'fecha_hasta':
-                    filtros &= Q(fecha__lte=value)
-                else:
-                    filtros &= Q(**{f'{field}__in': value})
-        queryset = queryset.filter(filtros)
-    return queryset
+@permission_required('contabilidad_loslirios.can_view_analisis_data', raise_exception=True)
+@login_required
+@respuesta_api(grupos=['finanzas'], private=True, no_cache=True)
+@usar_analitica
+def flujo_caja_data_api(request):
+    """API con ingresos, egresos y neto por período para cada combinación de finca y moneda."""
+    return JsonResponse(_flujo_caja_cacheado(request))
 
-def line_chart_data_api(request):
-    """API que devuelve los datos para el gráfico de líneas, con filtros y agrupación."""
-    queryset = _get_movimientos_filtrados_queryset(request)
-    
-    agrupacion = request.GET.get('agrupacion', 'mes')
-    trunc_func = TruncMonth('fecha') # Por defecto
-    date_format_func = lambda d: d.strftime('%b %Y')
 
-    if agrupacion == 'anio':
-        trunc_func = TruncYear('fecha')
-        date_format_func = lambda d: d.strftime('%Y')
-    elif agrupacion == 'trimestre':
-        trunc_func = TruncQuarter('fecha')
-        date_format_func = lambda d: f"T{((d.month-1)//3)+1} {d.year}"
-    elif agrupacion == 'dia':
-        trunc_func = TruncDay('fecha')
-        date_format_func = lambda d: d.strftime('%d/%m/%Y')
-
-    gastos_agrupados = queryset.annotate(periodo=trunc_func).values('periodo').annotate(total_monto=Sum('monto')).order_by('periodo')
-    
-    labels = [date_format_func(g['periodo']) for g in gastos_agrupados]
-    data = [float(g['total_monto']) for g in gastos_agrupados]
 
-    return JsonResponse({'labels': labels, 'data': data})
+#Logic for offline batch sync (field data entry)
+# tipo de registro -> (formulario, modelo, permiso para cargarlo)
+TIPOS_SINCRONIZACION = {
+    'jornal': (FormRegistroTrabajo, registro_trabajo, 'contabilidad_loslirios.can_add_jornales'),
+    'riego': (FormRegistroRiego, RegistroRiego, 'contabilidad_loslirios.can_add_riego'),
+}
+# Tope de registros por pedido
+MAXIMO_LOTE_SINCRONIZACION = 500
 
+@require_POST
+@login_required
+def sincronizar_registros(request):
+    """
+    API de carga por lotes para los registros tomados sin conexión.
+
+    Recibe una lista JSON de {'tipo': 'jornal'|'riego', 'clave': <clave de idempotencia>,
+    'datos': {...campos del formulario de carga...}}. Cada registro se valida con el mismo
+    formulario que la carga manual y los válidos se insertan con un bulk_create por tipo,
+    en una sola transacción. Un registro cuya clave ya existe no se vuelve a insertar, así
+    que reenviar el lote después de un corte es seguro. Responde un resultado por registro
+    ('creado', 'duplicado', 'invalido' o 'sin_permiso'), en el mismo orden.
+    """
+    try:
+        registros = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': 'El cuerpo no es JSON válido.'}, status=400)
+    if not isinstance(registros, list) or len(registros) > MAXIMO_LOTE_SINCRONIZACION:
+        return JsonResponse({'error': f'Se espera una lista de hasta {MAXIMO_LOTE_SINCRONIZACION} registros.'}, status=400)
+
+    resultados = [None] * len(registros)
+    a_validar = []  # (posición, tipo, clave, datos)
+    for i, registro in enumerate(registros):
+        if not isinstance(registro, dict) or registro.get('tipo') not in TIPOS_SINCRONIZACION \
+                or not isinstance(registro.get('clave'), str) or not 0 < len(registro['clave']) <= 64 \
+                or not isinstance(registro.get('datos'), dict):
+            resultados[i] = {'estado': 'invalido', 'errores': {'__all__': ['Se requieren tipo, clave (hasta 64 caracteres) y datos.']}}
+            continue
+        if not request.user.has_perm(TIPOS_SINCRONIZACION[registro['tipo']][2]):
+            resultados[i] = {'clave': registro['clave'], 'estado': 'sin_permiso'}
+            continue
+        a_validar.append((i, registro['tipo'], registro['clave'], registro['datos']))
+
+    # Claves ya guardadas en un envío anterior, también en los años archivados: la
+    # restricción unique solo cubre la base activa
+    existentes = {}
+    for tipo, (_, modelo, _) in TIPOS_SINCRONIZACION.items():
+        claves = [clave for _, t, clave, _ in a_validar if t == tipo]
+        guardadas = modelo.objects.filter(clave_idempotencia__in=claves).values_list('clave_idempotencia', 'pk').order_by()
+        existentes[tipo] = {clave: pk for parte in partes(guardadas) for clave, pk in parte} if claves else {}
+
+    nuevos = {tipo: [] for tipo in TIPOS_SINCRONIZACION}
+    vistas = set()
+    for i, tipo, clave, datos in a_validar:
+        if clave in existentes[tipo]:
+            resultados[i] = {'clave': clave, 'estado': 'duplicado', 'id': existentes[tipo][clave]}
+            continue
+        if (tipo, clave) in vistas:
+            # La misma clave repetida dentro del lote: vale la primera
+            resultados[i] = {'clave': clave, 'estado': 'duplicado'}
+            continue
+        vistas.add((tipo, clave))
+        form = TIPOS_SINCRONIZACION[tipo][0](data=datos)
+        if not form.is_valid():
+            resultados[i] = {'clave': clave, 'estado': 'invalido', 'errores': form.errors.get_json_data()}
+            continue
+        instancia = form.save(commit=False)
+        instancia.clave_idempotencia = clave
+        if tipo == 'jornal':
+            # bulk_create no llama a save(), que es donde se calcula el monto
+            instancia.monto_total = instancia.cantidad * instancia.precio
+        nuevos[tipo].append((i, instancia))
+
+    with transaction.atomic():
+        for tipo, pendientes in nuevos.items():
+            if not pendientes:
+                continue
+            modelo = TIPOS_SINCRONIZACION[tipo][1]
+            # ignore_conflicts cubre un reintento que llegue en paralelo con la misma clave
+            modelo.objects.bulk_create([instancia for _, instancia in pendientes], ignore_conflicts=True)
+            ids = dict(modelo.objects.filter(
+                clave_idempotencia__in=[instancia.clave_idempotencia for _, instancia in pendientes]
+            ).values_list('clave_idempotencia', 'pk'))
+            for i, instancia in pendientes:
+                resultados[i] = {'clave': instancia.clave_idempotencia, 'estado': 'creado', 'id': ids.get(instancia.clave_idempotencia)}
+
+    # bulk_create no dispara señales: se hace a mano lo que harían los receptores de post_save
+    if nuevos['jornal']:
+        for nombre in {instancia.nombre_trabajador for _, instancia in nuevos['jornal']}:
+            registrar_trabajador(nombre)
+        invalidar('jornales')
+    if nuevos['riego']:
+        invalidar('riegos')
+
+    return JsonResponse({'resultados': resultados})
+
+
+
+#Logic for profiler pages (staff)
+@login_required
+def perfiles(request):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    context = {
+        'perfiles': listar_perfiles(),
+        'activo': settings.PERFILADO_ACTIVO,
+    }
+    return render(request, 'contabilidad_loslirios/administracion/perfiles.html', context)
 
+@login_required
+def perfil_detalle(request, nombre):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    ruta = ruta_perfil(nombre)
+    if ruta is None:
+        raise Http404("El perfil no existe o ya fue rotado.")
+    if request.GET.get('descargar'):
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=os.path.basename(ruta))
+    meta = next((perfil for perfil in listar_perfiles() if perfil['nombre'] == nombre), {'nombre': nombre})
+    context = {
+        'perfil': meta,
+        'resumen': resumen_perfil(nombre),
+    }
+    return render(request, 'contabilidad_loslirios/administracion/perfil_detalle.html', context)
+
+
+
+#Logic for background jobs (exports and reports)
+# Permiso necesario para encolar cada tipo de trabajo
+PERMISOS_TRABAJO = {
+    'exportar_jornales': 'contabilidad_loslirios.can_export_jornales',
+    'exportar_movimientos': 'contabilidad_loslirios.can_export_movimientos',
+    'exportar_ingresos': 'contabilidad_loslirios.can_export_ingresos',
+    'exportar_riegos': 'contabilidad_loslirios.can_view_riego',
+    'reporte_flujo_caja': 'contabilidad_loslirios.can_view_analisis_data',
+}
+
+@trabajo_en_segundo_plano('exportar_jornales')
+@usar_analitica
+def _trabajo_exportar_jornales(trabajo, archivo, avanzar):
+    _escribir_jornales_csv(archivo, _filtrar_registros(parametros_de(trabajo)), avanzar)
+
+@trabajo_en_segundo_plano('exportar_movimientos')
+@usar_analitica
+def _trabajo_exportar_movimientos(trabajo, archivo, avanzar):
+    _escribir_movimientos_csv(archivo, _filtrar_movimientos(parametros_de(trabajo)), avanzar)
+
+@trabajo_en_segundo_plano('exportar_ingresos')
+@usar_analitica
+def _trabajo_exportar_ingresos(trabajo, archivo, avanzar):
+    _escribir_ingresos_csv(archivo, _filtrar_ingresos(parametros_de(trabajo)), avanzar)
+
+@trabajo_en_segundo_plano('exportar_riegos')
+@usar_analitica
+def _trabajo_exportar_riegos(trabajo, archivo, avanzar):
+    _escribir_riegos_csv(archivo, _filtrar_riegos(parametros_de(trabajo)), avanzar)
+
+@trabajo_en_segundo_plano('reporte_flujo_caja')
+@usar_analitica
+def _trabajo_reporte_flujo_caja(trabajo, archivo, avanzar):
+    flujo = _calcular_flujo_caja(parametros_de(trabajo))
+    writer = csv.writer(archivo)
+    writer.writerow(['Periodo', 'Finca', 'Moneda', 'Ingresos', 'Egresos', 'Neto'])
+    for n, serie in enumerate(flujo['series'], start=1):
+        for i, periodo in enumerate(flujo['periodos']):
+            writer.writerow([periodo, serie['finca'], serie['moneda'], f"{serie['ingresos'][i]:.2f}", f"{serie['egresos'][i]:.2f}", f"{serie['neto'][i]:.2f}"])
+        avanzar(n, len(flujo['series']))
+
+def _estado_trabajo_json(trabajo):
+    datos = {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'error': trabajo.error,
+        'estado_url': reverse('estado_trabajo', args=[trabajo.pk]),
+    }
+    if trabajo.estado == 'terminado':
+        datos['descarga_url'] = reverse('descargar_trabajo', args=[trabajo.pk])
+    return datos
+
+def _obtener_trabajo_propio(request, pk):
+    """Cada usuario solo ve sus trabajos (el staff ve todos)."""
+    trabajo = get_object_or_404(TrabajoSegundoPlano, pk=pk)
+    if not request.user.is_staff and trabajo.usuario_id != request.user.pk:
+        raise Http404
+    return trabajo
+
+@require_POST
+@login_required
+def encolar_trabajo(request, tipo):
+    """
+    Encola una exportación o reporte con los filtros de la query string y
+    responde de inmediato con la URL para consultar su progreso.
+    """
+    permiso = PERMISOS_TRABAJO.get(tipo)
+    if permiso is None:
+        raise Http404
+    if not request.user.has_perm(permiso):
+        raise PermissionDenied
+    trabajo = encolar(tipo, request.GET, request.user)
+    return JsonResponse(_estado_trabajo_json(trabajo), status=202)
 
+@login_required
+def estado_trabajo(request, pk):
+    # Tras un reinicio, el primer pedido del proceso reencola o da por interrumpidos los trabajos
+    asegurar_recuperacion()
+    return JsonResponse(_estado_trabajo_json(_obtener_trabajo_propio(request, pk)))
+
+@login_required
+def descargar_trabajo(request, pk):
+    trabajo = _obtener_trabajo_propio(request, pk)
+    if trabajo.estado != 'terminado' or not os.path.exists(ruta_resultado(trabajo)):
+        raise Http404
+    return FileResponse(open(ruta_resultado(trabajo), 'rb'), as_attachment=True, filename=trabajo.archivo, content_type='text/csv')
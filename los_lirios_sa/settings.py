@@ -43,10 +43,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'contabilidad_loslirios.estaticos.EstaticosInmutablesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'contabilidad_loslirios.perfilado.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,7 +84,35 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Réplica de solo lectura para tableros, reportes y exportaciones, así no compiten
+    # por el lock de escritura con la carga de datos. Se actualiza con
+    # `manage.py sincronizar_analitica` (ver contabilidad_loslirios/analitica.py)
+    'analitica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'analitica.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['contabilidad_loslirios.analitica.RouterAnalitica']
+
+# Dos caches (ver contabilidad_loslirios/cache_consultas.py):
+# - `default`, en memoria de cada proceso: resultados de reportes y ETags de las APIs,
+#   las lecturas frecuentes, que así no cuestan ninguna consulta.
+# - `versiones`, compartido por todos los procesos del servidor: solo las versiones de
+#   datos, que forman parte de las claves del otro. Una invalidación en un proceso deja
+#   sin uso lo cacheado en los demás. La tabla se crea sola después de cada migrate;
+#   con Redis o Memcached alcanza con cambiar BACKEND y LOCATION.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'resultados',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'versiones': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_compartido',
+    },
 }
 
 
@@ -126,6 +156,14 @@ STATICFILES_DIRS = [
     BASE_DIR / "contabilidad_loslirios/static",
 ]
 
+# collectstatic deja los archivos con nombre hasheado y precomprimidos (.gz/.br) en STATIC_ROOT
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'contabilidad_loslirios.estaticos.EstaticosComprimidos'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -135,3 +173,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login' # Nombre de la URL para la página de inicio de sesión
 LOGIN_REDIRECT_URL = 'main' # Nombre de la URL a la que se redirige después de un login exitoso
 LOGOUT_REDIRECT_URL = 'login' # Nombre de la URL a la que se redirige después de un logout
+
+# Trabajos en segundo plano (exportaciones y reportes)
+TRABAJOS_DIR = BASE_DIR / 'trabajos' # Carpeta donde quedan los archivos generados
+TRABAJOS_HILOS = 2 # Cantidad de trabajos que se ejecutan a la vez por proceso
+TRABAJOS_SIN_LATIDO = 600 # Segundos sin señales tras los que un trabajo en curso se da por interrumpido
+TRABAJOS_RETENCION_DIAS = 7 # Días que se guardan los trabajos finalizados y sus archivos
+
+# Vistas async: hilos que ejecutan sus consultas a la base (ver contabilidad_loslirios/consultas_async.py)
+CONSULTAS_HILOS = 4
+
+# Archivos anuales: los años cerrados se mueven a una base SQLite por año (ver contabilidad_loslirios/archivo.py)
+ARCHIVO_DIR = BASE_DIR / 'archivo'
+
+# Respaldos en línea de la base (manage.py respaldar_base)
+RESPALDO_DIR = BASE_DIR / 'respaldos'
+
+# Perfilado de pedidos para el staff (?perfilar=1 o encabezado X-Perfilar; ver contabilidad_loslirios/perfilado.py)
+PERFILADO_ACTIVO = False # Con False el middleware no se carga y no suma ningún costo
+PERFILADO_MUESTREO = 0.0 # Fracción de los pedidos del staff que se perfilan sin pedirlo (0 a 1)
+PERFILADO_DIR = BASE_DIR / 'perfiles'
+PERFILADO_CONSERVAR = 50 # Cantidad de perfiles que se guardan antes de borrar los más viejos